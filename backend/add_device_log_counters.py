@@ -0,0 +1,98 @@
+# backend/add_device_log_counters.py
+"""
+Migrate device_logs to aggregated audit counters.
+
+- Adds first_seen_at and request_count
+- Replaces UNIQUE (device_key_hash, session_id) with
+  UNIQUE (device_key_hash, session_id, status), the upsert key used by
+  device_auth.DeviceAuditAggregator
+
+Run once against the configured DATABASE_URL:
+    python add_device_log_counters.py
+"""
+from sqlalchemy import inspect, text
+
+from database import engine
+
+POSTGRES_COMMANDS = [
+    "ALTER TABLE device_logs ADD COLUMN IF NOT EXISTS first_seen_at TIMESTAMPTZ DEFAULT now()",
+    "ALTER TABLE device_logs ADD COLUMN IF NOT EXISTS request_count INTEGER DEFAULT 0",
+    # Every pre-existing row stood for exactly one request
+    "UPDATE device_logs SET first_seen_at = COALESCE(first_seen_at, timestamp), request_count = 1 WHERE request_count = 0 OR request_count IS NULL",
+    "ALTER TABLE device_logs DROP CONSTRAINT IF EXISTS uq_device_session",
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'uq_device_session_status') THEN
+            ALTER TABLE device_logs
+                ADD CONSTRAINT uq_device_session_status UNIQUE (device_key_hash, session_id, status);
+        END IF;
+    END $$;
+    """,
+]
+
+# SQLite can't alter constraints: rebuild the table and copy rows across
+SQLITE_COMMANDS = [
+    "ALTER TABLE device_logs RENAME TO device_logs_old",
+    """
+    CREATE TABLE device_logs (
+        id INTEGER PRIMARY KEY,
+        device_key_hash VARCHAR(255) NOT NULL,
+        session_id INTEGER REFERENCES engagement_sessions (id),
+        client_ip VARCHAR(50),
+        status VARCHAR(50) NOT NULL,
+        first_seen_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        details VARCHAR,
+        points_uploaded INTEGER DEFAULT 0,
+        request_count INTEGER DEFAULT 0,
+        CONSTRAINT uq_device_session_status UNIQUE (device_key_hash, session_id, status)
+    )
+    """,
+    """
+    INSERT INTO device_logs
+        (id, device_key_hash, session_id, client_ip, status, first_seen_at, timestamp, details, points_uploaded, request_count)
+    SELECT id, device_key_hash, session_id, client_ip, status, timestamp, timestamp, details, points_uploaded, 1
+    FROM device_logs_old
+    """,
+    "DROP TABLE device_logs_old",
+    "CREATE INDEX IF NOT EXISTS idx_device_logs_device_key_hash ON device_logs (device_key_hash)",
+    "CREATE INDEX IF NOT EXISTS idx_device_logs_session_id ON device_logs (session_id)",
+    "CREATE INDEX IF NOT EXISTS ix_device_logs_timestamp ON device_logs (timestamp)",
+]
+
+
+def update_database():
+    try:
+        inspector = inspect(engine)
+        if "device_logs" not in inspector.get_table_names():
+            print("✅ device_logs does not exist yet - create_all will build the new layout")
+            return
+
+        columns = [c["name"] for c in inspector.get_columns("device_logs")]
+        print(f"📊 Updating device_logs on {engine.dialect.name}")
+        print(f"Existing columns: {columns}")
+        print("=" * 50)
+
+        if engine.dialect.name == "postgresql":
+            commands = POSTGRES_COMMANDS
+        elif "request_count" in columns:
+            print("✅ Columns already exist, nothing to do")
+            return
+        else:
+            commands = SQLITE_COMMANDS
+
+        with engine.begin() as conn:
+            for sql in commands:
+                conn.execute(text(sql))
+                print(f"✅ {' '.join(sql.split())[:70]}...")
+
+        print("=" * 50)
+        print("✅ Database update complete!")
+
+    except Exception as e:
+        print(f"❌ Error updating database: {e}")
+
+
+if __name__ == "__main__":
+    update_database()
@@ -0,0 +1,93 @@
+# backend/add_engagement_point_indexes.py
+"""
+Redesign engagement_points indexes around the series access path.
+
+Every series read (get_series, get_series_updates, reports) is
+    WHERE session_id = ? ORDER BY timestamp
+so one composite (session_id, timestamp) index serves them all. On
+Postgres it INCLUDEs score/ear/student_id, which turns those reads into
+index-only scans.
+
+- Creates idx_engagement_points_session_ts
+- Drops the redundant single-column indexes (each one costs every insert):
+  ix_engagement_points_id, ix_engagement_points_session_id,
+  idx_engagement_points_session, idx_engagement_points_timestamp
+
+Postgres builds/drops CONCURRENTLY so ingestion keeps running, then
+VACUUM ANALYZE refreshes the visibility map index-only scans rely on.
+A partitioned engagement_points (partition_engagement_points.py) can't
+take CONCURRENTLY: there the plain statements run instead, which are
+no-ops since the partitioned parent is created with this layout.
+
+Run once against the configured DATABASE_URL:
+    python add_engagement_point_indexes.py
+"""
+from sqlalchemy import inspect, text
+
+from database import engine
+from engagement_partitions import is_partitioned
+
+REDUNDANT_INDEXES = [
+    "ix_engagement_points_id",
+    "ix_engagement_points_session_id",
+    "idx_engagement_points_session",
+    "idx_engagement_points_timestamp",
+]
+
+POSTGRES_COMMANDS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_engagement_points_session_ts "
+    "ON engagement_points (session_id, timestamp) INCLUDE (score, ear, student_id)",
+    *[f"DROP INDEX CONCURRENTLY IF EXISTS {name}" for name in REDUNDANT_INDEXES],
+    "VACUUM ANALYZE engagement_points",
+]
+
+# CONCURRENTLY is not supported on partitioned tables / indexes
+POSTGRES_PARTITIONED_COMMANDS = [
+    "CREATE INDEX IF NOT EXISTS idx_engagement_points_session_ts "
+    "ON engagement_points (session_id, timestamp) INCLUDE (score, ear, student_id)",
+    *[f"DROP INDEX IF EXISTS {name}" for name in REDUNDANT_INDEXES],
+    "VACUUM ANALYZE engagement_points",
+]
+
+SQLITE_COMMANDS = [
+    "CREATE INDEX IF NOT EXISTS idx_engagement_points_session_ts ON engagement_points (session_id, timestamp)",
+    *[f"DROP INDEX IF EXISTS {name}" for name in REDUNDANT_INDEXES],
+    "ANALYZE engagement_points",
+]
+
+
+def update_database():
+    try:
+        inspector = inspect(engine)
+        if "engagement_points" not in inspector.get_table_names():
+            print("✅ engagement_points does not exist yet - create_all will build the new layout")
+            return
+
+        indexes = [ix["name"] for ix in inspector.get_indexes("engagement_points")]
+        print(f"📊 Updating engagement_points indexes on {engine.dialect.name}")
+        print(f"Existing indexes: {indexes}")
+        print("=" * 50)
+
+        # CONCURRENTLY and VACUUM can't run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if engine.dialect.name != "postgresql":
+                commands = SQLITE_COMMANDS
+            elif is_partitioned(conn):
+                print("📊 engagement_points is partitioned: building without CONCURRENTLY")
+                commands = POSTGRES_PARTITIONED_COMMANDS
+            else:
+                commands = POSTGRES_COMMANDS
+
+            for sql in commands:
+                conn.execute(text(sql))
+                print(f"✅ {' '.join(sql.split())[:70]}...")
+
+        print("=" * 50)
+        print("✅ Database update complete!")
+
+    except Exception as e:
+        print(f"❌ Error updating database: {e}")
+
+
+if __name__ == "__main__":
+    update_database()
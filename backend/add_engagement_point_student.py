@@ -0,0 +1,62 @@
+# backend/add_engagement_point_student.py
+"""
+Add the student dimension to engagement_points.
+
+- student_id column (nullable FK -> users.id, SET NULL on delete)
+- Composite index (session_id, student_id, timestamp) for per-student reads
+
+Existing points keep student_id = NULL (they can't be attributed).
+
+Run once against the configured DATABASE_URL:
+    python add_engagement_point_student.py
+"""
+from sqlalchemy import inspect, text
+
+from database import engine
+
+POSTGRES_COMMANDS = [
+    "ALTER TABLE engagement_points ADD COLUMN IF NOT EXISTS student_id INTEGER REFERENCES users (id) ON DELETE SET NULL",
+    # CONCURRENTLY would need autocommit; the table is locked only for the build
+    "CREATE INDEX IF NOT EXISTS idx_engagement_points_session_student_ts ON engagement_points (session_id, student_id, timestamp)",
+]
+
+SQLITE_COMMANDS = [
+    "ALTER TABLE engagement_points ADD COLUMN student_id INTEGER REFERENCES users (id) ON DELETE SET NULL",
+    "CREATE INDEX IF NOT EXISTS idx_engagement_points_session_student_ts ON engagement_points (session_id, student_id, timestamp)",
+]
+
+
+def update_database():
+    try:
+        inspector = inspect(engine)
+        if "engagement_points" not in inspector.get_table_names():
+            print("✅ engagement_points does not exist yet - create_all will build the new layout")
+            return
+
+        columns = [c["name"] for c in inspector.get_columns("engagement_points")]
+        print(f"📊 Updating engagement_points on {engine.dialect.name}")
+        print(f"Existing columns: {columns}")
+        print("=" * 50)
+
+        if engine.dialect.name == "postgresql":
+            commands = POSTGRES_COMMANDS
+        elif "student_id" in columns:
+            # SQLite has no ADD COLUMN IF NOT EXISTS
+            commands = SQLITE_COMMANDS[1:]
+        else:
+            commands = SQLITE_COMMANDS
+
+        with engine.begin() as conn:
+            for sql in commands:
+                conn.execute(text(sql))
+                print(f"✅ {' '.join(sql.split())[:70]}...")
+
+        print("=" * 50)
+        print("✅ Database update complete!")
+
+    except Exception as e:
+        print(f"❌ Error updating database: {e}")
+
+
+if __name__ == "__main__":
+    update_database()
@@ -0,0 +1,44 @@
+# backend/add_engagement_rollups.py
+"""
+Create engagement_rollups and backfill it from existing points.
+
+New points are folded into the rollups at write time
+(ingest_queue.write_points); this script covers the history.
+
+Run once against the configured DATABASE_URL:
+    python add_engagement_rollups.py
+"""
+from sqlalchemy import select
+
+from database import engine
+from engagement_rollups import rebuild_rollups
+from models import EngagementRollup, EngagementSession
+
+
+def update_database():
+    try:
+        EngagementRollup.__table__.create(bind=engine, checkfirst=True)
+        print("✅ engagement_rollups table ready")
+        print("=" * 50)
+
+        with engine.connect() as conn:
+            session_ids = conn.execute(select(EngagementSession.id).order_by(EngagementSession.id)).scalars().all()
+
+        total = 0
+        for session_id in session_ids:
+            # One transaction per session keeps locks short
+            with engine.begin() as conn:
+                count = rebuild_rollups(conn, session_id)
+            total += count
+            if count:
+                print(f"✅ Session {session_id}: {count} points rolled up")
+
+        print("=" * 50)
+        print(f"✅ Backfill complete! {len(session_ids)} sessions, {total} points")
+
+    except Exception as e:
+        print(f"❌ Error updating database: {e}")
+
+
+if __name__ == "__main__":
+    update_database()
@@ -0,0 +1,63 @@
+# backend/add_session_point_count.py
+"""
+Add engagement_sessions.total_points (point count frozen at session end).
+
+It is part of the ETag of ended-session series/analytics/report
+responses (http_cache). New sessions get it from end_session / the
+watchdog; this script backfills sessions that have already ended.
+
+Databases migrated with add_analytics_columns.py already have the
+column (DEFAULT 0) - it is re-counted here as well.
+
+Run once against the configured DATABASE_URL:
+    python add_session_point_count.py
+"""
+from sqlalchemy import inspect, text
+
+from database import engine
+
+ADD_COLUMN = {
+    "postgresql": "ALTER TABLE engagement_sessions ADD COLUMN IF NOT EXISTS total_points INTEGER",
+    "sqlite": "ALTER TABLE engagement_sessions ADD COLUMN total_points INTEGER",
+}
+
+BACKFILL = """
+    UPDATE engagement_sessions
+    SET total_points = (
+        SELECT count(*) FROM engagement_points
+        WHERE engagement_points.session_id = engagement_sessions.id
+    )
+    WHERE ended_at IS NOT NULL
+"""
+
+
+def update_database():
+    try:
+        inspector = inspect(engine)
+        if "engagement_sessions" not in inspector.get_table_names():
+            print("✅ engagement_sessions does not exist yet - create_all will build the new layout")
+            return
+
+        columns = [c["name"] for c in inspector.get_columns("engagement_sessions")]
+        print(f"📊 Updating engagement_sessions on {engine.dialect.name}")
+        print("=" * 50)
+
+        with engine.begin() as conn:
+            if "total_points" not in columns:
+                conn.execute(text(ADD_COLUMN.get(engine.dialect.name, ADD_COLUMN["sqlite"])))
+                print("✅ Added total_points")
+            else:
+                print("⚠️  total_points already exists")
+
+            result = conn.execute(text(BACKFILL))
+            print(f"✅ Backfilled {result.rowcount} ended sessions")
+
+        print("=" * 50)
+        print("✅ Database update complete!")
+
+    except Exception as e:
+        print(f"❌ Error updating database: {e}")
+
+
+if __name__ == "__main__":
+    update_database()
@@ -1,16 +1,217 @@
 """
 Analytics computation engine - pure logic, no DB writes or file I/O
 Combines existing attention metrics with engagement timeline analysis
+
+The metrics are computed on NumPy arrays by analytics_engine; the
+functions here take {timestamp, score} dicts or an EngagementSeries
+(epoch-ms arrays straight from SQL), and shape the results (same output as the original per-point loops, except that
+find_peak_periods merges overlapping windows into one period).
+get_comprehensive_analytics does it all in one fused pass.
+
+With an EngagementSeries no timestamp is parsed; ISO strings are only
+made for the timestamps that appear in the results.
 """
 import numpy as np
-import statistics
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional, Union
+
+from analytics_engine import (
+    FOCUS_THRESHOLD,
+    PEAK_THRESHOLD,
+    analyze,
+    attention_score,
+    basic_stats,
+    distribution_counts,
+    dropoff_indices,
+    duration_seconds,
+    focus_count,
+    py_sum,
+    run_bounds,
+    score_drops,
+    spike_indices,
+    sustained_runs,
+    peak_intervals,
+    volatility,
+)
+from engagement_series import EngagementSeries
+
+# {timestamp, score} dicts, or the same points as epoch-ms arrays
+Points = Union[List[Dict], EngagementSeries]
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _scores(points: Points) -> np.ndarray:
+    """Scores of the points that have one."""
+    if isinstance(points, EngagementSeries):
+        return points.score
+    return np.array([p["score"] for p in points if "score" in p], dtype=np.float64)
+
+
+def _all_scores(points: Points) -> np.ndarray:
+    """One score per point (missing = 0)."""
+    if isinstance(points, EngagementSeries):
+        return points.score
+    return np.fromiter((p.get("score", 0) for p in points), dtype=np.float64, count=len(points))
+
+
+def _score_arrays(points: Points) -> tuple:
+    """
+    One pass over the dicts: (scores, present).
+
+    scores has one entry per point (missing = 0); present marks the
+    points that have a score, or is None when all of them do.
+    """
+    if isinstance(points, EngagementSeries):
+        return points.score, None
+    scores = np.fromiter((p.get("score", np.nan) for p in points), dtype=np.float64, count=len(points))
+    if not np.isnan(scores).any():
+        return scores, None
+    # Missing, or an actual NaN score: tell them apart
+    present = np.fromiter(("score" in p for p in points), dtype=bool, count=len(points))
+    return np.where(present, scores, 0.0), present
+
+
+def _timestamps(points: Points, indices) -> tuple:
+    """
+    Parse the ISO timestamps of the given points.
+
+    Returns (ts_us, ts_kind) over all points; only 'indices' are filled.
+    ts_kind: 0 = missing/unparseable, 1 = naive, 2 = timezone-aware
+    (naive and aware can't be subtracted).
+    """
+    if isinstance(points, EngagementSeries):
+        # Epoch ms from SQL: every timestamp valid, UTC
+        return points.t_us, np.full(len(points), 2, dtype=np.int8)
+    ts_us = np.zeros(len(points), dtype=np.int64)
+    ts_kind = np.zeros(len(points), dtype=np.int8)
+    for i in indices:
+        try:
+            ts = datetime.fromisoformat(points[i].get("timestamp", ""))
+        except Exception:
+            continue
+        if ts.tzinfo is None:
+            ts_us[i] = (ts - _EPOCH) // _MICROSECOND
+            ts_kind[i] = 1
+        else:
+            ts_us[i] = (ts - _EPOCH_UTC) // _MICROSECOND
+            ts_kind[i] = 2
+    return ts_us, ts_kind
+
+
+def _timestamp_strings(points: Points, indices) -> List[str]:
+    """ISO timestamp strings of the given points (series: formatted in one call)."""
+    if isinstance(points, EngagementSeries):
+        return points.iso(indices)
+    return [points[i].get("timestamp", "") for i in indices]
+
+
+# ========== RESULT SHAPING (engine arrays -> dicts) ==========
+
+def _spike_dicts(points: Points, idx: np.ndarray, drops: np.ndarray, scores: np.ndarray) -> List[Dict]:
+    return [
+        {
+            "timestamp": timestamp,
+            "drop": round(drop, 2),
+            "severity": "high" if drop >= 0.5 else "medium",
+            "from_score": round(previous_score, 2),
+            "to_score": round(current_score, 2),
+        }
+        for timestamp, drop, previous_score, current_score in zip(
+            _timestamp_strings(points, idx.tolist()), drops[idx - 1].tolist(), scores[idx - 1].tolist(), scores[idx].tolist()
+        )
+    ]
+
+
+def _dropoff_dicts(points: Points, idx: np.ndarray, drops: np.ndarray, scores: np.ndarray) -> List[Dict]:
+    return [
+        {
+            'timestamp': timestamp,
+            'from_score': round(prev_score, 3),
+            'to_score': round(curr_score, 3),
+            'drop': round(drop, 3)
+        }
+        for timestamp, drop, prev_score, curr_score in zip(
+            _timestamp_strings(points, idx.tolist()), drops[idx - 1].tolist(), scores[idx - 1].tolist(), scores[idx].tolist()
+        )
+    ]
+
+
+def _peak_dicts(points: Points, peaks) -> List[Dict]:
+    starts, ends = peaks[0].tolist(), peaks[1].tolist()
+    start_times = _timestamp_strings(points, starts)
+    end_times = _timestamp_strings(points, [end - 1 for end in ends])
+    return [
+        {
+            'start_idx': start,
+            'end_idx': end,
+            'avg_engagement': round(interval_avg, 3),
+            'peak_engagement': round(best_window_avg, 3),
+            'points_count': end - start,
+            'start_time': start_time,
+            'end_time': end_time,
+        }
+        for start, end, interval_avg, best_window_avg, start_time, end_time in zip(
+            starts, ends, peaks[2].tolist(), peaks[3].tolist(), start_times, end_times
+        )
+    ]
+
+
+def _period_dicts(points: Points, scores: np.ndarray, runs) -> List[Dict]:
+    starts = runs[0].tolist()
+    periods = []
+    for start, timestamp, end, is_high, duration in zip(
+        starts, _timestamp_strings(points, starts), *(a.tolist() for a in runs[1:])
+    ):
+        period_scores = scores[start:end + 1]
+        periods.append({
+            "type": "high" if is_high else "low",
+            "start": timestamp,
+            "duration_sec": duration,
+            "avg_engagement": round(py_sum(period_scores) / len(period_scores), 2),
+            "points_count": len(period_scores),
+        })
+    return periods
+
+
+def _warn_unmeasurable(count: int):
+    if count:
+        print(f"⚠️ Period parsing error: {count} periods with missing or mixed (naive/aware) timestamps skipped")
+
+
+def _distribution_dict(counts, total: int) -> Dict[str, float]:
+    if total == 0:
+        return {
+            'low_engagement': 0.0,
+            'medium_engagement': 0.0,
+            'high_engagement': 0.0,
+        }
+    
+    low, medium, high = (int(c) / total for c in counts)
+    
+    return {
+        'low_engagement': round(low, 3),
+        'medium_engagement': round(medium, 3),
+        'high_engagement': round(high, 3),
+    }
+
+
+def _duration_dict(duration_sec: int) -> Dict[str, Any]:
+    duration_min = duration_sec // 60
+    duration_sec_remainder = duration_sec % 60
+    
+    return {
+        'duration_seconds': duration_sec,
+        'duration_minutes': duration_min,
+        'duration_formatted': f'{duration_min}m {duration_sec_remainder}s'
+    }
 
 
 # ========== EXISTING FUNCTIONS (YOUR ORIGINAL CODE) ==========
 
-def calculate_attention_score(points: List[Dict]) -> int:
+def calculate_attention_score(points: Points) -> int:
     """
     Convert engagement data to single 0-100 score.
     
@@ -23,23 +224,10 @@ def calculate_attention_score(points: List[Dict]) -> int:
     if not points:
         return 0
     
-    scores = [p.get("score", 0) for p in points if "score" in p]
-    if not scores:
-        return 0
-    
-    avg = sum(scores) / len(scores)
-    
-    if avg >= 0.8:
-        return 100
-    elif avg >= 0.6:
-        return 75
-    elif avg >= 0.4:
-        return 50
-    else:
-        return 25
+    return attention_score(_scores(points))
 
 
-def calculate_focus_time_percentage(points: List[Dict]) -> float:
+def calculate_focus_time_percentage(points: Points) -> float:
     """
     Percentage of time with engagement > 0.7 (focused).
     
@@ -48,15 +236,14 @@ def calculate_focus_time_percentage(points: List[Dict]) -> float:
     if not points:
         return 0.0
     
-    scores = [p.get("score", 0) for p in points if "score" in p]
-    if not scores:
+    scores = _scores(points)
+    if len(scores) == 0:
         return 0.0
     
-    focused_count = sum(1 for s in scores if s > 0.7)
-    return round((focused_count / len(scores)) * 100, 1)
+    return round((focus_count(scores) / len(scores)) * 100, 1)
 
 
-def detect_distraction_spikes(points: List[Dict], threshold: float = 0.3) -> List[Dict]:
+def detect_distraction_spikes(points: Points, threshold: float = 0.3) -> List[Dict]:
     """
     Find sudden drops in engagement (distraction events).
     
@@ -65,30 +252,14 @@ def detect_distraction_spikes(points: List[Dict], threshold: float = 0.3) -> Lis
     if len(points) < 2:
         return []
     
-    spikes = []
+    scores = _all_scores(points)
+    drops = score_drops(scores)
     
-    for i in range(1, len(points)):
-        current_score = points[i].get("score", 0)
-        previous_score = points[i-1].get("score", 0)
-        
-        drop = previous_score - current_score
-        
-        # Flag significant drops
-        if drop >= threshold:
-            severity = "high" if drop >= 0.5 else "medium"
-            
-            spikes.append({
-                "timestamp": points[i].get("timestamp", ""),
-                "drop": round(drop, 2),
-                "severity": severity,
-                "from_score": round(previous_score, 2),
-                "to_score": round(current_score, 2),
-            })
-    
-    return spikes
-
-
-def calculate_volatility(points: List[Dict]) -> float:
+    # Flag significant drops
+    return _spike_dicts(points, spike_indices(drops, threshold), drops, scores)
+
+
+def calculate_volatility(points: Points) -> float:
     """
     Standard deviation of engagement scores.
     
@@ -100,15 +271,14 @@ def calculate_volatility(points: List[Dict]) -> float:
     if len(points) < 2:
         return 0.0
     
-    scores = [p.get("score", 0) for p in points if "score" in p]
+    scores = _scores(points)
     if len(scores) < 2:
         return 0.0
     
-    std_dev = statistics.stdev(scores)
-    return round(std_dev, 3)
+    return round(volatility(scores), 3)
 
 
-def find_sustained_periods(points: List[Dict], min_duration_sec: int = 60) -> List[Dict]:
+def find_sustained_periods(points: Points, min_duration_sec: int = 60) -> List[Dict]:
     """
     Find periods of sustained high/low engagement.
     
@@ -117,106 +287,26 @@ def find_sustained_periods(points: List[Dict], min_duration_sec: int = 60) -> Li
     if len(points) < 2:
         return []
     
-    periods = []
-    current_period = None
-    period_scores = []
+    scores = _all_scores(points)
     
-    for i, point in enumerate(points):
-        score = point.get("score", 0)
-        timestamp = point.get("timestamp", "")
-        
-        # Classify as high (>0.7) or low (<=0.7)
-        is_high = score > 0.7
-        
-        if current_period is None:
-            # Start new period
-            current_period = {
-                "type": "high" if is_high else "low",
-                "start": timestamp,
-                "start_index": i,
-            }
-            period_scores = [score]
-        elif (is_high and current_period["type"] == "high") or (not is_high and current_period["type"] == "low"):
-            # Continue current period
-            period_scores.append(score)
-        else:
-            # Period changed, save current and start new
-            if current_period and period_scores:
-                try:
-                    start_time = datetime.fromisoformat(current_period["start"])
-                    end_time = datetime.fromisoformat(points[i-1].get("timestamp", ""))
-                    duration = int((end_time - start_time).total_seconds())
-                    
-                    if duration >= min_duration_sec:
-                        periods.append({
-                            "type": current_period["type"],
-                            "start": current_period["start"],
-                            "duration_sec": duration,
-                            "avg_engagement": round(sum(period_scores) / len(period_scores), 2),
-                            "points_count": len(period_scores),
-                        })
-                except Exception as e:
-                    print(f"⚠️ Period parsing error: {e}")
-            
-            # Start new period
-            current_period = {
-                "type": "high" if is_high else "low",
-                "start": timestamp,
-                "start_index": i,
-            }
-            period_scores = [score]
-    
-    # Don't forget the last period
-    if current_period and period_scores:
-        try:
-            start_time = datetime.fromisoformat(current_period["start"])
-            end_time = datetime.fromisoformat(points[-1].get("timestamp", ""))
-            duration = int((end_time - start_time).total_seconds())
-            
-            if duration >= min_duration_sec:
-                periods.append({
-                    "type": current_period["type"],
-                    "start": current_period["start"],
-                    "duration_sec": duration,
-                    "avg_engagement": round(sum(period_scores) / len(period_scores), 2),
-                    "points_count": len(period_scores),
-                })
-        except Exception as e:
-            print(f"⚠️ Last period parsing error: {e}")
+    # Only the first/last timestamp of each high (>0.7) / low run is needed
+    starts, ends = run_bounds(scores > FOCUS_THRESHOLD)
+    ts_us, ts_kind = _timestamps(points, np.union1d(starts, ends - 1).tolist())
+    first, last = ts_kind[starts], ts_kind[ends - 1]
+    _warn_unmeasurable(int(np.count_nonzero((first == 0) | (first != last))))
     
-    return periods
+    runs = sustained_runs(scores, ts_us, min_duration_sec, ts_kind=ts_kind)
+    return _period_dicts(points, scores, runs)
 
 
 # ========== NEW FUNCTIONS (FOR TIMELINE ANALYSIS) ==========
 
-def calculate_basic_stats(points: List[Dict]) -> Dict[str, float]:
+def calculate_basic_stats(points: Points) -> Dict[str, float]:
     """Calculate mean, std, min, max of engagement scores."""
-    if not points:
-        return {
-            'avg_score': 0.0,
-            'std_score': 0.0,
-            'min_score': 0.0,
-            'max_score': 0.0,
-        }
-    
-    scores = [p.get('score', 0) for p in points if 'score' in p]
-    if not scores:
-        return {
-            'avg_score': 0.0,
-            'std_score': 0.0,
-            'min_score': 0.0,
-            'max_score': 0.0,
-        }
-    
-    return {
-        'avg_score': float(np.mean(scores)),
-        'std_score': float(np.std(scores)),
-        'min_score': float(np.min(scores)),
-        'max_score': float(np.max(scores)),
-    }
+    return basic_stats(_scores(points))
 
 
-def detect_dropoffs(points: List[Dict], threshold: float = 0.3) -> List[Dict]:
+def detect_dropoffs(points: Points, threshold: float = 0.3) -> List[Dict]:
     """
     Find moments where engagement dropped significantly.
     (Similar to detect_distraction_spikes but more detailed)
@@ -231,58 +321,37 @@ def detect_dropoffs(points: List[Dict], threshold: float = 0.3) -> List[Dict]:
     if len(points) < 2:
         return []
     
-    dropoffs = []
-    for i in range(1, len(points)):
-        prev_score = points[i-1].get('score', 0)
-        curr_score = points[i].get('score', 0)
-        
-        drop = prev_score - curr_score
-        if drop > threshold:
-            dropoffs.append({
-                'timestamp': points[i].get('timestamp', ''),
-                'from_score': round(prev_score, 3),
-                'to_score': round(curr_score, 3),
-                'drop': round(drop, 3)
-            })
+    scores = _all_scores(points)
+    drops = score_drops(scores)
     
-    return sorted(dropoffs, key=lambda x: x['drop'], reverse=True)
+    # Largest drop first
+    return _dropoff_dicts(points, dropoff_indices(drops, threshold), drops, scores)
 
 
-def find_peak_periods(points: List[Dict], window: int = 5) -> List[Dict]:
+def find_peak_periods(points: Points, window: int = 5, threshold: float = PEAK_THRESHOLD) -> List[Dict]:
     """
     Find periods of high engagement.
     
+    Every stretch where 'window'-point averages stay above threshold is
+    one period (overlapping windows are merged), so a long high stretch
+    gives one entry, not one per window.
+    
     Args:
         points: List of {timestamp, score} dicts
         window: Window size for averaging (default 5 points)
+        threshold: Minimum window average (default 0.75)
     
     Returns:
-        List of peak periods
+        List of peak periods, highest average first
     """
     if len(points) < window:
         return []
     
-    scores = np.array([p.get('score', 0) for p in points if 'score' in p])
-    if len(scores) < window:
-        return []
-    
-    peaks = []
-    
-    for i in range(len(scores) - window):
-        window_avg = np.mean(scores[i:i+window])
-        if window_avg > 0.75:  # High engagement threshold
-            peaks.append({
-                'start_idx': i,
-                'end_idx': i + window,
-                'avg_engagement': round(float(window_avg), 3),
-                'start_time': points[i].get('timestamp', ''),
-                'end_time': points[i+window-1].get('timestamp', ''),
-            })
-    
-    return sorted(peaks, key=lambda x: x['avg_engagement'], reverse=True)
+    scores = _scores(points)
+    return _peak_dicts(points, peak_intervals(scores, window, threshold))
 
 
-def calculate_engagement_distribution(points: List[Dict]) -> Dict[str, float]:
+def calculate_engagement_distribution(points: Points) -> Dict[str, float]:
     """
     Calculate percentage of time in each engagement level.
     
@@ -291,68 +360,31 @@ def calculate_engagement_distribution(points: List[Dict]) -> Dict[str, float]:
         - Medium: 0.33 - 0.67
         - High: >= 0.67
     """
-    if not points:
-        return {
-            'low_engagement': 0.0,
-            'medium_engagement': 0.0,
-            'high_engagement': 0.0,
-        }
-    
-    scores = [p.get('score', 0) for p in points if 'score' in p]
-    if not scores:
-        return {
-            'low_engagement': 0.0,
-            'medium_engagement': 0.0,
-            'high_engagement': 0.0,
-        }
-    
-    total = len(scores)
-    
-    low = sum(1 for s in scores if s < 0.33) / total
-    medium = sum(1 for s in scores if 0.33 <= s < 0.67) / total
-    high = sum(1 for s in scores if s >= 0.67) / total
-    
-    return {
-        'low_engagement': round(low, 3),
-        'medium_engagement': round(medium, 3),
-        'high_engagement': round(high, 3),
-    }
+    scores = _scores(points)
+    return _distribution_dict(distribution_counts(scores), len(scores))
 
 
-def calculate_duration(points: List[Dict]) -> Dict[str, Any]:
+def calculate_duration(points: Points) -> Dict[str, Any]:
     """Calculate session duration from first and last timestamp."""
     if not points:
-        return {
-            'duration_seconds': 0,
-            'duration_minutes': 0,
-            'duration_formatted': '0m 0s'
-        }
+        return _duration_dict(0)
+    
+    if isinstance(points, EngagementSeries):
+        return _duration_dict(duration_seconds(points.t_us))
     
     try:
         start = datetime.fromisoformat(points[0].get('timestamp', ''))
         end = datetime.fromisoformat(points[-1].get('timestamp', ''))
         
-        duration_sec = int((end - start).total_seconds())
-        duration_min = duration_sec // 60
-        duration_sec_remainder = duration_sec % 60
-        
-        return {
-            'duration_seconds': duration_sec,
-            'duration_minutes': duration_min,
-            'duration_formatted': f'{duration_min}m {duration_sec_remainder}s'
-        }
+        return _duration_dict(int((end - start).total_seconds()))
     except Exception as e:
         print(f"❌ Duration calculation error: {e}")
-        return {
-            'duration_seconds': 0,
-            'duration_minutes': 0,
-            'duration_formatted': '0m 0s'
-        }
+        return _duration_dict(0)
 
 
 # ========== MAIN ENTRY POINTS ==========
 
-def get_all_advanced_analytics(points: List[Dict]) -> Dict:
+def get_all_advanced_analytics(points: Points) -> Dict:
     """
     Calculate all advanced analytics in one call.
     
@@ -368,48 +400,64 @@ def get_all_advanced_analytics(points: List[Dict]) -> Dict:
     }
 
 
-def get_comprehensive_analytics(points_data: List[Dict]) -> Dict[str, Any]:
+def get_comprehensive_analytics(points_data: Points) -> Dict[str, Any]:
     """
     Generate comprehensive analytics summary.
     
     This is a NEW entry point that uses BOTH old and new analytics.
     
+    ✅ Fused: the dicts are converted to arrays once, then one diff, one
+    classification and one run-length pass (analytics_engine.analyze)
+    give every metric. Only the timestamps at period boundaries are parsed.
+    Same output as calling the individual functions.
+    
     Returns:
-        Complete analytics dict with timeline analysis + attention metrics
+        Complete analytics dict with timeline analysis + attention metrics.
+        'timeline' is the input as given: for an EngagementSeries, turn it
+        into JSON with series.to_points() (or binary columns) when responding.
     """
-    # Basic stats (new)
-    basic = calculate_basic_stats(points_data)
-    
-    # Timeline analysis (new)
-    dropoffs = detect_dropoffs(points_data)
-    peaks = find_peak_periods(points_data)
-    distribution = calculate_engagement_distribution(points_data)
-    duration = calculate_duration(points_data)
-    
-    # Attention metrics (existing)
-    attention = calculate_attention_score(points_data)
-    focus_pct = calculate_focus_time_percentage(points_data)
-    volatility = calculate_volatility(points_data)
-    sustained = find_sustained_periods(points_data)
-    distraction_spikes = detect_distraction_spikes(points_data)
+    scores, present = _score_arrays(points_data)
+    result = analyze(
+        scores,
+        lambda indices: _timestamps(points_data, indices),
+        present,
+        top_dropoffs=5,
+    )
+    count = result["count"]
+    drops = result["drops"]
+    spikes = result["spikes"]
+    
+    if result["duration_seconds"] is None:
+        print("❌ Duration calculation error: first/last timestamp missing or not comparable")
+        duration = _duration_dict(0)
+    else:
+        duration = _duration_dict(result["duration_seconds"])
+    
+    if result["sustained"] is None:
+        sustained = []
+    else:
+        _warn_unmeasurable(result["unmeasurable_runs"])
+        sustained = _period_dicts(points_data, scores, result["sustained"])
+    
+    peaks = result["peaks"]
     
     return {
         'summary': {
-            **basic,
+            **result["basic"],
             'total_points': len(points_data),
             **duration,
-            'attention_score': attention,
-            'focus_time_percentage': focus_pct,
-            'volatility': volatility,
+            'attention_score': result["attention_score"],
+            'focus_time_percentage': round((result["focus_count"] / count) * 100, 1) if count else 0.0,
+            'volatility': round(result["volatility"], 3),
         },
-        'distribution': distribution,
+        'distribution': _distribution_dict(result["distribution"], count),
         'critical_moments': {
-            'dropoffs': dropoffs[:5],  # Top 5 dropoffs
-            'peak_periods': peaks[:3],  # Top 3 peaks
-            'distraction_spikes': distraction_spikes[:5],  # Top 5 spikes
-            'total_dropoffs': len(dropoffs),
-            'total_peaks': len(peaks),
-            'total_spikes': len(distraction_spikes),
+            'dropoffs': _dropoff_dicts(points_data, result["dropoffs"], drops, scores),  # Top 5 dropoffs
+            'peak_periods': _peak_dicts(points_data, [a[:3] for a in peaks]),  # Top 3 peaks
+            'distraction_spikes': _spike_dicts(points_data, spikes[:5], drops, scores),  # Top 5 spikes
+            'total_dropoffs': result["dropoff_count"],
+            'total_peaks': len(peaks[0]),
+            'total_spikes': len(spikes),
         },
         'sustained_engagement': {
             'sustained_periods': sustained,
@@ -0,0 +1,652 @@
+# backend/analytics_accumulator.py
+"""
+Online session analytics, updated at ingest in O(1) per point.
+
+get_comprehensive_analytics reads every point of a session after it has
+ended. A SessionAccumulator keeps the same metrics current while points
+arrive (_store_points), so a report's analytics exist as soon as
+end_session commits, and live dashboards can show them mid-session:
+- Welford running mean / variance, min / max
+- Points per level (low / medium / high / focused): distribution, focus
+  time, attention score
+- Previous score: distraction spikes (count + first 5), dropoffs
+  (count + top 5 in a min-heap)
+- Current high/low run (start, last timestamp, count, sum): sustained periods
+- Last PEAK_WINDOW scores and the open peak interval: peak periods
+  (count + top 3)
+
+Order: spikes, dropoffs, runs and peaks follow ingest order (each batch
+sorted by timestamp). That is the timestamp order of the report only
+when one process received every point, each later than the previous one
+(in_order) - not with several API processes, nor with devices whose
+batches interleave out of order.
+
+Process-local like live_stats, but checkpointed: every
+ANALYTICS_CHECKPOINT_SECONDS each API process upserts the state of its
+sessions into engagement_analytics, one row per (session, process), and
+readers merge the rows (Chan's parallel variance for mean/std).
+end_session writes this process's state in its own transaction; other
+processes write theirs when they notice the end (watchdog reconcile).
+
+Reports (report_analytics) use the online analytics only when they are
+exact: a single in-order row covering every fetched point. Otherwise
+they recompute from the stored points as before. Live views
+(/live/analytics) merge whatever there is and say whether it is ordered.
+"""
+import heapq
+import json
+import math
+import os
+import socket
+import sys
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from bisect import bisect_right
+
+from sqlalchemy import select
+
+from analytics import _distribution_dict, _duration_dict, get_comprehensive_analytics
+from analytics_engine import (
+    DROP_THRESHOLD,
+    FOCUS_THRESHOLD,
+    LEVEL_EDGES,
+    LOW,
+    MEDIUM,
+    HIGH,
+    FOCUSED,
+    PEAK_THRESHOLD,
+    PEAK_TIE_TOLERANCE,
+    attention_from_average,
+    basic_stats,
+    duration_seconds,
+    volatility,
+)
+from database import engine
+from engagement_series import EngagementSeries, iso_ms
+from live_buffer import to_epoch_us
+from models import EngagementAnalyticsState
+
+ANALYTICS_ACCUMULATOR_ENABLED = os.getenv("ANALYTICS_ACCUMULATOR_ENABLED", "true") == "true"
+ANALYTICS_CHECKPOINT_SECONDS = float(os.getenv("ANALYTICS_CHECKPOINT_SECONDS", "30"))
+
+# As get_comprehensive_analytics
+SUSTAINED_MIN_SECONDS = 60
+PEAK_WINDOW = 5
+TOP_DROPOFFS = 5
+TOP_PEAKS = 3
+FIRST_SPIKES = 5
+# Ingest timestamps (truncated to ms) vs fetch_series' (SQLite rounds): runs this
+# much shorter than SUSTAINED_MIN_SECONDS are kept and measured on the series
+TIMESTAMP_SLACK_MS = 2
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+STATE_TABLE = EngagementAnalyticsState.__table__
+
+_LEVEL_EDGES = LEVEL_EDGES.tolist()
+COMPENSATED_SUM = sys.version_info >= (3, 12)
+
+
+class SessionAccumulator:
+    """Running analytics of one session (not thread-safe; AnalyticsAccumulators locks)."""
+
+    def __init__(self):
+        # Welford
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        # Sum in the order of Python's sum() (attention score, as analytics_engine.py_sum)
+        self.total = 0.0
+        self.total_compensation = 0.0
+        self.levels = [0, 0, 0, 0]
+        self.first_ms = None
+        self.last_ms = None
+        # Every point later than the previous one: ingest order = timestamp order
+        self.in_order = True
+
+        # Drops: previous point, spikes (first ones), dropoffs (min-heap of the top ones)
+        self.prev_score = None
+        self.spikes_total = 0
+        self.spikes = []        # [ts_ms, drop, from, to, index]
+        self.dropoffs_total = 0
+        self.dropoffs = []      # heap of [rounded drop, -index, index, ts_ms, drop, from, to]
+
+        # High (> focus threshold) / low run in progress, finished sustained periods
+        self.run_high = None
+        self.run_start_ms = None
+        self.run_last_ms = None
+        self.run_start = None
+        self.run_count = 0
+        self.run_sum = 0.0
+        self.run_compensation = 0.0
+        self.periods = []       # [is_high, start_ms, elapsed_ms, sum, count, start, last]
+
+        # Peaks: last PEAK_WINDOW points, running sum, open interval, top finished ones
+        self.window = deque(maxlen=PEAK_WINDOW)   # (ts_ms, score, running sum before it)
+        self.cum = 0.0
+        self.peak = None        # [start, last_window_start, start_ms, end_ms, cum_start, cum_end, best]
+        self.peaks_total = 0
+        self.peaks = []         # [rounded avg, start, end, avg, best, start_ms, end_ms], best first
+
+    # ---------- update ----------
+
+    def add(self, ts_ms: int, score: float):
+        index = self.count
+        self.count += 1
+        delta = score - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (score - self.mean)
+        self.min = score if self.min is None else min(self.min, score)
+        self.max = score if self.max is None else max(self.max, score)
+        self.total, self.total_compensation = _add(self.total, self.total_compensation, score)
+        self.levels[bisect_right(_LEVEL_EDGES, score)] += 1
+        if self.last_ms is not None and ts_ms <= self.last_ms:
+            self.in_order = False
+        self.first_ms = ts_ms if self.first_ms is None else min(self.first_ms, ts_ms)
+        self.last_ms = ts_ms if self.last_ms is None else max(self.last_ms, ts_ms)
+
+        if self.prev_score is not None:
+            self._drop(index, ts_ms, self.prev_score, score)
+        self.prev_score = score
+
+        self._run(index, ts_ms, score)
+        self._peak(index, ts_ms, score)
+
+    def _drop(self, index: int, ts_ms: int, previous: float, score: float):
+        drop = previous - score
+        if drop >= DROP_THRESHOLD:
+            self.spikes_total += 1
+            if len(self.spikes) < FIRST_SPIKES:
+                self.spikes.append([ts_ms, drop, previous, score, index])
+        if drop > DROP_THRESHOLD:
+            self.dropoffs_total += 1
+            # Ranked like detect_dropoffs: rounded drop, earlier first on ties
+            item = [round(drop, 3), -index, index, ts_ms, drop, previous, score]
+            if len(self.dropoffs) < TOP_DROPOFFS:
+                heapq.heappush(self.dropoffs, item)
+            else:
+                heapq.heappushpop(self.dropoffs, item)
+
+    def _run(self, index: int, ts_ms: int, score: float):
+        high = score > FOCUS_THRESHOLD
+        if high != self.run_high:
+            self._finish_run()
+            self.run_high = high
+            self.run_start_ms = ts_ms
+            self.run_start = index
+            self.run_count = 0
+            self.run_sum = 0.0
+            self.run_compensation = 0.0
+        self.run_last_ms = ts_ms
+        self.run_count += 1
+        self.run_sum, self.run_compensation = _add(self.run_sum, self.run_compensation, score)
+
+    def _finish_run(self):
+        if self.run_high is None:
+            return
+        elapsed = self.run_last_ms - self.run_start_ms
+        # Candidates a little short too: the report measures them on the fetched series
+        if elapsed >= SUSTAINED_MIN_SECONDS * 1000 - TIMESTAMP_SLACK_MS:
+            self.periods.append([
+                self.run_high, self.run_start_ms, elapsed, self.run_sum + self.run_compensation,
+                self.run_count, self.run_start, self.run_start + self.run_count - 1,
+            ])
+        self.run_high = None
+
+    def _peak(self, index: int, ts_ms: int, score: float):
+        self.window.append((ts_ms, score, self.cum))
+        self.cum += score
+        if len(self.window) < PEAK_WINDOW:
+            return
+        # Window mean from the running sum, near-ties from the window itself (as peak_intervals)
+        mean = (self.cum - self.window[0][2]) / PEAK_WINDOW
+        if abs(mean - PEAK_THRESHOLD) <= PEAK_TIE_TOLERANCE:
+            mean = sum(s for _, s, _ in self.window) / PEAK_WINDOW
+        if not mean > PEAK_THRESHOLD:
+            return
+
+        start = index - PEAK_WINDOW + 1
+        peak = self.peak
+        if peak is not None and start - peak[1] <= PEAK_WINDOW:
+            # Overlaps / touches the open interval (as peak_intervals merges)
+            peak[1] = start
+            peak[3] = ts_ms
+            peak[5] = self.cum
+            peak[6] = max(peak[6], mean)
+            return
+        self._finish_peak()
+        # Interval average from the running sum, like peak_intervals' cumsum
+        self.peak = [start, start, self.window[0][0], ts_ms, self.window[0][2], self.cum, mean]
+
+    def _finish_peak(self):
+        if self.peak is None:
+            return
+        start, last_start, start_ms, end_ms, cum_start, cum_end, best = self.peak
+        end = last_start + PEAK_WINDOW
+        avg = (cum_end - cum_start) / (end - start)
+        self.peaks_total += 1
+        self.peaks.append([round(avg, 3), start, end, avg, best, start_ms, end_ms])
+        self.peaks.sort(key=lambda p: (-p[0], p[1]))
+        del self.peaks[TOP_PEAKS:]
+        self.peak = None
+
+    def close(self):
+        """Count the run and peak interval in progress (session over, or a snapshot copy)."""
+        self._finish_run()
+        self._finish_peak()
+
+    # ---------- state ----------
+
+    def to_state(self) -> dict:
+        state = dict(self.__dict__)
+        state["window"] = list(self.window)
+        return state
+
+    @classmethod
+    def from_state(cls, state: dict) -> "SessionAccumulator":
+        acc = cls()
+        acc.__dict__.update(state)
+        acc.window = deque((tuple(p) for p in state["window"]), maxlen=PEAK_WINDOW)
+        return acc
+
+    def copy(self) -> "SessionAccumulator":
+        return SessionAccumulator.from_state(json.loads(json.dumps(self.to_state())))
+
+    @classmethod
+    def merge(cls, accumulators: list) -> "SessionAccumulator":
+        """
+        Closed accumulator combining several (one per API process).
+
+        Exact for counts, mean / variance, min / max and duration. The
+        sequence (spikes, dropoffs, periods, peaks) is only exact with a
+        single in-order source (in_order); otherwise each process's
+        ingest-order sequence is concatenated - an approximation for
+        live views, never served as a report.
+        """
+        merged = cls()
+        sources = 0
+        for acc in accumulators:
+            acc = acc.copy()
+            acc.close()
+            if acc.count == 0:
+                continue
+            sources += 1
+            merged.in_order = acc.in_order and sources == 1
+            n = merged.count + acc.count
+            delta = acc.mean - merged.mean
+            merged.m2 += acc.m2 + delta * delta * merged.count * acc.count / n
+            merged.mean += delta * acc.count / n
+            merged.count = n
+            merged.total += acc.total
+            merged.total_compensation += acc.total_compensation
+            merged.min = acc.min if merged.min is None else min(merged.min, acc.min)
+            merged.max = acc.max if merged.max is None else max(merged.max, acc.max)
+            merged.levels = [a + b for a, b in zip(merged.levels, acc.levels)]
+            merged.first_ms = acc.first_ms if merged.first_ms is None else min(merged.first_ms, acc.first_ms)
+            merged.last_ms = acc.last_ms if merged.last_ms is None else max(merged.last_ms, acc.last_ms)
+
+            merged.spikes_total += acc.spikes_total
+            merged.spikes = sorted(merged.spikes + acc.spikes)[:FIRST_SPIKES]
+            merged.dropoffs_total += acc.dropoffs_total
+            merged.dropoffs = heapq.nlargest(TOP_DROPOFFS, merged.dropoffs + acc.dropoffs)
+            heapq.heapify(merged.dropoffs)
+            merged.periods = sorted(merged.periods + acc.periods, key=lambda p: p[1])
+            merged.peaks_total += acc.peaks_total
+            merged.peaks = sorted(merged.peaks + acc.peaks, key=lambda p: (-p[0], p[1]))[:TOP_PEAKS]
+        return merged
+
+    # ---------- output ----------
+
+    def analytics(self, series: EngagementSeries = None) -> dict:
+        """
+        get_comprehensive_analytics' structure (without 'timeline') from a
+        closed accumulator. Timestamps: ISO UTC, millisecond precision.
+
+        series: the session's points as fetched for the report, only with
+        an in_order accumulator of exactly those points (point i = series
+        point i). Timestamps, durations and float statistics then come from
+        it, so the result equals get_comprehensive_analytics(series).
+        """
+        count = self.count
+        if series is not None:
+            scores = series.score
+            basic = basic_stats(scores)
+            std = volatility(scores)
+            duration = duration_seconds(series.t_us)
+            t_ms = series.t_ms
+        elif count == 0:
+            basic = {'avg_score': 0.0, 'std_score': 0.0, 'min_score': 0.0, 'max_score': 0.0}
+            std, duration = 0.0, 0
+        else:
+            basic = {
+                'avg_score': self.mean,
+                'std_score': math.sqrt(self.m2 / count),
+                'min_score': self.min,
+                'max_score': self.max,
+            }
+            std = math.sqrt(self.m2 / (count - 1)) if count >= 2 else 0.0
+            duration = int((self.last_ms - self.first_ms) / 1000)
+
+        # Sustained periods: elapsed time from the series when given (its millisecond rounding)
+        periods = []
+        for is_high, start_ms, elapsed, total, points, start, last in self.periods:
+            if series is not None:
+                start_ms, elapsed = int(t_ms[start]), int(t_ms[last] - t_ms[start])
+            if int(elapsed / 1000) >= SUSTAINED_MIN_SECONDS:
+                periods.append((is_high, start_ms, int(elapsed / 1000), total, points))
+
+        dropoffs = sorted(self.dropoffs, key=lambda d: (-d[0], d[2]))
+        if series is not None:
+            times = series.iso(
+                [d[2] for d in dropoffs]
+                + [s[4] for s in self.spikes]
+                + [i for p in self.peaks for i in (p[1], p[2] - 1)]
+            ) + iso_ms([p[1] for p in periods])
+        else:
+            times = iso_ms(
+                [d[3] for d in dropoffs]
+                + [s[0] for s in self.spikes]
+                + [t for p in self.peaks for t in (p[5], p[6])]
+                + [p[1] for p in periods]
+            )
+        dropoff_times = times[:len(dropoffs)]
+        spike_times = times[len(dropoffs):len(dropoffs) + len(self.spikes)]
+        peak_times = times[len(dropoffs) + len(self.spikes):len(times) - len(periods)]
+        period_times = times[len(times) - len(periods):]
+
+        periods = [
+            {
+                "type": "high" if is_high else "low",
+                "start": start,
+                "duration_sec": seconds,
+                "avg_engagement": round(total / points, 2),
+                "points_count": points,
+            }
+            for (is_high, _, seconds, total, points), start in zip(periods, period_times)
+        ]
+
+        return {
+            'summary': {
+                **basic,
+                'total_points': count,
+                **_duration_dict(duration),
+                'attention_score': attention_from_average((self.total + self.total_compensation) / count) if count else 0,
+                'focus_time_percentage': round((self.levels[FOCUSED] / count) * 100, 1) if count else 0.0,
+                'volatility': round(std, 3),
+            },
+            'distribution': _distribution_dict(
+                (self.levels[LOW], self.levels[MEDIUM], self.levels[HIGH] + self.levels[FOCUSED]), count
+            ),
+            'critical_moments': {
+                'dropoffs': [
+                    {
+                        'timestamp': timestamp,
+                        'from_score': round(prev_score, 3),
+                        'to_score': round(curr_score, 3),
+                        'drop': round(drop, 3),
+                    }
+                    for (_, _, _, _, drop, prev_score, curr_score), timestamp in zip(dropoffs, dropoff_times)
+                ],
+                'peak_periods': [
+                    {
+                        'start_idx': start,
+                        'end_idx': end,
+                        'avg_engagement': rounded,
+                        'peak_engagement': round(best, 3),
+                        'points_count': end - start,
+                        'start_time': peak_times[2 * i],
+                        'end_time': peak_times[2 * i + 1],
+                    }
+                    for i, (rounded, start, end, _, best, _, _) in enumerate(self.peaks)
+                ],
+                'distraction_spikes': [
+                    {
+                        "timestamp": timestamp,
+                        "drop": round(drop, 2),
+                        "severity": "high" if drop >= 0.5 else "medium",
+                        "from_score": round(previous_score, 2),
+                        "to_score": round(current_score, 2),
+                    }
+                    for (_, drop, previous_score, current_score, _), timestamp in zip(self.spikes, spike_times)
+                ],
+                'total_dropoffs': self.dropoffs_total,
+                'total_peaks': self.peaks_total,
+                'total_spikes': self.spikes_total,
+            },
+            'sustained_engagement': {
+                'sustained_periods': periods,
+                'high_focus_segments': [p for p in periods if p['type'] == 'high'],
+                'low_attention_segments': [p for p in periods if p['type'] == 'low'],
+            },
+            'computed_at': datetime.utcnow().isoformat(),
+        }
+
+
+def _add(total: float, compensation: float, score: float) -> tuple[float, float]:
+    """One step of Python's sum() of floats: (running sum, compensation)."""
+    result = total + score
+    if COMPENSATED_SUM:
+        # 3.12+ sum(): Neumaier compensation
+        if abs(total) >= abs(score):
+            compensation += (total - result) + score
+        else:
+            compensation += (score - result) + total
+    return result, compensation
+
+
+def report_analytics(accumulators: list, series: EngagementSeries) -> dict:
+    """
+    Report analytics of an ended session from its checkpoint rows.
+
+    Online only when they are exactly the fetched series: one row (one
+    API process ingested the session), every point later than the
+    previous one, same point count. Otherwise - several processes, devices
+    interleaving out of order, points lost in between - the sequence
+    (spikes, dropoffs, periods, peaks) of ingest order is not the one of
+    the series: get_comprehensive_analytics(series).
+    'timeline' is the series either way (graphs).
+    """
+    if len(accumulators) == 1:
+        acc = accumulators[0].copy()
+        acc.close()
+        if acc.in_order and acc.count == len(series):
+            analytics = acc.analytics(series)
+            analytics['timeline'] = series
+            return analytics
+    return get_comprehensive_analytics(series)
+
+
+class AnalyticsAccumulators:
+    def __init__(self, checkpoint_seconds: float = ANALYTICS_CHECKPOINT_SECONDS, worker: str = WORKER_ID):
+        self.checkpoint_seconds = checkpoint_seconds
+        self.worker = worker
+        self._sessions: dict[int, SessionAccumulator] = {}
+        self._dirty: set = set()
+        self._lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Metrics
+        self.points_total = 0
+        self.checkpoints = 0
+        self.rows_written = 0
+        self.failed_checkpoints = 0
+
+    def record(self, rows: list[dict]):
+        """Add accepted point rows (dicts with session_id/timestamp/score)."""
+        by_session = {}
+        for row in rows:
+            by_session.setdefault(row["session_id"], []).append(
+                (to_epoch_us(row["timestamp"]) // 1000, float(row["score"]))
+            )
+
+        with self._lock:
+            for session_id, items in by_session.items():
+                acc = self._sessions.get(session_id)
+                if acc is None:
+                    acc = self._sessions[session_id] = SessionAccumulator()
+                for ts_ms, score in sorted(items):
+                    acc.add(ts_ms, score)
+                self._dirty.add(session_id)
+            self.points_total += len(rows)
+
+    # ---------- checkpoints ----------
+
+    def _values(self, session_ids) -> list[dict]:
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            return [
+                {
+                    "session_id": session_id,
+                    "worker": self.worker,
+                    "point_count": self._sessions[session_id].count,
+                    "state": json.dumps(self._sessions[session_id].to_state()),
+                    "updated_at": now,
+                }
+                for session_id in sorted(session_ids)
+                if session_id in self._sessions
+            ]
+
+    def _write(self, conn, values: list[dict]):
+        if not values:
+            return
+        if conn.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(STATE_TABLE)
+        conn.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["session_id", "worker"],
+                set_={
+                    "point_count": stmt.excluded.point_count,
+                    "state": stmt.excluded.state,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            ),
+            values,
+        )
+
+    def checkpoint(self) -> int:
+        """Write the sessions that changed since the last checkpoint. Returns rows written."""
+        with self._checkpoint_lock:
+            with self._lock:
+                dirty = self._dirty
+                self._dirty = set()
+            values = self._values(dirty)
+            if not values:
+                return 0
+
+            try:
+                with engine.begin() as conn:
+                    self._write(conn, values)
+            except Exception as e:
+                print(f"⚠️  Analytics checkpoint failed ({len(values)} sessions kept): {e}")
+                self.failed_checkpoints += 1
+                with self._lock:
+                    self._dirty |= dirty
+                return 0
+
+            self.checkpoints += 1
+            self.rows_written += len(values)
+            return len(values)
+
+    def write_final(self, conn, session_id: int):
+        """Write this process's state of an ending session on the caller's transaction."""
+        self._write(conn, self._values([session_id]))
+
+    def drop(self, session_id: int):
+        """Forget a session (ended and written, or deleted)."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._dirty.discard(session_id)
+
+    def close(self, session_id: int):
+        """Session ended elsewhere: write its state now, then forget it."""
+        with self._lock:
+            if session_id not in self._sessions:
+                return
+        try:
+            with engine.begin() as conn:
+                self.write_final(conn, session_id)
+        except Exception as e:
+            print(f"⚠️  Analytics final checkpoint failed for session {session_id}: {e}")
+            return
+        self.drop(session_id)
+
+    # ---------- reads ----------
+
+    def _rows(self, db, session_id: int) -> dict:
+        """Checkpointed accumulators of a session: {worker: SessionAccumulator}."""
+        rows = db.execute(
+            select(STATE_TABLE.c.worker, STATE_TABLE.c.state).where(STATE_TABLE.c.session_id == session_id)
+        ).all()
+        return {worker: SessionAccumulator.from_state(json.loads(state)) for worker, state in rows}
+
+    def snapshot(self, db, session_id: int) -> dict:
+        """
+        Live analytics: checkpoints of other processes + this process's
+        current state. 'ordered' False: the critical moments / sustained
+        periods are per-process approximations (several sources, or points
+        ingested out of order).
+        """
+        accumulators = self._rows(db, session_id)
+        with self._lock:
+            local = self._sessions.get(session_id)
+            if local is not None:
+                accumulators[self.worker] = local.copy()
+        merged = SessionAccumulator.merge(list(accumulators.values()))
+        return {
+            "session_id": session_id,
+            "points": merged.count,
+            "sources": len(accumulators),
+            "ordered": merged.in_order,
+            "analytics": merged.analytics(),
+        }
+
+    def session_analytics(self, db, session, series: EngagementSeries, student_id: int = None) -> dict:
+        """Report analytics of an ended session: report_analytics, or recomputed for one student."""
+        if student_id is not None:
+            return get_comprehensive_analytics(series)
+        return report_analytics(list(self._rows(db, session.id).values()), series)
+
+    # ---------- thread ----------
+
+    def _run(self):
+        while not self._stop.wait(self.checkpoint_seconds):
+            self.checkpoint()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="analytics-checkpoint", daemon=True)
+        self._thread.start()
+        print(f"🧮 Analytics checkpoints started (every {self.checkpoint_seconds:g}s)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+        self.checkpoint()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            sessions, dirty = len(self._sessions), len(self._dirty)
+        return {
+            "sessions": sessions,
+            "dirty_sessions": dirty,
+            "points_total": self.points_total,
+            "checkpoints": self.checkpoints,
+            "rows_written": self.rows_written,
+            "failed_checkpoints": self.failed_checkpoints,
+        }
+
+
+# Global instance (one per API process, checkpoints shared through the DB)
+analytics_accumulator = AnalyticsAccumulators()
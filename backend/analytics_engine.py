@@ -0,0 +1,296 @@
+"""
+Array-based analytics engine - the metrics of analytics.py on NumPy arrays
+
+Inputs are contiguous arrays, one element per point, in timestamp order:
+    scores  float64 engagement scores
+    ts_us   int64 timestamps, microseconds (any epoch; only differences are used)
+
+Results are arrays of indices / values; analytics.py turns them into the
+dicts it has always returned (its functions are thin adapters).
+
+Numeric fidelity with the original pure-Python code:
+- Averages that are compared with thresholds or rounded use Python's
+  sum() order (py_sum): NumPy's pairwise summation differs in the last
+  bits and flips e.g. the attention score of a constant 0.8 session
+- Durations truncate like int(timedelta.total_seconds())
+"""
+import sys
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Thresholds of the original analytics
+FOCUS_THRESHOLD = 0.7        # focus time, sustained high/low periods
+DISTRIBUTION_EDGES = (0.33, 0.67)
+PEAK_THRESHOLD = 0.75
+DROP_THRESHOLD = 0.3         # distraction spikes (>=), dropoffs (>)
+PEAK_TIE_TOLERANCE = 1e-9
+US_PER_SECOND = 1_000_000
+
+# One searchsorted classifies a score as low / medium / high / focused (> 0.7).
+# side="right": a score equal to an edge goes up, except focus which is strict.
+LEVEL_EDGES = np.array([*DISTRIBUTION_EDGES, np.nextafter(FOCUS_THRESHOLD, np.inf)])
+LOW, MEDIUM, HIGH, FOCUSED = range(4)
+
+
+def as_scores(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def as_timestamps(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.int64)
+
+
+def py_sum(scores: np.ndarray) -> float:
+    """Sum in the order of Python's sum() (legacy averages)."""
+    if len(scores) == 0:
+        return 0
+    if sys.version_info < (3, 12):
+        # sum() of floats = left-to-right double additions = last running sum
+        return float(np.cumsum(scores)[-1])
+    # 3.12+: sum() compensates rounding errors
+    return sum(scores.tolist())
+
+
+def run_bounds(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Run-length encoding of a boolean array: (start, end) of each run, end exclusive."""
+    n = len(mask)
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    change = np.flatnonzero(np.diff(mask.view(np.int8))) + 1
+    starts = np.concatenate(([0], change))
+    ends = np.concatenate((change, [n]))
+    return starts, ends
+
+
+def elapsed_seconds(ts_us: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Whole seconds from ts_us[start] to ts_us[end] (inclusive end), truncated toward zero."""
+    delta = ts_us[end] - ts_us[start]
+    return (delta / US_PER_SECOND).astype(np.int64)
+
+
+# ========== SCORE METRICS ==========
+
+def attention_score(scores: np.ndarray) -> int:
+    """0-100 attention score from the average (see analytics.calculate_attention_score)."""
+    if len(scores) == 0:
+        return 0
+    return attention_from_average(py_sum(scores) / len(scores))
+
+
+def attention_from_average(avg: float) -> int:
+    """Score mapping: >= 0.8 -> 100, >= 0.6 -> 75, >= 0.4 -> 50, else 25."""
+    if avg >= 0.8:
+        return 100
+    elif avg >= 0.6:
+        return 75
+    elif avg >= 0.4:
+        return 50
+    return 25
+
+
+def focus_count(scores: np.ndarray, threshold: float = FOCUS_THRESHOLD) -> int:
+    """Points above the focus threshold."""
+    return int(np.count_nonzero(scores > threshold))
+
+
+def distribution_counts(scores: np.ndarray, edges=DISTRIBUTION_EDGES) -> np.ndarray:
+    """Counts of low (< 0.33), medium (< 0.67) and high scores."""
+    counts, _ = np.histogram(scores, bins=np.array([-np.inf, *edges, np.inf]))
+    return counts
+
+
+def volatility(scores: np.ndarray) -> float:
+    """Sample standard deviation (as statistics.stdev)."""
+    if len(scores) < 2:
+        return 0.0
+    return float(np.std(scores, ddof=1))
+
+
+def basic_stats(scores: np.ndarray) -> dict:
+    if len(scores) == 0:
+        return {'avg_score': 0.0, 'std_score': 0.0, 'min_score': 0.0, 'max_score': 0.0}
+    return {
+        'avg_score': float(np.mean(scores)),
+        'std_score': float(np.std(scores)),
+        'min_score': float(np.min(scores)),
+        'max_score': float(np.max(scores)),
+    }
+
+
+# ========== TIMELINE METRICS ==========
+
+def score_drops(scores: np.ndarray) -> np.ndarray:
+    """drop[i] = scores[i] - scores[i + 1] (positive = engagement fell)."""
+    return -np.diff(scores)
+
+
+def spike_indices(drops: np.ndarray, threshold: float = DROP_THRESHOLD) -> np.ndarray:
+    """Points (index of the lower score) after a drop >= threshold, in time order."""
+    return np.flatnonzero(drops >= threshold) + 1
+
+
+def dropoff_indices(drops: np.ndarray, threshold: float = DROP_THRESHOLD, decimals: int = 3, top: int = None) -> np.ndarray:
+    """Points after a drop > threshold, largest drop first (ties in time order). 'top': only the first ones."""
+    idx = np.flatnonzero(drops > threshold)
+    if top is not None and len(idx) > top:
+        # Only drops that can round to at least the top-th largest can be in the top
+        kth = np.partition(drops[idx], len(idx) - top)[len(idx) - top]
+        idx = idx[drops[idx] >= kth - 10.0 ** -decimals]
+    # Ranked by the drop as reported (rounded), like the original
+    rounded = np.array([round(d, decimals) for d in drops[idx].tolist()], dtype=np.float64)
+    order = np.argsort(-rounded, kind="stable")[:top]
+    return idx[order] + 1
+
+
+def peak_intervals(scores: np.ndarray, window: int = 5, threshold: float = PEAK_THRESHOLD):
+    """
+    Peak periods: maximal intervals covered by windows of 'window' points
+    whose mean is above threshold (overlapping or adjacent windows merge).
+
+    O(n): window means come from one cumulative sum. Returns
+    (starts, ends, means, peaks), ends exclusive; means = average over the
+    interval, peaks = best window mean in it. Highest mean first (ranked by
+    the mean rounded to 3 decimals, ties in time order).
+    """
+    n = len(scores)
+    if window < 1 or n < window:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64)
+
+    csum = np.concatenate(([0.0], np.cumsum(scores)))
+    means = (csum[window:] - csum[:-window]) / window
+    # Differences of a long cumsum drift in the last bits: settle near-ties
+    # with the window's own sum so a window exactly at threshold never qualifies
+    near = np.flatnonzero(np.abs(means - threshold) <= PEAK_TIE_TOLERANCE)
+    if len(near):
+        means[near] = sliding_window_view(scores, window)[near].sum(axis=1) / window
+
+    starts = np.flatnonzero(means > threshold)
+    if len(starts) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64)
+
+    # A window starting inside (or right after) the previous one extends its interval
+    breaks = np.flatnonzero(np.diff(starts) > window) + 1
+    first = np.concatenate(([0], breaks))
+    last = np.concatenate((breaks - 1, [len(starts) - 1]))
+    begin = starts[first]
+    end = starts[last] + window
+    peaks = np.maximum.reduceat(means[starts], first)
+    interval_means = (csum[end] - csum[begin]) / (end - begin)
+
+    rounded = np.array([round(m, 3) for m in interval_means.tolist()], dtype=np.float64)
+    order = np.argsort(-rounded, kind="stable")
+    return begin[order], end[order], interval_means[order], peaks[order]
+
+
+def sustained_runs(
+    scores: np.ndarray,
+    ts_us: np.ndarray,
+    min_duration_sec: int = 60,
+    threshold: float = FOCUS_THRESHOLD,
+    ts_kind: np.ndarray = None,
+):
+    """
+    Maximal runs of high (> threshold) / low scores lasting >= min_duration_sec.
+
+    Returns (starts, ends_inclusive, is_high, durations) of the qualifying
+    runs, in time order. ts_kind (optional, int8): runs whose first and
+    last timestamps are not of the same non-zero kind can't be measured
+    and are skipped (unparseable / naive vs aware timestamps).
+    """
+    high = scores > threshold
+    starts, ends = run_bounds(high)
+    return measure_runs(high, starts, ends, ts_us, min_duration_sec, ts_kind)
+
+
+def measure_runs(high, starts, ends, ts_us, min_duration_sec: int = 60, ts_kind: np.ndarray = None):
+    """sustained_runs on runs already found by run_bounds."""
+    last = ends - 1
+
+    measurable = np.ones(len(starts), dtype=bool)
+    if ts_kind is not None:
+        measurable = (ts_kind[starts] != 0) & (ts_kind[starts] == ts_kind[last])
+
+    durations = np.zeros(len(starts), dtype=np.int64)
+    durations[measurable] = elapsed_seconds(ts_us, starts[measurable], last[measurable])
+    keep = measurable & (durations >= min_duration_sec)
+    return starts[keep], last[keep], high[starts[keep]], durations[keep]
+
+
+def duration_seconds(ts_us: np.ndarray) -> int:
+    """Whole seconds from the first to the last point."""
+    if len(ts_us) == 0:
+        return 0
+    return int((int(ts_us[-1]) - int(ts_us[0])) / US_PER_SECOND)
+
+
+def classify(scores: np.ndarray) -> np.ndarray:
+    """LOW / MEDIUM / HIGH / FOCUSED level of every score."""
+    return np.searchsorted(LEVEL_EDGES, scores, side="right")
+
+
+def analyze(
+    scores: np.ndarray,
+    timestamps,
+    present: np.ndarray = None,
+    min_duration_sec: int = 60,
+    peak_window: int = 5,
+    peak_threshold: float = PEAK_THRESHOLD,
+    top_dropoffs: int = None,
+) -> dict:
+    """
+    Every metric of get_comprehensive_analytics in one fused pass.
+
+    scores: one per point (missing = 0). present: points that have a score
+    (None = all); score statistics use those, timeline metrics every point.
+    timestamps: ts_us array, or a function(indices) -> (ts_us, ts_kind)
+    so that only the timestamps actually needed are converted.
+    top_dropoffs: rank only the largest dropoffs (all are counted).
+
+    One diff (spikes and dropoffs), one classification (distribution,
+    focus time, high/low runs), one run-length pass (sustained periods).
+    """
+    valid = scores if present is None else scores[present]
+    levels = classify(scores)
+    valid_levels = levels if present is None else levels[present]
+    counts = np.bincount(valid_levels, minlength=4)
+
+    drops = score_drops(scores)
+
+    high = levels == FOCUSED
+    starts, ends = run_bounds(high)
+
+    n = len(scores)
+    if callable(timestamps):
+        needed = np.union1d(np.concatenate((starts, ends - 1)), [0, n - 1] if n else [])
+        ts_us, ts_kind = timestamps(needed.tolist())
+    else:
+        ts_us, ts_kind = timestamps, None
+
+    duration = duration_seconds(ts_us)
+    unmeasurable = 0
+    if ts_kind is not None and n:
+        if ts_kind[0] == 0 or ts_kind[0] != ts_kind[-1]:
+            duration = None
+        first, last = ts_kind[starts], ts_kind[ends - 1]
+        unmeasurable = int(np.count_nonzero((first == 0) | (first != last)))
+
+    return {
+        "count": len(valid),
+        "basic": basic_stats(valid),
+        "attention_score": attention_score(valid),
+        "focus_count": int(counts[FOCUSED]),
+        "distribution": np.array([counts[LOW], counts[MEDIUM], counts[HIGH] + counts[FOCUSED]]),
+        "volatility": volatility(valid),
+        "drops": drops,
+        "spikes": spike_indices(drops),
+        "dropoffs": dropoff_indices(drops, top=top_dropoffs),
+        "dropoff_count": int(np.count_nonzero(drops > DROP_THRESHOLD)),
+        "peaks": peak_intervals(valid, peak_window, peak_threshold),
+        "sustained": measure_runs(high, starts, ends, ts_us, min_duration_sec, ts_kind) if n >= 2 else None,
+        "unmeasurable_runs": unmeasurable,
+        "duration_seconds": duration,
+    }
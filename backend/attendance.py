@@ -15,6 +15,7 @@ from dotenv import load_dotenv
 from database import SessionLocal
 from models import EngagementSession, User, Attendance
 from auth import get_current_user
+from session_registry import session_registry
 from fastapi.responses import StreamingResponse
 
 load_dotenv()
@@ -153,12 +154,10 @@ def mark_join(
     if current_user.role != "student":
         raise HTTPException(403, "Only students can join sessions")
 
-    # 1️⃣ Verify session exists and is active
-    session = db.query(EngagementSession).filter(
-        EngagementSession.id == session_id
-    ).first()
+    # 1️⃣ Verify session exists and is active (in-memory registry)
+    session = session_registry.get(db, session_id)
 
-    if not session:
+    if not session or session.is_deleted:
         raise HTTPException(404, "Session not found")
 
     if session.ended_at:
@@ -19,6 +19,8 @@ SECRET_KEY = os.getenv("JWT_SECRET")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60  # ✅ HARDENED: Reduced from 60 to 30 minutes
 REFRESH_TOKEN_EXPIRE_DAYS = 7  # ✅ NEW: Refresh token valid for 7 days
+# EventSource can't send headers: SSE streams take a short-lived ticket in the URL
+STREAM_TICKET_SECONDS = int(os.getenv("STREAM_TICKET_SECONDS", "60"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
@@ -101,21 +103,17 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
+def get_user_from_token(token: str, db: Session) -> User:
     """
-    Read JWT from Authorization: Bearer <token>,
-    decode, fetch user from DB.
-    
+    Decode a JWT access token, reject revoked tokens, fetch the user.
+
     ✅ NEW: Check if token is blacklisted (revoked)
     """
-    token = credentials.credentials
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: int | None = payload.get("sub")
-        if user_id is None:
+        # Stream tickets are only good for the stream they were issued for
+        if user_id is None or payload.get("purpose") is not None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token payload",
@@ -146,6 +144,50 @@ def get_current_user(
     return user
 
 
+def create_stream_ticket(user: User, session_id: int) -> str:
+    """Single-purpose token for one session's SSE streams, valid STREAM_TICKET_SECONDS."""
+    return create_access_token(
+        {"sub": str(user.id), "purpose": "stream", "session_id": session_id},
+        expires_delta=timedelta(seconds=STREAM_TICKET_SECONDS),
+    )
+
+
+def get_user_from_stream_ticket(ticket: str, session_id: int, db: Session) -> User:
+    """Decode a stream ticket issued for session_id, fetch the user."""
+    try:
+        payload = jwt.decode(ticket, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired stream ticket",
+        )
+
+    if payload.get("purpose") != "stream" or payload.get("session_id") != session_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid stream ticket",
+        )
+
+    user = db.query(User).filter(User.id == int(payload["sub"])).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+        )
+    return user
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db),
+) -> User:
+    """
+    Read JWT from Authorization: Bearer <token>,
+    decode, fetch user from DB.
+    """
+    return get_user_from_token(credentials.credentials, db)
+
+
 # ====== ROUTES ======
 
 @router.post("/register", response_model=UserOut)
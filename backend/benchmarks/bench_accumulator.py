@@ -0,0 +1,163 @@
+# backend/benchmarks/bench_accumulator.py
+"""
+Online analytics (analytics_accumulator) vs recomputing at report time.
+
+For each session size: cost of SessionAccumulator.add per point (paid
+at ingest), of producing the analytics from the accumulator (checkpoint
+merge + analytics(), paid by the report), and of
+get_comprehensive_analytics on the EngagementSeries (the recomputation
+it replaces). Also checks that both give the same analytics.
+
+--verify N first ingests N randomized sessions through
+AnalyticsAccumulators the way the API can receive them: one device in
+order, batches spread over 2 API processes, 2 devices whose batches
+interleave, a late batch. report_analytics (what reports serve) must
+equal get_comprehensive_analytics exactly in every case, and the merged
+order-independent fields (count, min/max, levels, duration, mean/std)
+must match too.
+
+Usage (from backend/):
+    python benchmarks/bench_accumulator.py --sizes 10000,100000,1000000 --verify 300
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# analytics_accumulator imports the DB layer; nothing is read or written here
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.gettempdir(), 'bench_accumulator.db')}")
+
+import analytics  # noqa: E402
+from analytics_accumulator import AnalyticsAccumulators, SessionAccumulator, report_analytics  # noqa: E402
+from bench_analytics import SESSION_START, make_session  # noqa: E402
+from engagement_series import EngagementSeries  # noqa: E402
+from live_buffer import to_epoch_us  # noqa: E402
+
+SCENARIOS = ["in order", "2 workers", "2 devices", "late batch"]
+BATCH = 10
+
+
+def random_device(rng: random.Random, start: datetime, n: int) -> list:
+    """One device's rows in time order: (timestamp, score)."""
+    kind = rng.choice(["uniform", "coarse", "walk"])
+    level, t, rows = rng.random(), start, []
+    for _ in range(n):
+        t += timedelta(microseconds=rng.choice([1, 999, 1_000_000, rng.randint(0, 40_000_000)]))
+        if kind == "uniform":
+            score = rng.random()
+        elif kind == "coarse":
+            score = rng.choice([0.0, 0.2, 0.33, 0.5, 0.67, 0.7, 0.75, 0.8, 1.0])
+        else:
+            level = min(max(level + rng.gauss(0, 0.2), 0.0), 1.0)
+            score = level
+        rows.append((t, score))
+    return rows
+
+
+def ingest(rng: random.Random, scenario: str, n: int) -> tuple:
+    """Feed a session to AnalyticsAccumulators as 'scenario'. Returns (accumulators, series)."""
+    workers = [AnalyticsAccumulators(worker="a"), AnalyticsAccumulators(worker="b")]
+    if scenario == "2 devices":
+        devices = [random_device(rng, SESSION_START, n // 2), random_device(rng, SESSION_START, n - n // 2)]
+        # Each device sends its own batches in order; the two interleave
+        batches = []
+        for k in range(0, n, BATCH):
+            sent = [d[k:k + BATCH] for d in devices if d[k:k + BATCH]]
+            rng.shuffle(sent)
+            batches += sent
+    else:
+        rows = random_device(rng, SESSION_START, n)
+        batches = [rows[k:k + BATCH] for k in range(0, len(rows), BATCH)]
+        if scenario == "late batch" and len(batches) > 2:
+            batches.append(batches.pop(rng.randrange(len(batches) - 1)))
+
+    for i, batch in enumerate(batches):
+        worker = workers[i % 2] if scenario == "2 workers" else workers[0]
+        worker.record([{"session_id": 1, "timestamp": t, "score": score} for t, score in batch])
+
+    points = sorted((to_epoch_us(t), score) for batch in batches for t, score in batch)
+    series = EngagementSeries([us // 1000 for us, _ in points], [score for _, score in points])
+    return [w._sessions[1] for w in workers if 1 in w._sessions], series
+
+
+def verify(trials: int) -> int:
+    rng = random.Random(5)
+    mismatches, online = 0, 0
+    for trial in range(trials):
+        scenario = SCENARIOS[trial % len(SCENARIOS)]
+        accumulators, series = ingest(rng, scenario, rng.choice([0, 1, 2, 6, 30, 300, 1000]))
+        online += len(accumulators) == 1 and accumulators[0].in_order
+        offline = analytics.get_comprehensive_analytics(series)
+        served = report_analytics(accumulators, series)
+        for result in (offline, served):
+            result.pop("computed_at")
+            result.pop("timeline")
+
+        merged = SessionAccumulator.merge(accumulators).analytics()["summary"]
+        expected = offline["summary"]
+        stats_ok = all(merged[k] == expected[k] for k in ("total_points", "min_score", "max_score", "duration_seconds"))
+        stats_ok &= all(abs(merged[k] - expected[k]) <= 1e-9 for k in ("avg_score", "std_score"))
+        if served != offline or not stats_ok:
+            mismatches += 1
+            print(f"❌ {scenario} differs (trial {trial}, {len(series)} points)")
+    print(f"{'✅' if not mismatches else '❌'} {trials} randomized sessions ({online} served online): {mismatches} mismatches")
+    return mismatches
+
+
+def bench(n):
+    scores, offsets = make_session(n)
+    t_ms = int(SESSION_START.timestamp() * 1000) + offsets // 1000
+    series = EngagementSeries(t_ms, scores)
+    points = list(zip(t_ms.tolist(), scores.tolist()))
+
+    acc = SessionAccumulator()
+    started = time.perf_counter()
+    for ts, score in points:
+        acc.add(ts, score)
+    ingest = time.perf_counter() - started
+
+    state = json.dumps(acc.to_state())
+    started = time.perf_counter()
+    online = report_analytics([SessionAccumulator.from_state(json.loads(state))], series)
+    report_online = time.perf_counter() - started
+
+    started = time.perf_counter()
+    offline = analytics.get_comprehensive_analytics(series)
+    report_offline = time.perf_counter() - started
+
+    for result in (online, offline):
+        result.pop("computed_at")
+        result.pop("timeline")
+    print(
+        f"   {n:>10,} {ingest / n * 1e6:>10.2f}us {len(state):>9,}B"
+        f" {report_online * 1000:>10.2f}ms {report_offline * 1000:>10.1f}ms  {'✅' if online == offline else '❌'}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online analytics accumulator benchmark")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--verify", type=int, default=200)
+    args = parser.parse_args()
+
+    failed = verify(args.verify) if args.verify else 0
+
+    print("\n📊 Online vs report-time analytics")
+    print("=" * 70)
+    print(f"   {'points':>10} {'add/point':>12} {'state':>10} {'online':>12} {'recompute':>12}  same")
+    for n in (int(s) for s in args.sizes.split(",")):
+        bench(n)
+    print("=" * 70)
+    print("   online = checkpoint state -> report_analytics, recompute = get_comprehensive_analytics(series)")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+# backend/benchmarks/bench_analytics.py
+"""
+analytics.py (NumPy engine) vs the original per-point loops.
+
+For each session size, times every metric function and
+get_comprehensive_analytics on {timestamp, score} dicts, and checks that
+the outputs are identical. Peak periods are merged intervals now (the
+original listed every window), so they are checked against
+reference_peaks instead. The "series" column is the same functions on an
+EngagementSeries (epoch-ms arrays, as fetched by fetch_series: no ISO
+strings to build or parse). The "engine" column is the same metric on
+prebuilt arrays, i.e. without the per-point dict conversion.
+
+The original code is frozen in legacy_analytics.py; it is skipped above
+--legacy-max points (its statistics.stdev and find_peak_periods loops
+take minutes at 1M).
+
+--verify N first compares both on N randomized small sessions (edge
+cases: constant scores, missing scores, ties, naive/aware timestamps).
+
+Usage (from backend/):
+    python benchmarks/bench_analytics.py --sizes 10000,100000,1000000 --verify 500
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np  # noqa: E402
+
+import analytics  # noqa: E402
+import analytics_engine as engine  # noqa: E402
+from engagement_series import EngagementSeries  # noqa: E402
+import legacy_analytics  # noqa: E402
+
+FUNCTIONS = [
+    "calculate_attention_score",
+    "calculate_focus_time_percentage",
+    "detect_distraction_spikes",
+    "calculate_volatility",
+    "find_sustained_periods",
+    "calculate_basic_stats",
+    "detect_dropoffs",
+    "find_peak_periods",
+    "calculate_engagement_distribution",
+    "calculate_duration",
+    "get_comprehensive_analytics",
+]
+
+ENGINE = {
+    "calculate_attention_score": lambda s, t: engine.attention_score(s),
+    "calculate_focus_time_percentage": lambda s, t: engine.focus_count(s),
+    "detect_distraction_spikes": lambda s, t: engine.spike_indices(engine.score_drops(s)),
+    "calculate_volatility": lambda s, t: engine.volatility(s),
+    "find_sustained_periods": lambda s, t: engine.sustained_runs(s, t),
+    "calculate_basic_stats": lambda s, t: engine.basic_stats(s),
+    "detect_dropoffs": lambda s, t: engine.dropoff_indices(engine.score_drops(s)),
+    "find_peak_periods": lambda s, t: engine.peak_intervals(s),
+    "calculate_engagement_distribution": lambda s, t: engine.distribution_counts(s),
+    "calculate_duration": lambda s, t: engine.duration_seconds(t),
+}
+ENGINE["get_comprehensive_analytics"] = lambda s, t: engine.analyze(s, t, top_dropoffs=5)
+
+
+def make_session(n, seed=7):
+    """A session at ~5 points/s: slow drift, attention lapses, sensor noise. Returns (scores, offsets_us)."""
+    rng = np.random.default_rng(seed)
+    level = np.clip(0.6 + np.cumsum(rng.normal(0, 0.02, n)), 0, 1)
+    level = np.where(rng.random(n) < 0.02, level * 0.3, level)
+    scores = np.clip(level + rng.normal(0, 0.05, n), 0, 1)
+    offsets = np.cumsum(rng.integers(180_000, 220_000, n))
+    return scores, offsets
+
+
+SESSION_START = datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+
+
+def to_points(scores, offsets):
+    start = SESSION_START
+    return [
+        {"timestamp": (start + timedelta(microseconds=int(us))).isoformat(), "score": float(s)}
+        for us, s in zip(offsets, scores)
+    ]
+
+
+def random_points(rng: random.Random):
+    """Small session with the awkward cases."""
+    n = rng.choice([0, 1, 2, 3, 5, 6, 10, 50, 300])
+    kind = rng.choice(["uniform", "constant", "coarse", "walk"])
+    constant = rng.choice([0.33, 0.4, 0.6, 0.67, 0.7, 0.75, 0.8])
+    naive = rng.random() < 0.3
+    t = datetime(2026, 1, 1, 9, 0) if naive else datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+    level = rng.random()
+    points = []
+    for _ in range(n):
+        t += timedelta(microseconds=rng.choice([1, 999_999, 1_000_000, rng.randint(0, 40_000_000)]))
+        if kind == "uniform":
+            score = rng.random()
+        elif kind == "constant":
+            score = constant
+        elif kind == "coarse":
+            score = rng.choice([0.0, 0.2, 0.33, 0.5, 0.67, 0.7, 0.75, 0.8, 1.0])
+        else:
+            level = min(max(level + rng.gauss(0, 0.2), 0.0), 1.0)
+            score = level
+        point = {"timestamp": t.isoformat(), "score": score}
+        if rng.random() < 0.02:
+            del point["score"]
+        if rng.random() < 0.01:
+            point["timestamp"] = "not a timestamp"
+        points.append(point)
+    return points
+
+
+def reference_peaks(points, window=5, threshold=engine.PEAK_THRESHOLD):
+    """Peak periods the slow way: every window, then merge windows that overlap or touch."""
+    scores = [p["score"] for p in points if "score" in p]
+    intervals = []
+    for i in range(len(scores) - window + 1):
+        if float(np.sum(scores[i:i + window])) / window <= threshold:
+            continue
+        window_avg = float(np.mean(scores[i:i + window]))
+        if intervals and i <= intervals[-1][1]:
+            intervals[-1][1] = i + window
+            intervals[-1][2] = max(intervals[-1][2], window_avg)
+        else:
+            intervals.append([i, i + window, window_avg])
+    return [
+        {
+            "start_idx": start,
+            "end_idx": end,
+            "avg_engagement": sum(scores[start:end]) / (end - start),
+            "peak_engagement": best,
+            "points_count": end - start,
+            "start_time": points[start].get("timestamp", ""),
+            "end_time": points[end - 1].get("timestamp", ""),
+        }
+        for start, end, best in intervals
+    ]
+
+
+def same_peaks(peaks, expected) -> bool:
+    """Same intervals; averages equal up to the 3-decimal rounding; highest average first."""
+    averages = [p["avg_engagement"] for p in peaks]
+    if averages != sorted(averages, reverse=True):
+        return False
+    peaks = sorted(peaks, key=lambda p: p["start_idx"])
+    expected = sorted(expected, key=lambda p: p["start_idx"])
+    if len(peaks) != len(expected):
+        return False
+    for got, want in zip(peaks, expected):
+        for key in ("start_idx", "end_idx", "points_count", "start_time", "end_time"):
+            if got[key] != want[key]:
+                return False
+        for key in ("avg_engagement", "peak_engagement"):
+            if abs(got[key] - want[key]) > 0.0005 + 1e-9:
+                return False
+    return True
+
+
+def call(module, name, points):
+    result = getattr(module, name)(points)
+    if name == "get_comprehensive_analytics":
+        result = {k: v for k, v in result.items() if k != "computed_at"}
+    return result
+
+
+def same(name, points) -> bool:
+    """analytics vs legacy_analytics; peak periods vs reference_peaks."""
+    new = call(analytics, name, points)
+    if name == "find_peak_periods":
+        return same_peaks(new, reference_peaks(points))
+    old = call(legacy_analytics, name, points)
+    if name == "get_comprehensive_analytics":
+        # Top 3 of find_peak_periods (itself checked against reference_peaks)
+        moments = dict(new["critical_moments"])
+        peaks, total = moments.pop("peak_periods"), moments.pop("total_peaks")
+        expected = analytics.find_peak_periods(points)
+        if total != len(expected) or peaks != expected[:3]:
+            return False
+        new = {**new, "critical_moments": moments}
+        old_moments = {k: v for k, v in old["critical_moments"].items() if k not in ("peak_periods", "total_peaks")}
+        old = {**old, "critical_moments": old_moments}
+    return new == old
+
+
+def verify(trials: int) -> int:
+    rng = random.Random(11)
+    mismatches = 0
+    for trial in range(trials):
+        points = random_points(rng)
+        for name in FUNCTIONS:
+            if not same(name, points):
+                mismatches += 1
+                print(f"❌ {name} differs (trial {trial}, {len(points)} points)")
+    print(f"{'✅' if not mismatches else '❌'} {trials} randomized sessions: {mismatches} mismatches")
+    return mismatches
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench(n, repeat, legacy_max):
+    scores, offsets = make_session(n)
+    points = to_points(scores, offsets)
+    series = EngagementSeries(int(SESSION_START.timestamp() * 1000) + offsets // 1000, scores)
+    scores, ts_us = engine.as_scores(scores), engine.as_timestamps(offsets)
+    run_legacy = n <= legacy_max
+
+    print(f"\n📊 {n:,} points (best of {repeat})")
+    print("=" * 102)
+    print(f"   {'function':<36} {'legacy':>11} {'adapter':>11} {'series':>11} {'engine':>11} {'speedup':>9}  same")
+    for name in FUNCTIONS:
+        new = best_of(lambda: call(analytics, name, points), repeat)
+        on_series = best_of(lambda: call(analytics, name, series), repeat)
+        arrays = best_of(lambda: ENGINE[name](scores, ts_us), repeat)
+        if run_legacy:
+            old = best_of(lambda: call(legacy_analytics, name, points), 1)
+            print(
+                f"   {name:<36} {old * 1000:>9.1f}ms {new * 1000:>9.1f}ms {on_series * 1000:>9.1f}ms {arrays * 1000:>9.2f}ms"
+                f" {old / arrays:>8.0f}x  {'✅' if same(name, points) else '❌'}"
+            )
+        else:
+            print(
+                f"   {name:<36} {'-':>11} {new * 1000:>9.1f}ms {on_series * 1000:>9.1f}ms"
+                f" {arrays * 1000:>9.2f}ms {'-':>9}"
+            )
+    print("=" * 102)
+    print("   speedup = legacy / engine (arrays, e.g. straight from SQL)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytics engine benchmark")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-max", type=int, default=200_000)
+    parser.add_argument("--verify", type=int, default=200)
+    args = parser.parse_args()
+
+    # Legacy/adapters print warnings for unparseable timestamps
+    failed = verify(args.verify) if args.verify else 0
+    for n in (int(s) for s in args.sizes.split(",")):
+        bench(n, args.repeat, args.legacy_max)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
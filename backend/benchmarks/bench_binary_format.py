@@ -0,0 +1,142 @@
+# backend/benchmarks/bench_binary_format.py
+"""
+Encode time and bytes on the wire: JSON vs MessagePack vs Arrow IPC.
+
+Two payloads, without a database:
+- series: get_series for one long session (default 36k points)
+- report: get_session_report's timeline + analytics document
+
+Binary timings include building the NumPy columns from the rows, i.e.
+the full work the endpoint does after the query. Encoders whose library
+isn't installed (msgpack, pyarrow) are skipped.
+
+Usage (from backend/):
+    python benchmarks/bench_binary_format.py --points 36000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter  # noqa: E402
+from typing import Optional  # noqa: E402
+
+import binary_format  # noqa: E402
+from binary_format import ARROW_STREAM, MSGPACK, point_columns, series_response, document_response  # noqa: E402
+from analytics import get_comprehensive_analytics  # noqa: E402
+
+
+class PointOut(BaseModel):
+    # Mirror of engagement.PointOut (importing engagement needs the full app config)
+    timestamp: datetime
+    score: float
+    ear: Optional[float]
+    student_id: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class Row:
+    __slots__ = ("timestamp", "score", "ear", "student_id")
+
+    def __init__(self, t, s, e, st):
+        self.timestamp, self.score, self.ear, self.student_id = t, s, e, st
+
+
+def make_rows(n):
+    rng = random.Random(7)
+    t = datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+    rows = []
+    for _ in range(n):
+        t += timedelta(milliseconds=rng.randint(180, 220))
+        ear = rng.uniform(0.15, 0.35) if rng.random() > 0.05 else None
+        rows.append(Row(t, rng.random(), ear, rng.randint(1, 30)))
+    return rows
+
+
+def bench(label, fn, repeat):
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"   {label:<10} {len(body) / 1024:>10.1f} KiB  {best * 1000:>9.1f} ms")
+    return len(body), best
+
+
+def run(title, encoders, repeat):
+    print(f"\n{title}")
+    print("=" * 45)
+    results = {}
+    for label, fn in encoders:
+        results[label] = bench(label, fn, repeat)
+    print("=" * 45)
+
+    json_size, json_time = results["json"]
+    for label, (size, elapsed) in results.items():
+        if label != "json":
+            print(f"{label}: {json_size / size:.1f}x smaller, encode {json_time / elapsed:.1f}x faster than json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary series/report encoding benchmark")
+    parser.add_argument("--points", type=int, default=36_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.points)
+    binary = []
+    if binary_format.msgpack is not None:
+        binary.append(("msgpack", MSGPACK))
+    else:
+        print("⚠️  msgpack not installed - skipped")
+    if binary_format.pa is not None:
+        binary.append(("arrow", ARROW_STREAM))
+    else:
+        print("⚠️  pyarrow not installed - skipped")
+
+    # ---------- series ----------
+    adapter = TypeAdapter(list[PointOut])
+
+    def series_json():
+        # What FastAPI does for response_model=list[PointOut]
+        return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+    series_encoders = [("json", series_json)] + [
+        (label, lambda media=media: series_response(media, point_columns(rows)).body)
+        for label, media in binary
+    ]
+    print(f"📊 {args.points:,} points (best of {args.repeat})")
+    run("Series (get_series)", series_encoders, args.repeat)
+
+    # ---------- report ----------
+    points_data = [{"timestamp": r.timestamp.isoformat(), "score": r.score} for r in rows]
+    analytics = get_comprehensive_analytics(points_data)
+    report = {
+        "session_id": 1,
+        "title": "Benchmark",
+        "analytics": {k: analytics[k] for k in ("summary", "distribution", "critical_moments", "sustained_engagement")},
+        "timeline": analytics["timeline"],
+    }
+
+    def report_json():
+        return json.dumps(report).encode()
+
+    report_encoders = [("json", report_json)] + [
+        (label, lambda media=media: document_response(
+            media, report, "timeline", point_columns(rows, fields=("score",))
+        ).body)
+        for label, media in binary
+    ]
+    run("Report (get_session_report)", report_encoders, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# backend/benchmarks/bench_rate_limit.py
+"""
+Rate-limit cost on the request path with the default SQLite shared state.
+
+N processes (like uvicorn --workers N) take tokens from the same bucket
+(one client IP hitting every worker) on one SQLite file:
+- direct: SQLiteSharedState.take per request (one BEGIN IMMEDIATE each)
+- leased: TokenLeases.take, what rate_limit() uses
+
+Reports per-take latency (p50 / p99 / max over all processes), backend
+calls, and how many requests were allowed against the most the bucket
+could hand out (capacity + rate * elapsed): leases must not raise it.
+
+Usage (from backend/):
+    python benchmarks/bench_rate_limit.py --procs 4 --takes 1500
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def worker(mode, path, takes, rate, capacity, start_at, out):
+    os.environ["SHARED_STATE_PATH"] = path
+    import shared_state  # noqa: E402  (per process, like an API worker)
+
+    state = shared_state.SQLiteSharedState(path)
+    limiter = shared_state.TokenLeases(state) if mode == "leased" else state
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+
+    timings, allowed, failed = [], 0, 0
+    for _ in range(takes):
+        started = time.perf_counter()
+        try:
+            ok, _ = limiter.take("points:10.0.0.1", rate, capacity)
+            allowed += ok
+        except Exception:
+            failed += 1  # rate_limit() lets these through
+        timings.append((time.perf_counter() - started) * 1000.0)
+        time.sleep(0.0005)  # requests are not back to back
+    calls = limiter.backend_calls if mode == "leased" else takes
+    out.put((timings, allowed, failed, calls, time.time()))
+
+
+def run(mode, procs, takes, rate, capacity):
+    path = os.path.join(tempfile.mkdtemp(), "bench_rate_limit.db")
+    out = multiprocessing.Queue()
+    start_at = time.time() + 1.0
+    workers = [
+        multiprocessing.Process(target=worker, args=(mode, path, takes, rate, capacity, start_at, out))
+        for _ in range(procs)
+    ]
+    for w in workers:
+        w.start()
+    results = [out.get() for _ in workers]
+    for w in workers:
+        w.join()
+
+    timings = sorted(t for r in results for t in r[0])
+    allowed = sum(r[1] for r in results)
+    failed = sum(r[2] for r in results)
+    calls = sum(r[3] for r in results)
+    elapsed = max(r[4] for r in results) - start_at
+    most = capacity + rate * elapsed
+    print(
+        f"   {mode:<7} {statistics.median(timings):>8.3f} {timings[int(len(timings) * 0.99) - 1]:>8.3f}"
+        f" {timings[-1]:>8.2f} {calls:>8,} {failed:>6} {allowed:>8,} {int(most):>8,}"
+        f"  {'✅' if allowed <= most else '❌'}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared rate limiter benchmark")
+    parser.add_argument("--procs", type=int, default=4)
+    parser.add_argument("--takes", type=int, default=1500, help="Requests per process")
+    parser.add_argument("--rate", type=float, default=300, help="Bucket refill, tokens/second")
+    parser.add_argument("--capacity", type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"📊 {args.procs} processes x {args.takes:,} takes, bucket {args.rate:g}/s (capacity {args.capacity})")
+    print("=" * 78)
+    print(f"   {'mode':<7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'backend':>8} {'failed':>6} {'allowed':>8} {'at most':>8}")
+    for mode in ("direct", "leased"):
+        run(mode, args.procs, args.takes, args.rate, args.capacity)
+    print("=" * 78)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
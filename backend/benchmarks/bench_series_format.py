@@ -0,0 +1,94 @@
+# backend/benchmarks/bench_series_format.py
+"""
+Payload size and encode time: list[PointOut] JSON vs ?format=columnar.
+
+Simulates what get_series does for one long session (default: 2 hours at
+5 points/s from 1 camera = 36k points), without a database.
+
+Usage (from backend/):
+    python benchmarks/bench_series_format.py --points 36000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import BaseModel, ConfigDict, TypeAdapter  # noqa: E402
+from typing import Optional  # noqa: E402
+
+from series_format import columnar_series  # noqa: E402
+
+
+class PointOut(BaseModel):
+    # Mirror of engagement.PointOut (importing engagement needs the full app config)
+    timestamp: datetime
+    score: float
+    ear: Optional[float]
+    student_id: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+def make_rows(n):
+    rng = random.Random(7)
+    t = datetime(2026, 1, 1, 9, 0, tzinfo=timezone.utc)
+    rows = []
+    for _ in range(n):
+        t += timedelta(milliseconds=rng.randint(180, 220))
+        rows.append((t, rng.random(), rng.uniform(0.15, 0.35)))
+    return rows
+
+
+def bench(label, fn, repeat):
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - started)
+    print(f"   {label:<10} {len(body) / 1024:>10.1f} KiB  {best * 1000:>9.1f} ms")
+    return len(body), best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Series response format benchmark")
+    parser.add_argument("--points", type=int, default=36_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.points)
+
+    class Row:
+        __slots__ = ("timestamp", "score", "ear", "student_id")
+
+        def __init__(self, t, s, e):
+            self.timestamp, self.score, self.ear, self.student_id = t, s, e, None
+
+    orm_like = [Row(*r) for r in rows]
+
+    adapter = TypeAdapter(list[PointOut])
+
+    def encode_json():
+        # What FastAPI does for response_model=list[PointOut]: validate from attributes, then dump
+        models = adapter.validate_python(orm_like, from_attributes=True)
+        return adapter.dump_json(models)
+
+    def encode_columnar():
+        return json.dumps(columnar_series(rows)).encode()
+
+    print(f"📊 {args.points:,} points (best of {args.repeat})")
+    print("=" * 45)
+    json_size, json_time = bench("json", encode_json, args.repeat)
+    col_size, col_time = bench("columnar", encode_columnar, args.repeat)
+    print("=" * 45)
+    print(f"Payload: {json_size / col_size:.1f}x smaller, encode: {json_time / col_time:.1f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
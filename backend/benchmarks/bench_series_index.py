@@ -0,0 +1,225 @@
+# backend/benchmarks/bench_series_index.py
+"""
+Before/after benchmark for the engagement_points index layout.
+
+Builds two scratch copies of engagement_points on a synthetic table
+(points of many concurrent sessions interleaved in time, like production)
+and compares:
+- legacy: single-column indexes on id, session_id (x2), timestamp
+- composite: the layout add_engagement_point_indexes.py / models.py ship,
+  (session_id, timestamp), with INCLUDE (score, ear, student_id) on
+  Postgres (covering). SQLite has no INCLUDE and gets the plain index
+
+For each layout it reports index size (Postgres), bulk insert time, series
+read latency (p50/p95 over random sessions) and the query plan.
+
+Usage (from backend/):
+    python benchmarks/bench_series_index.py --rows 3000000
+    DATABASE_URL=postgresql://... python benchmarks/bench_series_index.py
+
+Scratch tables are dropped at the end; real tables are never touched.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, text
+
+TABLE_DDL = {
+    "postgresql": """
+        CREATE TABLE {t} (
+            id BIGSERIAL PRIMARY KEY,
+            session_id INTEGER NOT NULL,
+            student_id INTEGER,
+            timestamp TIMESTAMPTZ NOT NULL,
+            score DOUBLE PRECISION NOT NULL,
+            ear DOUBLE PRECISION
+        )
+    """,
+    "sqlite": """
+        CREATE TABLE {t} (
+            id INTEGER PRIMARY KEY,
+            session_id INTEGER NOT NULL,
+            student_id INTEGER,
+            timestamp DATETIME NOT NULL,
+            score FLOAT NOT NULL,
+            ear FLOAT
+        )
+    """,
+}
+
+# rows are interleaved across sessions: row g belongs to session g % S
+FILL_SQL = {
+    "postgresql": """
+        INSERT INTO {t} (session_id, student_id, timestamp, score, ear)
+        SELECT (g % :sessions) + 1,
+               (g % 40) + 1,
+               timestamptz '2025-01-01 00:00:00+00' + (g / :sessions) * interval '1 second',
+               random(),
+               random() * 0.4
+        FROM generate_series(0, :rows - 1) AS g
+    """,
+    "sqlite": """
+        WITH RECURSIVE g(x) AS (SELECT 0 UNION ALL SELECT x + 1 FROM g WHERE x < :rows - 1)
+        INSERT INTO {t} (session_id, student_id, timestamp, score, ear)
+        SELECT (x % :sessions) + 1,
+               (x % 40) + 1,
+               datetime('2025-01-01 00:00:00', '+' || (x / :sessions) || ' seconds'),
+               abs(random() % 1000) / 1000.0,
+               abs(random() % 400) / 1000.0
+        FROM g
+    """,
+}
+
+LAYOUTS = {
+    "legacy": [
+        "CREATE INDEX {t}_id ON {t} (id)",
+        "CREATE INDEX {t}_session_id ON {t} (session_id)",
+        "CREATE INDEX {t}_session ON {t} (session_id)",
+        "CREATE INDEX {t}_timestamp ON {t} (timestamp)",
+        "CREATE INDEX {t}_session_student_ts ON {t} (session_id, student_id, timestamp)",
+    ],
+    "composite": [
+        {
+            "postgresql": "CREATE INDEX {t}_session_ts ON {t} (session_id, timestamp) INCLUDE (score, ear, student_id)",
+            "sqlite": "CREATE INDEX {t}_session_ts ON {t} (session_id, timestamp)",
+        },
+        "CREATE INDEX {t}_session_student_ts ON {t} (session_id, student_id, timestamp)",
+    ],
+}
+
+SERIES_SQL = "SELECT timestamp, score, ear, student_id FROM {t} WHERE session_id = :sid ORDER BY timestamp"
+
+
+def _analyze(engine, table):
+    sql = f"VACUUM ANALYZE {table}" if engine.dialect.name == "postgresql" else f"ANALYZE {table}"
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(sql))
+
+
+def _plan(conn, dialect, table, sid):
+    if dialect == "postgresql":
+        rows = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + SERIES_SQL.format(t=table)), {"sid": sid})
+    else:
+        rows = conn.execute(text("EXPLAIN QUERY PLAN " + SERIES_SQL.format(t=table)), {"sid": sid})
+    return [" ".join(str(c) for c in row) for row in rows]
+
+
+def _index_size(conn, dialect, table):
+    if dialect != "postgresql":
+        return None
+    return conn.execute(text(
+        "SELECT pg_size_pretty(pg_indexes_size(:t))"
+    ), {"t": table}).scalar()
+
+
+def bench_layout(engine, name, rows, sessions, queries, insert_rows):
+    dialect = engine.dialect.name
+    table = f"bench_points_{name}"
+    result = {"layout": name}
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        conn.execute(text(TABLE_DDL[dialect].format(t=table)))
+
+        started = time.perf_counter()
+        conn.execute(text(FILL_SQL[dialect].format(t=table)), {"rows": rows, "sessions": sessions})
+        result["load_s"] = round(time.perf_counter() - started, 2)
+
+        started = time.perf_counter()
+        for ddl in LAYOUTS[name]:
+            sql = ddl[dialect] if isinstance(ddl, dict) else ddl
+            conn.execute(text(sql.format(t=table)))
+        result["index_build_s"] = round(time.perf_counter() - started, 2)
+
+    _analyze(engine, table)
+
+    with engine.connect() as conn:
+        result["index_size"] = _index_size(conn, dialect, table)
+
+        # Series reads over random sessions
+        rng = random.Random(42)
+        timings = []
+        for _ in range(queries):
+            sid = rng.randint(1, sessions)
+            started = time.perf_counter()
+            conn.execute(text(SERIES_SQL.format(t=table)), {"sid": sid}).fetchall()
+            timings.append((time.perf_counter() - started) * 1000.0)
+        timings.sort()
+        result["series_p50_ms"] = round(statistics.median(timings), 3)
+        result["series_p95_ms"] = round(timings[int(len(timings) * 0.95) - 1], 3)
+        result["plan"] = _plan(conn, dialect, table, rng.randint(1, sessions))
+
+    # Insert cost with the layout's indexes in place (executemany, like the flusher)
+    base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    batch = [
+        {
+            "session_id": (i % sessions) + 1,
+            "student_id": (i % 40) + 1,
+            "timestamp": base + timedelta(milliseconds=i),
+            "score": 0.5,
+            "ear": 0.25,
+        }
+        for i in range(insert_rows)
+    ]
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"INSERT INTO {table} (session_id, student_id, timestamp, score, ear) "
+            "VALUES (:session_id, :student_id, :timestamp, :score, :ear)"
+        ), batch)
+    result["insert_rows_per_s"] = int(insert_rows / (time.perf_counter() - started))
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="engagement_points index layout benchmark")
+    parser.add_argument("--rows", type=int, default=3_000_000, help="Synthetic rows per layout")
+    parser.add_argument("--sessions", type=int, default=3000, help="Distinct sessions")
+    parser.add_argument("--queries", type=int, default=200, help="Series reads per layout")
+    parser.add_argument("--insert-rows", type=int, default=20_000, help="Rows for the insert test")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"),
+                        help="Defaults to DATABASE_URL, else a temporary SQLite file")
+    args = parser.parse_args()
+
+    url = args.database_url
+    if not url:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_series_index.db')}"
+    engine = create_engine(url)
+
+    print(f"📊 {engine.dialect.name}: {args.rows:,} rows, {args.sessions:,} sessions "
+          f"(~{args.rows // args.sessions:,} points/session)")
+    print("=" * 60)
+
+    results = []
+    for name in LAYOUTS:
+        print(f"⏳ Building layout '{name}'...")
+        r = bench_layout(engine, name, args.rows, args.sessions, args.queries, args.insert_rows)
+        results.append(r)
+
+        print(f"✅ {name}")
+        for key in ("load_s", "index_build_s", "index_size", "series_p50_ms", "series_p95_ms", "insert_rows_per_s"):
+            if r[key] is not None:
+                print(f"   {key:<18} {r[key]}")
+        print("   plan:")
+        for line in r["plan"]:
+            print(f"     {line}")
+        print("-" * 60)
+
+    legacy, composite = results
+    print(f"Series p50 speedup: {legacy['series_p50_ms'] / max(composite['series_p50_ms'], 1e-9):.2f}x")
+    print(f"Insert throughput:  {composite['insert_rows_per_s'] / max(legacy['insert_rows_per_s'], 1):.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
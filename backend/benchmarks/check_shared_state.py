@@ -0,0 +1,157 @@
+# backend/benchmarks/check_shared_state.py
+"""
+Runs the same checks against every SharedState backend:
+- SQLiteSharedState on a temporary file
+- RedisSharedState on fakeredis (an in-process Redis, runs the token
+  bucket Lua script too), or on a real server with --redis-url
+
+Registry: claim_process only claims a free key, set/get/list/remove,
+refresh_process only touches the entry of the same pid.
+Token bucket: a full bucket hands out 'capacity' tokens then refuses
+with retry_after = missing tokens / rate, refills at 'rate' per second
+up to 'capacity', buckets are independent, TokenLeases stays within it.
+
+Exits 1 if a check fails. Needs fakeredis (and lupa, for Lua) unless
+--redis-url is given.
+
+Usage (from backend/):
+    python benchmarks/check_shared_state.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Importing shared_state creates the global instance: keep its file out of the tree
+os.environ.setdefault("SHARED_STATE_PATH", os.path.join(tempfile.mkdtemp(), "shared_state.db"))
+
+from shared_state import SQLiteSharedState, RedisSharedState, TokenLeases  # noqa: E402
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+RATE = 20.0  # tokens/second: slow enough to measure, fast enough to wait for
+CAPACITY = 5
+
+
+class Checker:
+    def __init__(self):
+        self.failed = 0
+
+    def check(self, name: str, ok: bool, detail: str = ""):
+        if not ok:
+            self.failed += 1
+        print(f"   {'✅' if ok else '❌'} {name}{f'  ({detail})' if detail else ''}")
+
+
+def check_registry(state, c: Checker):
+    key = f"session:{uuid.uuid4().hex[:8]}"
+    c.check("claim a free key", state.claim_process(key, {"pid": None, "started_at": 1.0}))
+    c.check("claim a taken key fails", not state.claim_process(key, {"pid": None, "started_at": 2.0}))
+    c.check("get returns the claim", state.get_process(key) == {"pid": None, "started_at": 1.0})
+
+    state.set_process(key, {"pid": 42, "started_at": 1.0, "seen_at": 1.0})
+    c.check("set replaces the entry", state.get_process(key) == {"pid": 42, "started_at": 1.0, "seen_at": 1.0})
+    c.check("list contains the entry", state.list_processes().get(key, {}).get("pid") == 42)
+
+    c.check("refresh the same pid", state.refresh_process(key, 42, 5.0))
+    c.check("refresh sets seen_at", state.get_process(key)["seen_at"] == 5.0)
+    c.check("refresh another pid fails", not state.refresh_process(key, 43, 9.0))
+    c.check("refresh of another pid leaves seen_at", state.get_process(key)["seen_at"] == 5.0)
+    c.check("refresh a missing key fails", not state.refresh_process(f"{key}:missing", 42, 9.0))
+
+    state.remove_process(key)
+    c.check("remove deletes the entry", state.get_process(key) is None and key not in state.list_processes())
+    c.check("claim after remove", state.claim_process(key, {"pid": None}))
+    state.remove_process(key)
+
+
+def check_bucket(state, c: Checker):
+    key = f"check:{uuid.uuid4().hex[:8]}"
+    results = [state.take(key, RATE, CAPACITY) for _ in range(CAPACITY)]
+    c.check(f"full bucket allows {CAPACITY}", all(ok for ok, _ in results) and all(r == 0.0 for _, r in results))
+
+    ok, retry_after = state.take(key, RATE, CAPACITY)
+    c.check("empty bucket refuses", not ok)
+    # Less than one token is missing: some refilled since the first take
+    c.check(
+        "retry_after = missing tokens / rate",
+        0.0 < retry_after <= 1.0 / RATE,
+        f"{retry_after * 1000:.1f}ms, at most {1000.0 / RATE:.1f}ms",
+    )
+
+    other = f"{key}:other"
+    c.check("other buckets are independent", state.take(other, RATE, CAPACITY)[0])
+
+    time.sleep(2.0 / RATE + 0.02)  # two tokens and some
+    refilled = sum(state.take(key, RATE, CAPACITY)[0] for _ in range(CAPACITY))
+    c.check("refills at rate", refilled == 2, f"{refilled} allowed after {2.0 / RATE + 0.02:.2f}s, expected 2")
+
+    time.sleep(CAPACITY * 3 / RATE)  # three times what fills it
+    refilled = sum(state.take(key, RATE, CAPACITY)[0] for _ in range(CAPACITY * 3))
+    c.check("refill stops at capacity", refilled == CAPACITY, f"{refilled} allowed, expected {CAPACITY}")
+
+    big = f"{key}:cost"
+    ok, _ = state.take(big, RATE, CAPACITY, cost=CAPACITY)
+    ok_again, retry_after = state.take(big, RATE, CAPACITY, cost=CAPACITY)
+    c.check(
+        "cost takes several tokens",
+        ok and not ok_again and retry_after > (CAPACITY - 1) / RATE,
+        f"retry_after {retry_after * 1000:.0f}ms",
+    )
+
+
+def check_leases(state, c: Checker):
+    # Leases are capacity // SHARED_STATE_LEASE_DIVISOR tokens: needs a bigger bucket
+    rate, capacity = 200.0, 100
+    key = f"lease:{uuid.uuid4().hex[:8]}"
+    leases = TokenLeases(state)
+    started = time.time()  # The bucket refills from the first take on
+    under = sum(leases.take(key, rate, capacity)[0] for _ in range(capacity))
+    c.check("leases allow a full bucket", under == capacity, f"{under} of {capacity}")
+    c.check("leases batch backend calls", leases.backend_calls < capacity / 2, f"{leases.backend_calls} calls")
+
+    allowed = under
+    while time.time() - started < 0.5:
+        allowed += leases.take(key, rate, capacity)[0]
+    most = capacity + rate * (time.time() - started)
+    c.check("leases stay within the bucket", allowed <= most, f"{allowed} allowed, at most {most:.0f}")
+
+
+def run(name: str, state, c: Checker):
+    print(f"🔍 {name}")
+    check_registry(state, c)
+    check_bucket(state, c)
+    check_leases(state, c)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SharedState backend checks")
+    parser.add_argument("--redis-url", help="Check a real Redis server instead of fakeredis")
+    args = parser.parse_args()
+
+    c = Checker()
+    run("SQLiteSharedState", SQLiteSharedState(os.path.join(tempfile.mkdtemp(), "check.db")), c)
+
+    prefix = f"check-{uuid.uuid4().hex[:8]}:"
+    if args.redis_url:
+        import redis
+
+        run(f"RedisSharedState ({args.redis_url.split('@')[-1]})", RedisSharedState(redis.Redis.from_url(args.redis_url), prefix), c)
+    elif fakeredis is not None:
+        run("RedisSharedState (fakeredis)", RedisSharedState(fakeredis.FakeRedis(), prefix), c)
+    else:
+        print("⚠️ fakeredis not installed: RedisSharedState not checked (pip install fakeredis lupa)")
+
+    print("=" * 60)
+    print(f"{'✅ All checks passed' if not c.failed else f'❌ {c.failed} check(s) failed'}")
+    return 1 if c.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
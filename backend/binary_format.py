@@ -0,0 +1,229 @@
+# backend/binary_format.py
+"""
+Binary encodings of engagement series, chosen by the Accept header.
+
+    Accept: application/vnd.apache.arrow.stream   -> Arrow IPC stream
+    Accept: application/msgpack                   -> MessagePack
+
+JSON stays the default (no Accept, */*, application/json). Both binary
+encodings carry the same typed columns, taken straight from NumPy arrays:
+    t_ms        int64    timestamp, epoch milliseconds (Arrow: timestamp[ms, UTC])
+    score       float64
+    ear         float64  NaN / Arrow null = no EAR
+    student_id  int64    -1 / Arrow null  = no student
+(rollup buckets add count, score_min, score_max, score_std)
+
+- MessagePack: {"count": n, "columns": {name: {"dtype": "<f8", "data": <bin>}}}
+  where data is the raw little-endian column buffer (JS: new Float64Array(...)).
+  Report fields are regular MessagePack values, the timeline is a column block
+- Arrow: one record batch; non-column fields (report metadata and
+  analytics) are JSON in the schema metadata under b"meta". A document
+  without a series (advanced analytics) is an empty batch plus b"meta"
+
+Both libraries are optional: when the requested one isn't installed the
+client gets JSON if it also accepts it, otherwise 406.
+"""
+import json
+from typing import Optional
+
+import numpy as np
+from fastapi import HTTPException, Response
+
+from series_format import _epoch_ms
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+MSGPACK = "application/msgpack"
+MSGPACK_ALIASES = (MSGPACK, "application/x-msgpack", "application/vnd.msgpack")
+JSON_TYPES = ("application/json", "application/*", "*/*")
+
+# Integer columns where negative values mean "missing"
+NULLABLE_INT_COLUMNS = ("student_id",)
+
+
+def _accept_items(accept: str):
+    """(media_type, q) pairs, highest q first (stable for ties)."""
+    items = []
+    for part in accept.split(","):
+        media, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media and q > 0:
+            items.append((media.strip().lower(), q))
+    return sorted(items, key=lambda item: -item[1])
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """
+    Binary media type to answer with, or None for JSON.
+
+    Raises 406 when only binary types are acceptable and none of them can
+    be produced (library not installed).
+    """
+    if not accept:
+        return None
+
+    wanted_binary = False
+    for media, _ in _accept_items(accept):
+        if media == ARROW_STREAM:
+            wanted_binary = True
+            if pa is not None:
+                return ARROW_STREAM
+        elif media in MSGPACK_ALIASES:
+            wanted_binary = True
+            if msgpack is not None:
+                return MSGPACK
+        elif media in JSON_TYPES:
+            return None
+
+    if wanted_binary:
+        raise HTTPException(
+            status_code=406,
+            detail="Requested binary encoding is not available on this server (use application/json)"
+        )
+    return None
+
+
+# ========== COLUMNS ==========
+
+def point_columns(rows, fields=("score", "ear", "student_id")) -> dict:
+    """Columns from rows with .timestamp (+ the given fields), ordered by time."""
+    n = len(rows)
+    columns = {"t_ms": np.fromiter((_epoch_ms(r.timestamp) for r in rows), dtype=np.int64, count=n)}
+    if "score" in fields:
+        columns["score"] = np.fromiter((r.score for r in rows), dtype=np.float64, count=n)
+    if "ear" in fields:
+        columns["ear"] = np.fromiter(
+            (np.nan if r.ear is None else r.ear for r in rows), dtype=np.float64, count=n
+        )
+    if "student_id" in fields:
+        columns["student_id"] = np.fromiter(
+            (-1 if r.student_id is None else r.student_id for r in rows), dtype=np.int64, count=n
+        )
+    return columns
+
+
+def bucket_columns(buckets) -> dict:
+    """Columns from EngagementRollup rows (bucket means plus count/min/max/std)."""
+    n = len(buckets)
+    count = np.fromiter((b.count for b in buckets), dtype=np.int64, count=n)
+    score_sum = np.fromiter((b.score_sum for b in buckets), dtype=np.float64, count=n)
+    score_sumsq = np.fromiter((b.score_sumsq for b in buckets), dtype=np.float64, count=n)
+    ear_count = np.fromiter((b.ear_count for b in buckets), dtype=np.int64, count=n)
+    ear_sum = np.fromiter((b.ear_sum for b in buckets), dtype=np.float64, count=n)
+
+    score = score_sum / np.maximum(count, 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ear = np.where(ear_count > 0, ear_sum / ear_count, np.nan)
+
+    return {
+        "t_ms": np.fromiter((_epoch_ms(b.bucket_start) for b in buckets), dtype=np.int64, count=n),
+        "score": score,
+        "ear": ear,
+        "count": count,
+        "score_min": np.fromiter((b.score_min for b in buckets), dtype=np.float64, count=n),
+        "score_max": np.fromiter((b.score_max for b in buckets), dtype=np.float64, count=n),
+        # Guard tiny negative variance from float rounding (as engagement_rollups)
+        "score_std": np.sqrt(np.maximum(score_sumsq / np.maximum(count, 1) - score * score, 0.0)),
+    }
+
+
+def ring_columns(t_us, score, ear, student) -> dict:
+    """Columns from live_buffer arrays (already NumPy)."""
+    return {"t_ms": t_us // 1000, "score": score, "ear": ear, "student_id": student}
+
+
+# ========== ENCODERS ==========
+
+def _encode_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    raise TypeError(f"Cannot encode {type(obj).__name__}")
+
+
+def column_block(columns: dict) -> dict:
+    """MessagePack column block: raw little-endian buffers, no per-value encoding."""
+    n = len(next(iter(columns.values()))) if columns else 0
+    block = {}
+    for name, values in columns.items():
+        values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder("<"))
+        block[name] = {"dtype": values.dtype.str, "data": memoryview(values).cast("B")}
+    return {"count": n, "columns": block}
+
+
+def encode_msgpack(doc: dict) -> bytes:
+    return msgpack.packb(doc, use_bin_type=True, default=_encode_default)
+
+
+def _arrow_array(name: str, values: np.ndarray):
+    if name == "t_ms":
+        return pa.array(values.view("datetime64[ms]"), type=pa.timestamp("ms", tz="UTC"))
+    if values.dtype.kind == "f":
+        missing = np.isnan(values)
+        # No mask -> the Arrow array wraps the NumPy buffer without a copy
+        return pa.array(values, mask=missing) if missing.any() else pa.array(values)
+    if name in NULLABLE_INT_COLUMNS:
+        missing = values < 0
+        return pa.array(values, mask=missing) if missing.any() else pa.array(values)
+    return pa.array(values)
+
+
+def encode_arrow(columns: dict, meta: dict = None) -> bytes:
+    batch = pa.RecordBatch.from_arrays(
+        [_arrow_array(name, values) for name, values in columns.items()],
+        names=list(columns),
+    )
+    schema = batch.schema
+    if meta:
+        schema = schema.with_metadata({b"meta": json.dumps(meta, default=_encode_default).encode()})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+# ========== RESPONSES ==========
+
+def series_response(media_type: str, columns: dict, headers: dict = None) -> Response:
+    """A series (points or buckets) in the negotiated binary encoding."""
+    if media_type == ARROW_STREAM:
+        body = encode_arrow(columns)
+    else:
+        body = encode_msgpack(column_block(columns))
+    return Response(body, media_type=media_type, headers={"Vary": "Accept", **(headers or {})})
+
+
+def document_response(media_type: str, doc: dict, columns_key: str = None, columns: dict = None) -> Response:
+    """
+    A JSON-like document whose doc[columns_key] is a series (e.g. report timeline).
+
+    MessagePack: the document with that key as a column block.
+    Arrow: the series as the record batch, the rest of the document as metadata.
+    Without columns_key the whole document is plain values / metadata.
+    """
+    rest = {k: v for k, v in doc.items() if k != columns_key}
+    if media_type == ARROW_STREAM:
+        body = encode_arrow(columns or {}, meta=rest)
+    elif columns_key is None:
+        body = encode_msgpack(rest)
+    else:
+        body = encode_msgpack({**rest, columns_key: column_block(columns)})
+    return Response(body, media_type=media_type, headers={"Vary": "Accept"})
@@ -1,15 +1,147 @@
 import os
 import hashlib
+import threading
 from fastapi import Header, HTTPException, Request
-from datetime import datetime
+from datetime import datetime, timezone
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from database import SessionLocal
+from database import SessionLocal, engine
+
+DEVICE_AUDIT_FLUSH_SECONDS = float(os.getenv("DEVICE_AUDIT_FLUSH_SECONDS", "10"))
 
 def hash_device_key(key: str) -> str:
     """Hash device key for logging (don't store plaintext)"""
     return hashlib.sha256(key.encode()).hexdigest()[:16]
 
 
+class DeviceAuditAggregator:
+    """
+    In-memory device audit counters, flushed as periodic upserts.
+
+    Every access is folded into a counter keyed by (device, session, status):
+    points_uploaded, request_count, last client IP, first/last seen.
+    A background thread upserts the counters into device_logs with
+    INSERT ... ON CONFLICT DO UPDATE, so audit cost depends on the number
+    of active devices, not on the upload rate.
+
+    Note: rows with session_id NULL (e.g. rejected keys) never conflict in
+    SQL, so they produce at most one row per key per flush interval.
+    """
+
+    def __init__(self, flush_seconds: float = DEVICE_AUDIT_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(
+        self,
+        device_key_hash: str,
+        session_id: int | None,
+        client_ip: str,
+        status: str,
+        details: str | None = None,
+        points: int = 0,
+    ):
+        now = datetime.now(timezone.utc)
+        key = (device_key_hash, session_id, status)
+
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None:
+                self._counters[key] = {
+                    "device_key_hash": device_key_hash,
+                    "session_id": session_id,
+                    "status": status,
+                    "client_ip": client_ip,
+                    "details": details,
+                    "points_uploaded": points,
+                    "request_count": 1,
+                    "first_seen_at": now,
+                    "timestamp": now,
+                }
+            else:
+                entry["points_uploaded"] += points
+                entry["request_count"] += 1
+                entry["client_ip"] = client_ip
+                entry["timestamp"] = now
+                if details is not None:
+                    entry["details"] = details
+
+    def _upsert_statement(self, dialect_name: str):
+        from models import DeviceLog
+
+        if dialect_name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        table = DeviceLog.__table__
+        stmt = insert(table)
+        excluded = stmt.excluded
+
+        return stmt.on_conflict_do_update(
+            index_elements=["device_key_hash", "session_id", "status"],
+            set_={
+                "points_uploaded": func.coalesce(table.c.points_uploaded, 0) + excluded.points_uploaded,
+                "request_count": func.coalesce(table.c.request_count, 0) + excluded.request_count,
+                "client_ip": excluded.client_ip,
+                "details": excluded.details,
+                "timestamp": excluded.timestamp,
+            },
+        )
+
+    def flush(self) -> int:
+        """Upsert all pending counters. Returns the number of rows written."""
+        with self._lock:
+            rows = list(self._counters.values())
+            self._counters = {}
+
+        if not rows:
+            return 0
+
+        try:
+            with engine.begin() as conn:
+                conn.execute(self._upsert_statement(conn.dialect.name), rows)
+            return len(rows)
+        except Exception as e:
+            print(f"⚠️  Failed to flush device audit counters: {e}")
+            # Merge the rows back so counts aren't lost
+            with self._lock:
+                for row in rows:
+                    key = (row["device_key_hash"], row["session_id"], row["status"])
+                    entry = self._counters.get(key)
+                    if entry is None:
+                        self._counters[key] = row
+                    else:
+                        entry["points_uploaded"] += row["points_uploaded"]
+                        entry["request_count"] += row["request_count"]
+                        entry["first_seen_at"] = row["first_seen_at"]
+            return 0
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="device-audit-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+        self.flush()
+
+
+# Global instance (one per API process)
+device_audit = DeviceAuditAggregator()
+
+
 def log_device_access(
     device_key: str,
     session_id: int | None,
@@ -20,6 +152,9 @@ def log_device_access(
 ):
     """
     ✅ NEW: Log all device access attempts for audit trail.
+
+    Only bumps in-memory counters - device_audit flushes them to
+    device_logs periodically (no DB session per request).
     
     Args:
         device_key: Actual device key
@@ -29,25 +164,14 @@ def log_device_access(
         details: Additional details
         points: Number of points uploaded
     """
-    from models import DeviceLog
-    
-    db = SessionLocal()
-    try:
-        log = DeviceLog(
-            device_key_hash=hash_device_key(device_key),
-            session_id=session_id,
-            client_ip=client_ip,
-            status=status,
-            details=details,
-            points_uploaded=points
-        )
-        db.add(log)
-        db.commit()
-        print(f"📝 Device log: {status} from {client_ip}")
-    except Exception as e:
-        print(f"⚠️  Failed to log device access: {e}")
-    finally:
-        db.close()
+    device_audit.record(
+        device_key_hash=hash_device_key(device_key),
+        session_id=session_id,
+        client_ip=client_ip,
+        status=status,
+        details=details,
+        points=points,
+    )
 
 
 def verify_camera_device(
@@ -0,0 +1,109 @@
+# backend/downsample.py
+"""
+Downsampling of engagement series for charts (?max_points=N).
+
+A chart can't draw more points than it has pixels, so series requests
+may ask for at most max_points points that keep the visual shape:
+
+- lttb    Largest-Triangle-Three-Buckets: per bucket, keeps the point
+          forming the largest triangle with the previously kept point and
+          the next bucket's average. Best line shape for a given budget
+- minmax  Min/max envelope: per bucket, keeps the lowest and the highest
+          point. Never hides a spike or a drop
+
+Both return at most n_out indices into the input (sorted, first and
+last point always kept when n_out >= 2), so the selected points are
+original samples - never averages.
+"""
+import numpy as np
+
+from series_format import _epoch_ms
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """
+    Indices of n_out points chosen by LTTB. x must be ascending.
+
+    Bucket bounds and next-bucket averages are computed up front in NumPy;
+    only the choice of each bucket's point (which depends on the previous
+    choice) walks the buckets.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        # No interior bucket: first / last only
+        return np.array([0, n - 1][:max(n_out, 0)], dtype=np.int64)
+
+    # n-2 interior points split into n_out-2 buckets
+    edges = (np.arange(n_out - 1) * ((n - 2) / (n_out - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    starts, ends = edges[:-1], edges[1:]
+
+    # Average of each bucket, plus the last point as the "next bucket" of the last one
+    counts = ends - starts
+    avg_x = np.append(np.add.reduceat(x[1:n - 1], starts - 1) / counts, x[-1])
+    avg_y = np.append(np.add.reduceat(y[1:n - 1], starts - 1) / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = starts[i], ends[i]
+        ax, ay = x[a], y[a]
+        # Twice the triangle area; the constant factor doesn't change the argmax
+        area = np.abs((ax - avg_x[i + 1]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y[i + 1] - ay))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_indices(y, n_out: int) -> np.ndarray:
+    """Indices of the min and max point of each of ~n_out/2 buckets (fully vectorized)."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 4:
+        # Not even one min/max pair fits next to first and last
+        return lttb_indices(np.arange(n), y, n_out)
+
+    # first + last + a min and a max per bucket: 2 * n_buckets + 2 <= n_out
+    n_buckets = (n_out - 2) // 2
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+
+    # Sorted by (bucket, y): each bucket occupies [edges[k], edges[k+1]) of the order
+    order = np.lexsort((y, bucket))
+    lows = order[edges[:-1]]
+    highs = order[edges[1:] - 1]
+
+    return np.unique(np.concatenate(([0, n - 1], lows, highs)))
+
+
+def downsample_indices(x, y, n_out: int, method: str = "lttb") -> np.ndarray:
+    if method == "minmax":
+        return minmax_indices(y, n_out)
+    return lttb_indices(x, y, n_out)
+
+
+def downsample_rows(rows, n_out: int, method: str = "lttb", scores=None, time_attr: str = "timestamp") -> list:
+    """
+    Downsample ORM rows / Row tuples, already ordered by time.
+
+    scores defaults to each row's .score; pass it for rows whose plotted
+    value is derived (e.g. rollup bucket means).
+    """
+    if n_out is None or len(rows) <= n_out:
+        return rows
+
+    x = np.fromiter((_epoch_ms(getattr(r, time_attr)) for r in rows), dtype=np.int64, count=len(rows))
+    y = np.fromiter((r.score for r in rows) if scores is None else scores, dtype=np.float64, count=len(rows))
+    return [rows[i] for i in downsample_indices(x - x[0], y, n_out, method)]
@@ -1,19 +1,43 @@
 # backend/engagement.py
 from datetime import datetime,timezone
 from typing import List, Optional
-from models import DeviceLog
-from fastapi import APIRouter,Header, Depends, HTTPException, Query, UploadFile, File, Request,BackgroundTasks
-from pydantic import BaseModel, Field
+from fastapi import APIRouter,Header, Depends, HTTPException, Query, UploadFile, File, Request, Response, BackgroundTasks
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 load_dotenv()
 from database import SessionLocal
-from models import EngagementSession, EngagementPoint, User,Attendance
-from auth import get_current_user
-from device_auth import verify_camera_device
-from engagement_model import predict_engagement
+from models import EngagementSession, EngagementPoint, EngagementRollup, User,Attendance
+from auth import get_current_user, create_stream_ticket, get_user_from_stream_ticket, STREAM_TICKET_SECONDS
+from device_auth import verify_camera_device, device_audit, hash_device_key
+from engagement_model import predict_engagement, predict_engagement_batch, ear_window_features
+from session_registry import session_registry
+from engagement_rollups import RESOLUTION_PARAMS, bucket_to_dict, rollup_query, rollup_summary
+from series_format import SERIES_FORMATS, columnar_series, columnar_arrays
+from live_feed import live_feed, format_sse, point_key, unseen_points, END, OVERFLOW, LIVE_FEED_ENABLED, LIVE_FEED_KEEPALIVE_SECONDS
+from live_buffer import live_buffer, points_from_arrays, to_epoch_us, LIVE_BUFFER_ENABLED
+from live_stats import live_stats, LIVE_STATS_ENABLED, LIVE_STATS_PUSH_SECONDS
+from analytics_accumulator import analytics_accumulator, ANALYTICS_ACCUMULATOR_ENABLED
+from heartbeats import heartbeat_tracker
+from session_watchdog import session_watchdog
+from shared_state import shared_state, token_leases, rate_limit
+from downsample import DOWNSAMPLE_METHODS, downsample_indices, downsample_rows
+from engagement_series import fetch_series
+from binary_format import negotiate, point_columns, bucket_columns, series_response, document_response
+from http_cache import freeze_point_count, session_etag, request_variant, etag_matches, not_modified, set_cache_headers, with_cache_headers
+from ingest_queue import (
+    ingest_queue,
+    write_points,
+    INGEST_WRITE_BEHIND,
+    INGEST_RETRY_AFTER_SECONDS,
+)
 import os
 import random
+import socket
+import time
 import string
 import base64
 import io
@@ -22,11 +46,16 @@ from PIL import Image
 
 import subprocess
 import psutil
+import asyncio
+import json
 
 from pathlib import Path
 from auth import create_access_token  # Add this
 import numpy as np
 BACKEND_URL = os.getenv("BACKEND_BASE", "http://127.0.0.1:8000")
+MAX_POINTS_PER_BATCH = int(os.getenv("MAX_POINTS_PER_BATCH", "500"))
+SERIES_PAGE_MAX = int(os.getenv("SERIES_PAGE_MAX", "10000"))
+SERIES_STREAM_CHUNK = int(os.getenv("SERIES_STREAM_CHUNK", "2000"))
 def get_db():
     """Dependency to get database session"""
     db = SessionLocal()  # ✅ Create session using SessionLocal
@@ -35,7 +64,113 @@ def get_db():
     finally:
         db.close()
 # ========== GLOBAL VARIABLES ==========
+# Popen handles of the ML processes THIS worker spawned (to poll/reap them).
+# Which process runs for which session is in shared_state, seen by every worker.
 ACTIVE_ML_PROCESSES = {}
+ML_HOST = socket.gethostname()
+# A claim without a pid older than this is a spawn that died with its worker
+ML_START_GRACE_SECONDS = 60
+# The spawning worker refreshes its entries' seen_at; other hosts treat an
+# entry not seen for ML_SEEN_TTL_SECONDS as stopped (that host is gone)
+ML_SEEN_INTERVAL_SECONDS = int(os.getenv("ML_SEEN_INTERVAL_SECONDS", "10"))
+ML_SEEN_TTL_SECONDS = int(os.getenv("ML_SEEN_TTL_SECONDS", "45"))
+
+
+def _ml_key(session_id: int) -> str:
+    return f"ml:{session_id}"
+
+
+def _ml_entry(proc, student_id: int) -> dict:
+    try:
+        create_time = psutil.Process(proc.pid).create_time()
+    except psutil.Error:
+        create_time = None
+    return {
+        "pid": proc.pid,
+        "host": ML_HOST,
+        "worker_pid": os.getpid(),
+        "student_id": student_id,
+        "create_time": create_time,  # Detects pid reuse
+        "started_at": time.time(),
+        "seen_at": time.time(),
+    }
+
+
+def _ml_process_state(session_id: int, entry: dict) -> tuple[str, Optional[int]]:
+    """'starting' / 'running' / 'stopped' of a registered ML process, plus exit code if known."""
+    if entry.get("pid") is None:
+        fresh = time.time() - entry["started_at"] < ML_START_GRACE_SECONDS
+        return ("starting" if fresh else "stopped"), None
+
+    proc = ACTIVE_ML_PROCESSES.get(session_id)
+    if proc is not None and proc.pid == entry["pid"]:
+        returncode = proc.poll()
+        return ("running" if returncode is None else "stopped"), returncode
+
+    if entry["host"] != ML_HOST:
+        # Spawned on another host: alive only while its worker keeps refreshing seen_at
+        seen_at = entry.get("seen_at", entry["started_at"])
+        if time.time() - seen_at > ML_SEEN_TTL_SECONDS:
+            return "stopped", None
+        return "running", None
+
+    # Spawned by another worker of this host
+    try:
+        other = psutil.Process(entry["pid"])
+        if entry.get("create_time") is not None and abs(other.create_time() - entry["create_time"]) > 1:
+            return "stopped", None
+        if other.status() == psutil.STATUS_ZOMBIE:
+            return "stopped", None
+        return "running", None
+    except psutil.NoSuchProcess:
+        return "stopped", None
+
+
+def refresh_ml_processes() -> int:
+    """Mark the ML processes this worker spawned (and that still run) as seen. Returns how many."""
+    refreshed = 0
+    now = time.time()
+    for session_id, proc in list(ACTIVE_ML_PROCESSES.items()):
+        if proc.poll() is None and shared_state.refresh_process(_ml_key(session_id), proc.pid, now):
+            refreshed += 1
+    return refreshed
+
+
+def ml_liveness_loop():
+    while True:
+        time.sleep(ML_SEEN_INTERVAL_SECONDS)
+        try:
+            refresh_ml_processes()
+        except Exception as e:
+            print(f"⚠️ ML process refresh failed: {e}")
+
+
+def _ml_forget(session_id: int):
+    shared_state.remove_process(_ml_key(session_id))
+    ACTIVE_ML_PROCESSES.pop(session_id, None)
+
+
+def _ml_terminate(session_id: int, entry: dict):
+    """SIGTERM, then kill after 5s. Works for processes of any worker on this host."""
+    proc = ACTIVE_ML_PROCESSES.get(session_id)
+    if proc is None or proc.pid != entry["pid"]:
+        if entry["host"] != ML_HOST:
+            raise HTTPException(409, f"ML process runs on host {entry['host']}")
+        proc = psutil.Process(entry["pid"])
+
+    proc.terminate()
+    try:
+        proc.wait(timeout=5)
+        print(f"✅ ML process terminated gracefully")
+    except (subprocess.TimeoutExpired, psutil.TimeoutExpired):
+        print(f"⚠️ Process didn't respond to SIGTERM, force killing...")
+        proc.kill()
+        try:
+            proc.wait(timeout=5)
+        except (subprocess.TimeoutExpired, psutil.TimeoutExpired):
+            pass  # Not our child: stays a zombie until its worker reaps it
+        print(f"✅ ML process force killed")
+
 router = APIRouter(prefix="/api/engagement", tags=["engagement"])      
 def get_ml_script_path():
     """
@@ -199,12 +334,24 @@ def start_ml_process(
         
         print("✅ Attendance validation passed\n")
         
-        if session_id in ACTIVE_ML_PROCESSES:
-            proc = ACTIVE_ML_PROCESSES[session_id]
-            if proc.poll() is None:
-                return {"status": "already_running", "session_id": session_id, "pid": proc.pid}
-            else:
-                del ACTIVE_ML_PROCESSES[session_id]
+        key = _ml_key(session_id)
+        entry = shared_state.get_process(key)
+        if entry is not None:
+            state, _ = _ml_process_state(session_id, entry)
+            if state != "stopped":
+                return {"status": "already_running", "session_id": session_id, "pid": entry.get("pid")}
+            _ml_forget(session_id)
+
+        # Claim the session before spawning: two workers must not both start one
+        claimed = shared_state.claim_process(key, {
+            "pid": None,
+            "host": ML_HOST,
+            "worker_pid": os.getpid(),
+            "student_id": current_user.id,
+            "started_at": time.time(),
+        })
+        if not claimed:
+            return {"status": "already_running", "session_id": session_id, "pid": None}
         
         print("✅ Active process check passed\n")
         
@@ -264,7 +411,6 @@ def start_ml_process(
             print(f"✅ Process spawned: PID {proc.pid}")
             print(f"⏳ Waiting 3 seconds to check for immediate crashes...\n")
             
-            import time
             time.sleep(3)
             
             returncode = proc.poll()
@@ -287,6 +433,7 @@ def start_ml_process(
                 raise HTTPException(500, f"ML crashed with exit code {returncode}")
             
             ACTIVE_ML_PROCESSES[session_id] = proc
+            shared_state.set_process(key, _ml_entry(proc, current_user.id))
             
             print(f"{'='*80}")
             print(f"✅ ML PROCESS RUNNING")
@@ -304,11 +451,13 @@ def start_ml_process(
             
         except FileNotFoundError as e:
             print(f"❌ FileNotFoundError: {e}\n")
+            shared_state.remove_process(key)
             import traceback
             traceback.print_exc()
             raise HTTPException(500, str(e))
         except Exception as e:
             print(f"❌ Exception in ML spawn: {e}\n")
+            shared_state.remove_process(key)
             import traceback
             traceback.print_exc()
             raise
@@ -339,53 +488,51 @@ def stop_ml_process(
     if current_user.role != "student":
         raise HTTPException(403, "Only students can stop ML process")
     
-    # 2️⃣ Check if process exists
-    if session_id not in ACTIVE_ML_PROCESSES:
+    # 2️⃣ Check if process exists (in any worker)
+    entry = shared_state.get_process(_ml_key(session_id))
+    if entry is None:
         return {
             "status": "not_running",
             "session_id": session_id,
             "message": "No active ML process for this session"
         }
     
-    proc = ACTIVE_ML_PROCESSES[session_id]
-    
     # 3️⃣ Check if process is still alive
-    if proc.poll() is not None:
+    state, _ = _ml_process_state(session_id, entry)
+    if state == "stopped":
         # Already dead
-        del ACTIVE_ML_PROCESSES[session_id]
+        _ml_forget(session_id)
         return {
             "status": "already_stopped",
             "session_id": session_id,
             "message": "ML process was already stopped"
         }
+    if state == "starting":
+        raise HTTPException(409, "ML process is still starting")
     
-    # 4️⃣ Terminate gracefully
+    # 4️⃣ Terminate gracefully (SIGTERM, force kill after 5 seconds)
     try:
-        print(f"🛑 Stopping ML process for session {session_id} (PID: {proc.pid})")
-        
-        # Try graceful termination first (SIGTERM on Unix, TerminateProcess on Windows)
-        proc.terminate()
-        
-        # Wait up to 5 seconds for graceful shutdown
-        try:
-            proc.wait(timeout=5)
-            print(f"✅ ML process terminated gracefully")
-        except subprocess.TimeoutExpired:
-            # Force kill if it doesn't respond
-            print(f"⚠️ Process didn't respond to SIGTERM, force killing...")
-            proc.kill()
-            proc.wait()
-            print(f"✅ ML process force killed")
+        print(f"🛑 Stopping ML process for session {session_id} (PID: {entry['pid']})")
+        _ml_terminate(session_id, entry)
         
         # Clean up reference
-        del ACTIVE_ML_PROCESSES[session_id]
+        _ml_forget(session_id)
         
         return {
             "status": "stopped",
             "session_id": session_id,
             "message": "ML process terminated"
         }
-        
+    
+    except HTTPException:
+        raise
+    except psutil.NoSuchProcess:
+        _ml_forget(session_id)
+        return {
+            "status": "already_stopped",
+            "session_id": session_id,
+            "message": "ML process was already stopped"
+        }
     except Exception as e:
         print(f"❌ Error stopping ML process: {e}")
         raise HTTPException(500, f"Failed to stop ML process: {str(e)}")
@@ -402,31 +549,33 @@ def get_ml_status(
     
     ✅ Useful for frontend to verify ML is active
     ✅ Returns PID if running, status if stopped
+    ✅ Same answer from every API worker (shared_state)
     """
     
-    if session_id not in ACTIVE_ML_PROCESSES:
+    entry = shared_state.get_process(_ml_key(session_id))
+    if entry is None:
         return {
             "status": "not_running",
             "session_id": session_id,
             "is_active": False
         }
     
-    proc = ACTIVE_ML_PROCESSES[session_id]
-    is_alive = proc.poll() is None  # None = still running
+    state, returncode = _ml_process_state(session_id, entry)
     
-    if is_alive:
+    if state != "stopped":
         return {
-            "status": "running",
+            "status": state,
             "session_id": session_id,
             "is_active": True,
-            "pid": proc.pid
+            "pid": entry["pid"],
+            "host": entry["host"],
         }
     else:
         return {
             "status": "stopped",
             "session_id": session_id,
             "is_active": False,
-            "exit_code": proc.returncode
+            "exit_code": returncode
         }
 
 
@@ -441,24 +590,30 @@ def cleanup_all_ml_processes():
     - Emergency stop
     
     ✅ No authentication (only call from backend)
+    ✅ Covers processes of every worker on this host; other hosts'
+       entries are reported as failed and left in place
     """
     
     killed = []
     failed = []
     
-    for session_id, proc in list(ACTIVE_ML_PROCESSES.items()):
+    for key, entry in shared_state.list_processes().items():
+        if not key.startswith("ml:"):
+            continue
+        session_id = int(key.split(":", 1)[1])
         try:
-            if proc.poll() is None:  # Still running
-                proc.terminate()
-                proc.wait(timeout=5)
+            state, _ = _ml_process_state(session_id, entry)
+            if state == "running":  # Still running
+                _ml_terminate(session_id, entry)
                 killed.append(session_id)
                 print(f"✅ Killed ML process for session {session_id}")
+            _ml_forget(session_id)
+        except HTTPException as e:
+            failed.append((session_id, e.detail))
         except Exception as e:
             failed.append((session_id, str(e)))
             print(f"❌ Failed to kill ML process {session_id}: {e}")
     
-    ACTIVE_ML_PROCESSES.clear()
-    
     return {
         "status": "cleanup_complete",
         "killed_count": len(killed),
@@ -502,17 +657,38 @@ class PointCreate(BaseModel):
     score: float = Field(..., ge=0.0, le=1.0)
     ear: Optional[float] = None
     timestamp: Optional[datetime] = None
+    # Camera uploads pass the --student-id they were launched with
+    student_id: Optional[int] = None
 
 
 class PointOut(BaseModel):
     timestamp: datetime
     score: float
     ear: Optional[float]
+    student_id: Optional[int] = None
 
     class Config:
         from_attributes = True
 
 
+class PointBatchCreate(BaseModel):
+    # Items are validated one by one so a single bad point doesn't reject the batch
+    points: List[dict] = Field(..., min_length=1)
+
+
+class PointBatchError(BaseModel):
+    index: int
+    errors: List[str]
+
+
+class PointBatchOut(BaseModel):
+    status: str
+    session_id: int
+    accepted: int
+    rejected: int
+    errors: List[PointBatchError] = []
+
+
 class PredictRequest(BaseModel):
     features: List[float]
 
@@ -522,6 +698,40 @@ class PredictResponse(BaseModel):
     probability: Optional[float] = None
 
 
+class FeatureFrame(BaseModel):
+    """
+    Per-frame features buffered by EngagementCapture.jsx.
+
+    The model only uses eye openness (EAR, both eyes averaged); the other
+    fields are accepted for the client's sake.
+    """
+    timestamp: Optional[datetime] = None
+    head_pitch: float = 0.0
+    head_yaw: float = 0.0
+    eye_open_left: float = 0.0
+    eye_open_right: float = 0.0
+    blink_rate: float = 0.0
+    gaze_attention: float = 0.0
+
+
+class PredictBatchRequest(BaseModel):
+    user_id: Optional[int | str] = None
+    items: List[FeatureFrame] = Field(..., min_length=1)
+    # Optional: store the predicted scores as engagement points
+    session_id: Optional[int] = None
+    persist: bool = False
+
+
+class PredictBatchResponse(BaseModel):
+    count: int
+    labels: List[int]
+    probabilities: List[float]
+    mean_probability: float
+    model_available: bool
+    fallback: bool
+    stored: int = 0
+
+
 # 🔧 FIX: Move SessionAnalyticsOut HERE (before it's used)
 class SessionAnalyticsOut(BaseModel):
     session_id: int
@@ -587,6 +797,11 @@ def create_session(
     db.add(session)
     db.commit()
     db.refresh(session)
+    session_registry.put(session)
+    session_watchdog.touch(session.id)
+    if LIVE_BUFFER_ENABLED:
+        # Every point of this session goes through this process from the start
+        live_buffer.open(session.id, session.started_at)
     return SessionOut(
     id=session.id,
     title=session.title,
@@ -605,12 +820,9 @@ def get_session(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    session = db.query(EngagementSession).filter(
-        EngagementSession.id == session_id,
-        EngagementSession.is_deleted == False
-    ).first()
+    session = session_registry.get(db, session_id)
 
-    if not session:
+    if not session or session.is_deleted:
         raise HTTPException(status_code=404, detail="Session not found")
 
     # ✅ BACKEND DECIDES ROLE — SINGLE SOURCE OF TRUTH
@@ -713,14 +925,28 @@ def end_session(
     # ✅ STEP 3: Commit everything in ONE transaction
     print(f"\n📍 STEP 3: Committing transaction...")
     try:
+        # Stop accepting points first, so the frozen count (ETag input) is final
+        session_registry.put(session)
+        freeze_point_count(db, session)
+        print(f"   Points recorded: {session.total_points}")
+
         db.add(session)  # Ensure session is tracked
+        # Online analytics of this process, committed with the session (report reads them)
+        analytics_accumulator.write_final(db.connection(), session_id)
         db.commit()  # ✅ ONE commit for session + all students
+        session_registry.put(session)
+        live_feed.close_session(session_id)
+        live_buffer.drop(session_id)
+        live_stats.drop(session_id)
+        analytics_accumulator.drop(session_id)
+        session_watchdog.forget(session_id)
         print(f"✅ Transaction committed successfully!")
         print(f"   Session ended: 1 record")
         print(f"   Students terminated: {len(active_students)} records")
     except Exception as e:
         print(f"❌ Commit failed: {e}")
         db.rollback()
+        session_registry.invalidate(session_id)
         raise HTTPException(status_code=500, detail=f"Failed to end session: {str(e)}")
 
     print(f"{'='*80}\n")
@@ -748,12 +974,10 @@ def heartbeat(
     
     Returns:
     - {"status": "alive"} if session is active
-    - {"status": "ended"} if session has been ended
+    - {"status": "ended"} if session has been ended (cached session state)
     """
     
-    session = db.query(EngagementSession).filter(
-        EngagementSession.id == session_id
-    ).first()
+    session = session_registry.get(db, session_id)
 
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -762,11 +986,12 @@ def heartbeat(
         print(f"📍 Heartbeat received for ended session {session_id}")
         return {"status": "ended"}
 
-    # ✅ ONLY update session timestamp
+    # ✅ No DB write here: last_seen_at is coalesced in memory and flushed
+    # in one batched UPDATE every few seconds (heartbeats.py)
     # ⚠️ Do NOT create/modify attendance here
-    session.last_seen_at = datetime.now(timezone.utc)
-
-    db.commit()
+    heartbeat_tracker.record(session_id)
+    # Pushes this session's auto-end deadline back
+    session_watchdog.touch(session_id)
 
     print(f"💓 Heartbeat from {current_user.role} {current_user.id} for session {session_id}")
     
@@ -798,12 +1023,9 @@ def join_session(
   
    # Find session by share code (case-insensitive)
     code_to_find = payload.share_code.strip().upper()
-    session = db.query(EngagementSession).filter(
-       EngagementSession.share_code == code_to_find,
-       EngagementSession.is_deleted == False
-    ).first()
+    session = session_registry.get_by_share_code(db, code_to_find)
 
-    if not session:
+    if not session or session.is_deleted:
         raise HTTPException(
             status_code=404,
             detail="Invalid share code. Session not found."
@@ -859,39 +1081,80 @@ def join_session(
     #     "session_id": session_id,
     #     "message": "Attendance recorded"
     # }
-# ---------- Student engagement stream (JWT – Student only) ----------
-@router.post("/sessions/{session_id}/stream")
-def stream_engagement(
-    session_id: int,
-    payload: PointCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
+# ---------- Point storage (shared by all ingestion endpoints) ----------
+def _camera_device(request: Request) -> str:
+    """Identity of an uploading camera: device key hash + client address."""
+    key = request.headers.get("x-device-key") or ""
+    client_ip = request.client.host if request.client else "unknown"
+    return f"{hash_device_key(key)}@{client_ip}"
+
+
+def _store_points(db: Session, rows: list[dict], device: str = None) -> list[int] | None:
     """
-    ✅ FIXED: Stream engagement points during session.
-    
-    Requirements:
-    1. Only students can stream
-    2. Session must be active (not ended)
-    3. Student must have joined (attendance exists)
-    4. Student must be currently present (left_at IS NULL)
-    
-    Purpose:
-    - Receive real-time engagement scores from ML model
-    - Store as time-series data for analytics
+    Persist validated engagement point rows.
+
+    - Write-behind mode (INGEST_WRITE_BEHIND): hand rows to the ingest queue
+      and return immediately; the background flusher bulk-writes them.
+    - Otherwise: bulk insert + commit on the request's session.
+
+    Accepted rows are then pushed to live feed subscribers (teacher graphs),
+    to the session's in-memory ring buffer (/series/updates reads), to
+    its sliding-window class statistics (/live/stats) and to its online
+    analytics (/live/analytics, end-of-session report).
+
+    device (see _camera_device) tells anonymous cameras apart in the
+    live statistics.
+
+    Returns the ids of the written rows, or None if they were queued
+    (no id until flushed).
+    Raises 503 + Retry-After when the queue is full, 403 when the session
+    ended meanwhile (queued rows of ended sessions are dropped at flush).
+    """
+    if INGEST_WRITE_BEHIND:
+        if not ingest_queue.submit(rows):
+            raise HTTPException(
+                status_code=503,
+                detail="Ingestion queue is full. Retry shortly.",
+                headers={"Retry-After": str(INGEST_RETRY_AFTER_SECONDS)},
+            )
+        ids = None
+    else:
+        ids = write_points(db.connection(), rows, returning=True)
+        if len(ids) < len(rows):
+            # Ended in another worker (registry entry not refreshed yet)
+            db.rollback()
+            for session_id in {row["session_id"] for row in rows}:
+                session_registry.invalidate(session_id)
+            raise HTTPException(
+                status_code=403,
+                detail="Engagement session has ended. Uploads are disabled."
+            )
+        db.commit()
+
+    if LIVE_FEED_ENABLED:
+        live_feed.publish(rows)
+    if LIVE_BUFFER_ENABLED:
+        live_buffer.append(rows)
+    if LIVE_STATS_ENABLED:
+        live_stats.record(rows, device)
+    if ANALYTICS_ACCUMULATOR_ENABLED:
+        analytics_accumulator.record(rows)
+    return ids
+
+
+def _require_present_student(db: Session, session_id: int, current_user: User):
+    """
+    Checks before storing a student's own points (stream, predict_batch persist):
+    student role, session active, attendance joined and not left.
     """
-    
     # 1️⃣ Only students can send engagement
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Only students can stream engagement")
 
-    # 2️⃣ Validate session exists and is active
-    session = db.query(EngagementSession).filter(
-        EngagementSession.id == session_id,
-        EngagementSession.is_deleted == False
-    ).first()
+    # 2️⃣ Validate session exists and is active (in-memory registry)
+    session = session_registry.get(db, session_id)
 
-    if not session:
+    if not session or session.is_deleted:
         raise HTTPException(status_code=404, detail="Session not found")
 
     if session.ended_at is not None:
@@ -917,45 +1180,68 @@ def stream_engagement(
             detail="Student has already left this session"
         )
 
+
+# ---------- Student engagement stream (JWT – Student only) ----------
+@router.post("/sessions/{session_id}/stream")
+def stream_engagement(
+    session_id: int,
+    payload: PointCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    ✅ FIXED: Stream engagement points during session.
+    
+    Requirements:
+    1. Only students can stream
+    2. Session must be active (not ended)
+    3. Student must have joined (attendance exists)
+    4. Student must be currently present (left_at IS NULL)
+    
+    Purpose:
+    - Receive real-time engagement scores from ML model
+    - Store as time-series data for analytics
+    """
+    
+    # 1️⃣-3️⃣ Student, active session, joined and still present
+    _require_present_student(db, session_id, current_user)
+
     # 4️⃣ Store engagement point (time-series)
     ts = payload.timestamp or datetime.now(timezone.utc)
 
 
-    point = EngagementPoint(
-        session_id=session_id,
-        timestamp=ts,
-        score=payload.score,
-        ear=payload.ear,
-    )
+    row = {
+        "session_id": session_id,
+        "student_id": current_user.id,
+        "timestamp": ts,
+        "score": payload.score,
+        "ear": payload.ear,
+    }
 
-    db.add(point)
-    db.commit()
-    db.refresh(point)  # ✅ Optional: Refresh to get generated ID
+    ids = _store_points(db, [row])
+    queued = ids is None
 
     print(f"📊 Engagement point recorded: Session {session_id}, Student {current_user.id}, Score {payload.score:.3f}")
 
     return {
-        "status": "ok",
-        "point_id": point.id,
+        "status": "queued" if queued else "ok",
+        # None while queued (write-behind): the row has no id until flushed
+        "point_id": None if queued else ids[0],
         "session_id": session_id,
-        "timestamp": point.timestamp.isoformat(),
-        "score": point.score
+        "timestamp": ts.isoformat(),
+        "score": payload.score
     }
 
 # ---------- Camera upload (DEVICE AUTH – NO JWT) ----------
-from slowapi import Limiter
-from slowapi.util import get_remote_address
-
-limiter = Limiter(key_func=get_remote_address)
 
 @router.post("/sessions/{session_id}/points", response_model=PointOut)
-@limiter.limit("30/second")  # ✅ NEW: Max 30 uploads per second per IP
 def add_point(
     
     session_id: int,
     payload: PointCreate,
     request: Request,  # ✅ NEW: For IP tracking
     db: Session = Depends(get_db),
+    _rate: None = Depends(rate_limit("points", 30)),  # ✅ Max 30 uploads per second per IP, across workers
     # _: None = Depends(verify_camera_device),  # 🔐 device auth
 ): 
 
@@ -971,12 +1257,9 @@ def add_point(
     print(f"   EAR: {ear_str}")    
     print(f"   Timestamp: {payload.timestamp}")
     print(f"{'='*60}\n")
-    session = db.query(EngagementSession).filter(
-        EngagementSession.id == session_id,
-        EngagementSession.is_deleted == False
-    ).first()
+    session = session_registry.get(db, session_id)
 
-    if not session:
+    if not session or session.is_deleted:
         raise HTTPException(status_code=404, detail="Session not found")
 
     if session.ended_at is not None:
@@ -985,33 +1268,35 @@ def add_point(
             detail="Engagement session has ended. Uploads are disabled."
         )
 
+    if payload.student_id is not None and not session_registry.attendees(db, session_id, [payload.student_id]):
+        raise HTTPException(
+            status_code=422,
+            detail=f"student_id {payload.student_id} has not joined this session"
+        )
+
     ts = payload.timestamp or datetime.now(timezone.utc)
 
 
-    point = EngagementPoint(
-        session_id=session_id,
-        timestamp=ts,
-        score=payload.score,
-        ear=payload.ear,
-    )
+    row = {
+        "session_id": session_id,
+        "student_id": payload.student_id,
+        "timestamp": ts,
+        "score": payload.score,
+        "ear": payload.ear,
+    }
 
-    db.add(point)
-    db.commit()
-    db.refresh(point)
+    _store_points(db, [row], _camera_device(request))
     
-    # ✅ NEW: Log successful upload
-    client_ip = request.client.host if request else "unknown"
-    device_log = DeviceLog(
-        device_key_hash="camera",  # Don't store actual key
+    # ✅ NEW: Log successful upload (aggregated in memory, flushed periodically)
+    client_ip = request.client.host if request.client else "unknown"
+    device_audit.record(
+        device_key_hash=hash_device_key(request.headers.get("x-device-key") or ""),  # Don't store actual key
         session_id=session_id,
         client_ip=client_ip,
         status="success",
         details="Point uploaded",
-        points_uploaded=1
+        points=1
     )
-    # db.add(point)
-    db.add(device_log)  # ✅ ADD THIS
-    db.commit()
   
     
 
@@ -1019,26 +1304,330 @@ def add_point(
  
     
     return PointOut(
-        timestamp=point.timestamp,
-        score=point.score,
-        ear=point.ear
+        timestamp=ts,
+        score=payload.score,
+        ear=payload.ear,
+        student_id=payload.student_id
     )  # ✅ ADD THIS LINE
 
+
+def _validate_point_batch(items: List[dict]):
+    """
+    Validate raw batch items against PointCreate one at a time.
+
+    Returns (valid, errors): valid holds (index, point) pairs, errors
+    carry the item index, so the device can tell which readings were dropped.
+    """
+    valid = []
+    errors = []
+
+    for idx, item in enumerate(items):
+        try:
+            valid.append((idx, PointCreate.model_validate(item)))
+        except ValidationError as exc:
+            errors.append(PointBatchError(
+                index=idx,
+                errors=[
+                    f"{'.'.join(str(loc) for loc in err['loc']) or 'point'}: {err['msg']}"
+                    for err in exc.errors()
+                ],
+            ))
+
+    return valid, errors
+
+
+@router.post("/sessions/{session_id}/points/batch", response_model=PointBatchOut)
+def add_points_batch(
+    session_id: int,
+    payload: PointBatchCreate,
+    request: Request,
+    db: Session = Depends(get_db),
+    _rate: None = Depends(rate_limit("points_batch", 10)),
+):
+    """
+    Batched variant of add_point for camera devices.
+
+    - Accepts up to MAX_POINTS_PER_BATCH points per request
+    - Validates each point separately and reports per-item errors,
+      including a student_id that has not joined the session
+    - Writes all valid points with ONE bulk insert and ONE commit
+      (or ONE queue submit in write-behind mode)
+    """
+    if len(payload.points) > MAX_POINTS_PER_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many points in batch (max {MAX_POINTS_PER_BATCH})"
+        )
+
+    session = session_registry.get(db, session_id)
+
+    if not session or session.is_deleted:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if session.ended_at is not None:
+        raise HTTPException(
+            status_code=403,
+            detail="Engagement session has ended. Uploads are disabled."
+        )
+
+    valid, errors = _validate_point_batch(payload.points)
+
+    # Points may only be attributed to students of this session
+    attendees = session_registry.attendees(
+        db, session_id, {p.student_id for _, p in valid if p.student_id is not None}
+    )
+    unknown = [(idx, p) for idx, p in valid if p.student_id is not None and p.student_id not in attendees]
+    if unknown:
+        errors = sorted(errors + [
+            PointBatchError(index=idx, errors=[f"student_id: {p.student_id} has not joined this session"])
+            for idx, p in unknown
+        ], key=lambda e: e.index)
+        valid = [(idx, p) for idx, p in valid if p.student_id is None or p.student_id in attendees]
+
+    if not valid:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "message": "No valid points in batch",
+                "errors": [e.model_dump() for e in errors],
+            }
+        )
+
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "session_id": session_id,
+            "student_id": p.student_id,
+            "timestamp": p.timestamp or now,
+            "score": p.score,
+            "ear": p.ear,
+        }
+        for _, p in valid
+    ]
+
+    client_ip = request.client.host if request.client else "unknown"
+
+    try:
+        queued = _store_points(db, rows, _camera_device(request)) is None
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Batch insert failed for session {session_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to store engagement points")
+
+    device_audit.record(
+        device_key_hash=hash_device_key(request.headers.get("x-device-key") or ""),
+        session_id=session_id,
+        client_ip=client_ip,
+        status="success",
+        details="Batch uploaded",
+        points=len(rows)
+    )
+
+    print(f"📦 Batch {'queued' if queued else 'stored'}: Session {session_id}, {len(rows)} accepted, {len(errors)} rejected")
+
+    return PointBatchOut(
+        status="ok" if not errors else "partial",
+        session_id=session_id,
+        accepted=len(rows),
+        rejected=len(errors),
+        errors=errors,
+    )
+
+@router.get("/ingest/metrics")
+def get_ingest_metrics(current_user: User = Depends(get_current_user)):
+    """Write-behind queue depth, throughput and flush lag for this API process."""
+    return {
+        **ingest_queue.metrics(),
+        "live_buffer": live_buffer.stats(),
+        "live_stats": live_stats.stats(),
+        "analytics": analytics_accumulator.metrics(),
+        "heartbeats": heartbeat_tracker.metrics(),
+        "watchdog": session_watchdog.metrics(),
+        "rate_limit": token_leases.stats(),
+    }
+
+
 # ---------- Graph read (JWT – Teacher/Student) ----------
+def _points_query(db: Session, session_id: int, student_id: Optional[int] = None):
+    """
+    Engagement points of a session, optionally narrowed to one student.
+
+    Selects only the columns covered by idx_engagement_points_session_ts
+    (not whole ORM rows), so Postgres can answer with an index-only scan.
+    With student_id the filter matches the (session_id, student_id, timestamp)
+    index, so a per-student read is an index range scan.
+    """
+    q = db.query(
+        EngagementPoint.timestamp,
+        EngagementPoint.score,
+        EngagementPoint.ear,
+        EngagementPoint.student_id,
+    ).filter(EngagementPoint.session_id == session_id)
+    if student_id is not None:
+        q = q.filter(EngagementPoint.student_id == student_id)
+    return q
+
+
+def _resolution_seconds(resolution: str, student_id: Optional[int] = None) -> Optional[int]:
+    """Map ?resolution= to a rollup bucket size. None means raw points."""
+    if resolution == "raw":
+        return None
+    if resolution not in RESOLUTION_PARAMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid resolution (use raw, {', '.join(RESOLUTION_PARAMS)})"
+        )
+    if student_id is not None:
+        # Rollups are per session; per-student views read the student index instead
+        raise HTTPException(status_code=400, detail="resolution is not available with student_id")
+    return RESOLUTION_PARAMS[resolution]
+
+
+def _parse_keyset(after_ts: Optional[str], after_id: Optional[int]) -> Optional[datetime]:
+    if after_ts is None:
+        if after_id is not None:
+            raise HTTPException(status_code=400, detail="after_id requires after_ts")
+        return None
+    try:
+        return datetime.fromisoformat(after_ts.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid 'after_ts' timestamp")
+
+
+def _keyset_page(q, after_dt: Optional[datetime], after_id: Optional[int]):
+    """
+    Order by (timestamp, id) and continue after the given cursor.
+
+    The timestamp bound is a range on idx_engagement_points_session_ts;
+    id only breaks ties between points with the same timestamp.
+    """
+    q = q.add_columns(EngagementPoint.id)
+    if after_dt is not None:
+        if after_id is None:
+            q = q.filter(EngagementPoint.timestamp > after_dt)
+        else:
+            q = q.filter(
+                EngagementPoint.timestamp >= after_dt,
+                or_(
+                    EngagementPoint.timestamp > after_dt,
+                    and_(EngagementPoint.timestamp == after_dt, EngagementPoint.id > after_id),
+                ),
+            )
+    return q.order_by(EngagementPoint.timestamp.asc(), EngagementPoint.id.asc())
+
+
+def _stream_series(session_id, student_id, after_dt, after_id, limit):
+    """
+    Yield the series as a JSON array, SERIES_STREAM_CHUNK points per chunk.
+
+    Uses its own DB session (the request's is closed once the response
+    starts) and yield_per, which is a server-side cursor on Postgres.
+    """
+    db = SessionLocal()
+    try:
+        q = _keyset_page(_points_query(db, session_id, student_id), after_dt, after_id)
+        if limit is not None:
+            q = q.limit(limit)
+
+        yield "["
+        chunk = []
+        first = True
+        for p in q.yield_per(SERIES_STREAM_CHUNK):
+            chunk.append(json.dumps({
+                "timestamp": p.timestamp.isoformat(),
+                "score": p.score,
+                "ear": p.ear,
+                "student_id": p.student_id,
+            }))
+            if len(chunk) >= SERIES_STREAM_CHUNK:
+                yield ("" if first else ",") + ",".join(chunk)
+                first = False
+                chunk = []
+        if chunk:
+            yield ("" if first else ",") + ",".join(chunk)
+        yield "]"
+    finally:
+        db.close()
+
+
+def _check_series_format(series_format: str):
+    if series_format not in SERIES_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format (use {', '.join(SERIES_FORMATS)})"
+        )
+
+
+def _check_downsample(max_points: Optional[int], method: str):
+    if max_points is not None and method not in DOWNSAMPLE_METHODS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"downsample must be one of: {', '.join(DOWNSAMPLE_METHODS)}"
+        )
+
+
+def _columnar_response(q, max_points: Optional[int] = None, method: str = "lttb") -> JSONResponse:
+    """?format=columnar: raw (timestamp, score, ear) tuples -> parallel arrays."""
+    rows = q.with_entities(
+        EngagementPoint.timestamp,
+        EngagementPoint.score,
+        EngagementPoint.ear,
+    ).all()
+    return JSONResponse(columnar_series(downsample_rows(rows, max_points, method)))
+
+
+def _rollup_response(
+    q,
+    series_format: str = "json",
+    max_points: Optional[int] = None,
+    method: str = "lttb",
+    media_type: Optional[str] = None,
+) -> Response:
+    """
+    Bucketed series: same timestamp/score/ear keys as PointOut (mean per
+    bucket) plus count, score_min, score_max and score_std.
+    Columnar format carries the bucket means only.
+    """
+    buckets = q.order_by(EngagementRollup.bucket_start.asc()).all()
+    buckets = downsample_rows(
+        buckets, max_points, method,
+        scores=(b.score_sum / b.count for b in buckets),
+        time_attr="bucket_start",
+    )
+
+    if media_type:
+        return series_response(media_type, bucket_columns(buckets))
+
+    if series_format == "columnar":
+        return JSONResponse(columnar_series([
+            (
+                b.bucket_start,
+                b.score_sum / b.count,
+                b.ear_sum / b.ear_count if b.ear_count else None,
+            )
+            for b in buckets
+        ]))
+
+    return JSONResponse([bucket_to_dict(b) for b in buckets])
+
 @router.get("/sessions/{session_id}/series/updates", response_model=list[PointOut])
 def get_series_updates(
     session_id: int,
     since: Optional[str] = Query(None),
+    student_id: Optional[int] = Query(None),
+    resolution: str = Query("raw"),
+    series_format: str = Query("json", alias="format"),
+    max_points: Optional[int] = Query(None, ge=3, le=SERIES_PAGE_MAX),
+    downsample: str = Query("lttb"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     # ✅ NEW: Verify session exists and is still active
-    session = db.query(EngagementSession).filter(
-        EngagementSession.id == session_id,
-        EngagementSession.is_deleted == False
-    ).first()
+    session = session_registry.get(db, session_id)
 
-    if not session:
+    if not session or session.is_deleted:
         raise HTTPException(status_code=404, detail="Session not found")
 
     # ✅ NEW: Block polling after session ends
@@ -1048,26 +1637,81 @@ def get_series_updates(
             detail="Session has ended. Polling disabled."
         )
 
-    q = db.query(EngagementPoint).filter(
-        EngagementPoint.session_id == session_id
-    )
+    resolution_s = _resolution_seconds(resolution, student_id)
+    _check_series_format(series_format)
+    _check_downsample(max_points, downsample)
 
+    since_dt = None
     if since:
         try:
             since_dt = datetime.fromisoformat(since).astimezone(timezone.utc)
-
-            q = q.filter(EngagementPoint.timestamp > since_dt)
         except Exception:
             raise HTTPException(400, "Invalid 'since' timestamp")
 
-    return q.order_by(EngagementPoint.timestamp.asc()).all()
+    if resolution_s:
+        q = rollup_query(db, session_id, resolution_s)
+        if since_dt:
+            # Include the bucket containing 'since': it may have grown since the last poll
+            bucket_floor = datetime.fromtimestamp(
+                int(since_dt.timestamp() // resolution_s) * resolution_s, tz=timezone.utc
+            )
+            q = q.filter(EngagementRollup.bucket_start >= bucket_floor)
+        return _rollup_response(q, series_format, max_points, downsample)
+
+    # Live session: recent points come straight from the ring buffer when it covers 'since'
+    if LIVE_BUFFER_ENABLED and since_dt:
+        arrays = live_buffer.read_since(session_id, since_dt, student_id)
+        if arrays is not None:
+            t_us, score, ear, student = arrays
+            if max_points is not None and len(t_us) > max_points:
+                keep = downsample_indices(t_us - t_us[0], score, max_points, downsample)
+                t_us, score, ear, student = t_us[keep], score[keep], ear[keep], student[keep]
+            if series_format == "columnar":
+                return JSONResponse(columnar_arrays(t_us // 1000, score, ear))
+            return JSONResponse(points_from_arrays(t_us, score, ear, student))
+
+    q = _points_query(db, session_id, student_id)
+    if since_dt:
+        q = q.filter(EngagementPoint.timestamp > since_dt)
+
+    q = q.order_by(EngagementPoint.timestamp.asc())
+    if series_format == "columnar":
+        return _columnar_response(q, max_points, downsample)
+    return downsample_rows(q.all(), max_points, downsample)
 
 @router.get("/sessions/{session_id}/series", response_model=list[PointOut])
 def get_series(
     session_id: int,
+    request: Request,
+    response: Response,
+    student_id: Optional[int] = Query(None),
+    resolution: str = Query("raw"),
+    series_format: str = Query("json", alias="format"),
+    after_ts: Optional[str] = Query(None),
+    after_id: Optional[int] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=SERIES_PAGE_MAX),
+    stream: bool = Query(False),
+    max_points: Optional[int] = Query(None, ge=3, le=SERIES_PAGE_MAX),
+    downsample: str = Query("lttb"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    """
+    Full session series, ordered by (timestamp, id).
+
+    - Keyset pagination: ?limit=N[&after_ts=...&after_id=...]. When more
+      points follow, X-Next-After-Ts / X-Next-After-Id carry the cursor
+      for the next page
+    - ?stream=true: chunked JSON array read through a server-side cursor,
+      so memory stays flat however long the session is
+    - ?max_points=N[&downsample=lttb|minmax]: at most N points chosen to
+      keep the chart shape (see downsample.py); whole session only, not
+      combinable with pagination or streaming
+    - Accept: application/vnd.apache.arrow.stream | application/msgpack
+      returns typed binary columns instead of JSON (see binary_format.py)
+    - Ended sessions carry an ETag; If-None-Match answers 304 before any
+      point is read
+    """
     # ✅ NEW: Verify session exists
     session = db.query(EngagementSession).filter(
         EngagementSession.id == session_id,
@@ -1077,16 +1721,384 @@ def get_series(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    return (
-        db.query(EngagementPoint)
-        .filter(EngagementPoint.session_id == session_id)
-        .order_by(EngagementPoint.timestamp.asc())
-        .all()
+    resolution_s = _resolution_seconds(resolution, student_id)
+    _check_series_format(series_format)
+    after_dt = _parse_keyset(after_ts, after_id)
+    _check_downsample(max_points, downsample)
+    if max_points is not None and (stream or limit is not None or after_dt is not None):
+        raise HTTPException(
+            status_code=400,
+            detail="max_points can't be combined with limit, after_ts/after_id or stream"
+        )
+    media_type = negotiate(request.headers.get("accept"))
+
+    etag = session_etag(session, request_variant(request, media_type))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    if resolution_s:
+        result = _rollup_response(
+            rollup_query(db, session_id, resolution_s), series_format, max_points, downsample, media_type
+        )
+        return with_cache_headers(result, response, etag)
+
+    if stream:
+        if series_format != "json" or media_type:
+            raise HTTPException(status_code=400, detail="stream=true supports format=json only")
+        result = StreamingResponse(
+            _stream_series(session_id, student_id, after_dt, after_id, limit),
+            media_type="application/json",
+        )
+        return with_cache_headers(result, response, etag)
+
+    q = _keyset_page(_points_query(db, session_id, student_id), after_dt, after_id)
+    if limit is not None:
+        q = q.limit(limit)
+
+    if series_format == "columnar" and not media_type:
+        return with_cache_headers(_columnar_response(q, max_points, downsample), response, etag)
+
+    rows = downsample_rows(q.all(), max_points, downsample)
+    page_headers = {}
+    if limit is not None and len(rows) == limit:
+        last = rows[-1]
+        page_headers["X-Next-After-Ts"] = last.timestamp.isoformat()
+        page_headers["X-Next-After-Id"] = str(last.id)
+
+    if media_type:
+        result = series_response(media_type, point_columns(rows), headers=page_headers)
+        return with_cache_headers(result, response, etag)
+
+    response.headers.update(page_headers)
+    return with_cache_headers(rows, response, etag)
+
+@router.post("/sessions/{session_id}/live/ticket")
+def live_stream_ticket(
+    session_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Short-lived ticket for this session's SSE streams (teacher only).
+
+    EventSource can't send an Authorization header, so the stream URL
+    carries this ticket instead of the access token: it only opens the
+    session's streams and expires after STREAM_TICKET_SECONDS, so URLs
+    in access logs or browser history are of no lasting use.
+    """
+    session = session_registry.get(db, session_id)
+
+    if not session or session.is_deleted:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if current_user.role != "teacher" or session.teacher_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the session teacher can subscribe")
+
+    return {
+        "ticket": create_stream_ticket(current_user, session_id),
+        "expires_in": STREAM_TICKET_SECONDS,
+    }
+
+
+@router.get("/sessions/{session_id}/live")
+def live_engagement_feed(
+    session_id: int,
+    request: Request,
+    ticket: str = Query(..., description="Stream ticket from POST /sessions/{id}/live/ticket"),
+    since: Optional[str] = Query(None),
+    cursor: Optional[int] = Query(None),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events stream of new engagement points (teacher only).
+
+    Handshake (?ticket= from POST /live/ticket, a fresh one once it expired):
+    - First connect: ?since=<ISO of last point the client has> backfills
+      from the database, then streams live events (without the points
+      the backfill already sent)
+    - Reconnect: Last-Event-ID header (sent by EventSource automatically)
+      or ?cursor=<seq> resumes from the in-memory backlog
+
+    Events:
+    - ready  {"cursor": seq}           once per connection
+    - points {"seq": n, "points": [...]}  id = seq
+    - reset  {"reason": ...}           cursor can't be resumed - re-sync via /series/updates
+    - end    {}                        session ended, stream closes
+
+    503 when the feed is off (LIVE_FEED_ENABLED, multiple workers).
+    """
+    # Validate with a short-lived DB session - the stream itself holds no connection
+    db = SessionLocal()
+    try:
+        current_user = get_user_from_stream_ticket(ticket, session_id, db)
+        session = session_registry.get(db, session_id)
+    finally:
+        db.close()
+
+    if not session or session.is_deleted:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if current_user.role != "teacher" or session.teacher_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the session teacher can subscribe")
+
+    if session.ended_at is not None:
+        raise HTTPException(status_code=403, detail="Session has ended")
+
+    if not LIVE_FEED_ENABLED:
+        # Multiple workers: this process sees only its own share of the points
+        raise HTTPException(status_code=503, detail="Live feed unavailable. Poll /series/updates.")
+
+    since_dt = None
+    if since:
+        try:
+            since_dt = datetime.fromisoformat(since).astimezone(timezone.utc)
+        except Exception:
+            raise HTTPException(400, "Invalid 'since' timestamp")
+
+    resume_from = cursor
+    if resume_from is None and last_event_id:
+        try:
+            resume_from = int(last_event_id)
+        except ValueError:
+            resume_from = None
+
+    def load_backfill():
+        db = SessionLocal()
+        try:
+            q = _points_query(db, session_id).filter(EngagementPoint.timestamp > since_dt)
+            return [
+                {
+                    "timestamp": p.timestamp.isoformat(),
+                    "score": p.score,
+                    "ear": p.ear,
+                    "student_id": p.student_id,
+                }
+                for p in q.order_by(EngagementPoint.timestamp.asc()).all()
+            ]
+        finally:
+            db.close()
+
+    async def event_stream():
+        # Backlog replay covers points still waiting in the write-behind queue
+        sub, replay, last_seq = live_feed.subscribe(
+            session_id, resume_from, replay_all=since_dt is not None
+        )
+        try:
+            if replay is None:
+                yield format_sse("reset", {"reason": "cursor_expired", "cursor": last_seq})
+                return
+
+            yield format_sse("ready", {"cursor": last_seq})
+
+            # Replayed / live events may repeat points the backfill already sent
+            seen = None
+            if resume_from is None and since_dt is not None:
+                points = await run_in_threadpool(load_backfill)
+                if points:
+                    yield format_sse("points", {"seq": None, "points": points})
+                seen = {point_key(p) for p in points}
+                since_us = to_epoch_us(since_dt)
+
+            for seq, data in replay:
+                yield format_sse("points", data if seen is None else unseen_points(data, seen, since_us), seq)
+
+            while True:
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), LIVE_FEED_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+
+                if item == END:
+                    yield format_sse("end", {})
+                    break
+                if item == OVERFLOW:
+                    yield format_sse("reset", {"reason": "overflow"})
+                    break
+
+                seq, data = item
+                yield format_sse("points", data if seen is None else unseen_points(data, seen, since_us), seq)
+        finally:
+            live_feed.unsubscribe(sub)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/sessions/{session_id}/live/aggregates")
+def get_live_aggregates(
+    session_id: int,
+    window_s: float = Query(60, gt=0, le=3600),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Score count/avg/min/max/std and mean EAR over the last window_s seconds
+    of a live session, computed from the in-memory ring buffer.
+    """
+    session = session_registry.get(db, session_id)
+
+    if not session or session.is_deleted:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if session.ended_at is not None:
+        raise HTTPException(status_code=403, detail="Session has ended")
+
+    result = live_buffer.aggregates(session_id, window_s) if LIVE_BUFFER_ENABLED else None
+    if result is None:
+        # Nothing buffered in this process (yet)
+        result = {
+            "session_id": session_id,
+            "window_seconds": window_s,
+            "count": 0,
+            "avg_score": None,
+            "min_score": None,
+            "max_score": None,
+            "std_score": None,
+            "avg_ear": None,
+            "latest_at": None,
+        }
+    return result
+
+
+@router.get("/sessions/{session_id}/live/stats")
+def get_live_stats(
+    session_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Class-wide statistics of a live session over sliding windows
+    (default 10s / 60s / 5min): count, mean, p10/p50/p90, fraction below
+    the low-engagement threshold and active devices.
+
+    Maintained incrementally at ingest (live_stats.py) - no point is read.
+    503 when live stats are off (multi-worker deployment).
+    """
+    session = session_registry.get(db, session_id)
+
+    if not session or session.is_deleted:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if current_user.role != "teacher" or session.teacher_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the session teacher can view live stats")
+
+    if session.ended_at is not None:
+        raise HTTPException(status_code=403, detail="Session has ended")
+
+    if not LIVE_STATS_ENABLED:
+        # Multiple workers: this process sees only its own share of the points
+        raise HTTPException(status_code=503, detail="Live stats unavailable. Use /live/analytics.")
+
+    return live_stats.snapshot(session_id)
+
+
+@router.get("/sessions/{session_id}/live/analytics")
+def get_live_analytics(
+    session_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Session analytics so far (summary, distribution, critical moments,
+    sustained periods - as the report, without the timeline).
+
+    Maintained online at ingest (analytics_accumulator.py): reads the
+    checkpoints of the other API processes, not the points.
+    """
+    session = session_registry.get(db, session_id)
+
+    if not session or session.is_deleted:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if current_user.role != "teacher" or session.teacher_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the session teacher can view live analytics")
+
+    if session.ended_at is not None:
+        raise HTTPException(status_code=403, detail="Session has ended")
+
+    return analytics_accumulator.snapshot(db, session_id)
+
+
+@router.get("/sessions/{session_id}/live/stats/stream")
+def live_stats_feed(
+    session_id: int,
+    request: Request,
+    ticket: str = Query(..., description="Stream ticket from POST /sessions/{id}/live/ticket"),
+):
+    """
+    Server-Sent Events version of /live/stats (teacher only).
+
+    Events:
+    - stats {...}  same body as /live/stats, every LIVE_STATS_PUSH_SECONDS
+    - end   {}     session ended, stream closes
+    """
+    db = SessionLocal()
+    try:
+        current_user = get_user_from_stream_ticket(ticket, session_id, db)
+        session = session_registry.get(db, session_id)
+    finally:
+        db.close()
+
+    if not session or session.is_deleted:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if current_user.role != "teacher" or session.teacher_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the session teacher can subscribe")
+
+    if session.ended_at is not None:
+        raise HTTPException(status_code=403, detail="Session has ended")
+
+    if not LIVE_STATS_ENABLED:
+        # Multiple workers: this process sees only its own share of the points
+        raise HTTPException(status_code=503, detail="Live stats unavailable. Use /live/analytics.")
+
+    async def event_stream():
+        # Subscribed only to learn when the session ends; point events are skipped
+        sub, _, _ = live_feed.subscribe(session_id)
+        loop = asyncio.get_running_loop()
+        try:
+            yield format_sse("stats", live_stats.snapshot(session_id))
+            next_push = loop.time() + LIVE_STATS_PUSH_SECONDS
+
+            while True:
+                wait = next_push - loop.time()
+                if wait <= 0:
+                    if await request.is_disconnected():
+                        break
+                    yield format_sse("stats", live_stats.snapshot(session_id))
+                    next_push = loop.time() + LIVE_STATS_PUSH_SECONDS
+                    continue
+
+                try:
+                    item = await asyncio.wait_for(sub.queue.get(), wait)
+                except asyncio.TimeoutError:
+                    continue
+                if item == END:
+                    yield format_sse("end", {})
+                    break
+        finally:
+            live_feed.unsubscribe(sub)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
+
 @router.get("/sessions/{session_id}/analytics", response_model=SessionAnalyticsOut)
 def get_session_analytics(
     session_id: int,
+    request: Request,
+    response: Response,
+    student_id: Optional[int] = Query(None),
+    resolution: str = Query("raw"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -1097,10 +2109,26 @@ def get_session_analytics(
     if not session:
         raise HTTPException(404, "Session not found")
 
-    points = db.query(EngagementPoint).filter(
-        EngagementPoint.session_id == session_id,
-        EngagementSession.is_deleted == False
-    ).all()
+    resolution_s = _resolution_seconds(resolution, student_id)
+
+    etag = session_etag(session, request_variant(request))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    if resolution_s:
+        # Exact aggregates straight from the buckets - no raw points read
+        summary = rollup_summary(db, session_id, resolution_s)
+        end_time = session.ended_at or datetime.now(timezone.utc)
+        return SessionAnalyticsOut(
+            session_id=session_id,
+            avg_score=round(summary["avg"], 3),
+            max_score=round(summary["max"], 3),
+            min_score=round(summary["min"], 3),
+            total_points=summary["count"],
+            duration_seconds=int((end_time - session.started_at).total_seconds()),
+        )
+
+    points = _points_query(db, session_id, student_id).all()
 
     if not points:
         return SessionAnalyticsOut(
@@ -1152,6 +2180,67 @@ def predict(payload: PredictRequest):
     raise HTTPException(500, "Unexpected model output")
 
 
+@router.post("/predict_batch", response_model=PredictBatchResponse)
+def predict_batch(
+    payload: PredictBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Vectorized prediction for a buffer of per-frame features.
+
+    - Builds ONE (n_items x 5) matrix with the model's own features:
+      EAR window statistics up to each frame (engagement_model.ear_window_features)
+    - Runs ONE predict_proba call on the loaded model
+    - With persist=true and a session_id, stores the scores as engagement
+      points in one bulk write (same path as /points/batch)
+    """
+    if len(payload.items) > MAX_POINTS_PER_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many items in batch (max {MAX_POINTS_PER_BATCH})"
+        )
+
+    # Items in capture order, as the realtime script's EAR window
+    X = ear_window_features([(item.eye_open_left + item.eye_open_right) / 2 for item in payload.items])
+
+    result = predict_engagement_batch(X)
+    probabilities = result["probabilities"]
+
+    stored = 0
+    if payload.persist:
+        if payload.session_id is None:
+            raise HTTPException(status_code=400, detail="session_id is required to persist predictions")
+
+        # Same checks as /stream: a student's own points, while present
+        _require_present_student(db, payload.session_id, current_user)
+
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "session_id": payload.session_id,
+                "student_id": current_user.id,
+                "timestamp": item.timestamp or now,
+                "score": float(prob),
+                "ear": None,
+            }
+            for item, prob in zip(payload.items, probabilities)
+        ]
+
+        _store_points(db, rows)
+        stored = len(rows)
+
+    return PredictBatchResponse(
+        count=len(payload.items),
+        labels=result["labels"].tolist(),
+        probabilities=np.round(probabilities, 4).tolist(),
+        mean_probability=round(float(probabilities.mean()), 4),
+        model_available=result["model_available"],
+        fallback=result["fallback"],
+        stored=stored,
+    )
+
+
 # ---------- Image prediction (JWT protected) ----------
 
 @router.post("/predict_image", response_model=ImagePredictResponse)
@@ -1208,9 +2297,7 @@ def get_teacher_sessions(
     result = []
     for session in sessions:
         # ✅ ENGAGEMENT POINTS (for avg score calculation)
-        points = db.query(EngagementPoint).filter(
-            EngagementPoint.session_id == session.id
-        ).all()
+        points = _points_query(db, session.id).all()
         
         # ✅ CALCULATE SESSION DURATION (reusable)
         session_duration = (session.ended_at - session.started_at).total_seconds()
@@ -1296,11 +2383,17 @@ def get_teacher_session_summary(
 @router.get("/sessions/{session_id}/advanced-analytics")
 def get_advanced_analytics(
     session_id: int,
+    request: Request,
+    response: Response,
+    student_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     """
     Return advanced analytics with insights.
+
+    - Accept: application/vnd.apache.arrow.stream | application/msgpack
+      -> same fields in that encoding (Arrow: schema metadata only)
     """
     from analytics import get_all_advanced_analytics
     
@@ -1311,21 +2404,22 @@ def get_advanced_analytics(
     
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
+
+    media_type = negotiate(request.headers.get("accept"))
+
+    etag = session_etag(session, request_variant(request, media_type))
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
-    points = db.query(EngagementPoint).filter(
-        EngagementPoint.session_id == session_id
-    ).order_by(EngagementPoint.timestamp.asc()).all()
-    
-    # Convert to list of dicts
-    points_data = [
-        {"timestamp": p.timestamp.isoformat(), "score": p.score}
-        for p in points
-    ]
+    # Epoch-ms arrays straight from SQL: no datetime / ISO string per point
+    series = fetch_series(db, session_id, student_id)
     
     # Calculate all metrics
-    analytics = get_all_advanced_analytics(points_data)
+    analytics = get_all_advanced_analytics(series)
     
-    return analytics
+    if media_type:
+        analytics = document_response(media_type, analytics)
+    return with_cache_headers(analytics, response, etag)
 @router.post("/predict_upload", response_model=ImagePredictResponse)
 async def predict_from_upload(
     file: UploadFile = File(...),
@@ -1353,6 +2447,7 @@ def mute_students(session_id: int, db: Session = Depends(get_db), current_user:
     session = db.get(EngagementSession, session_id)
     session.mute_students = True
     db.commit()
+    session_registry.put(session)
     return {"mute_students": True}
 
 
@@ -1364,6 +2459,7 @@ def unmute_students(session_id: int, db: Session = Depends(get_db), current_user
     session = db.get(EngagementSession, session_id)
     session.mute_students = False
     db.commit()
+    session_registry.put(session)
     return {"mute_students": False}
 @router.post("/sessions/{session_id}/disable-cameras")
 def disable_cameras(session_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
@@ -1373,6 +2469,7 @@ def disable_cameras(session_id: int, db: Session = Depends(get_db), current_user
     session = db.get(EngagementSession, session_id)
     session.disable_student_cameras = True
     db.commit()
+    session_registry.put(session)
     return {"disable_student_cameras": True}
 
 
@@ -1384,6 +2481,7 @@ def enable_cameras(session_id: int, db: Session = Depends(get_db), current_user:
     session = db.get(EngagementSession, session_id)
     session.disable_student_cameras = False
     db.commit()
+    session_registry.put(session)
     return {"disable_student_cameras": False}
 from analytics import get_comprehensive_analytics
 
@@ -1394,6 +2492,9 @@ from analytics import get_comprehensive_analytics
 @router.get("/sessions/{session_id}/report")
 def get_session_report(
     session_id: int,
+    request: Request,
+    response: Response,
+    student_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -1423,6 +2524,13 @@ def get_session_report(
             status_code=400,
             detail="Session must be ended before viewing report"
         )
+
+    media_type = negotiate(request.headers.get("accept"))
+
+    # ✅ Ended session data is immutable: 304 before reading any point
+    etag = session_etag(session, request_variant(request, media_type))
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
     # ✅ FIX #1: Calculate duration correctly
     duration_seconds = int((session.ended_at - session.started_at).total_seconds())
@@ -1436,16 +2544,15 @@ def get_session_report(
     print(f"   Delta: {duration_seconds} seconds")
     print(f"   Formatted: {duration_formatted}\n")
     
-    # Fetch engagement points (may be empty)
-    points = db.query(EngagementPoint).filter(
-        EngagementPoint.session_id == session_id
-    ).order_by(EngagementPoint.timestamp.asc()).all()
+    # Fetch engagement points (may be empty) as epoch-ms arrays
+    series = fetch_series(db, session_id, student_id)
     
     # ✅ FIX #2: Handle empty data gracefully
-    if not points:
+    if not len(series):
         # Return empty report structure
-        return {
+        report = {
             "session_id": session_id,
+            "student_id": student_id,
             "title": session.title,
             "subject": session.subject,
             "started_at": session.started_at.isoformat(),
@@ -1490,21 +2597,13 @@ def get_session_report(
                 },
             },
             
-            "timeline": []
+            "timeline": series
         }
-    
-    # Convert to dict format for analytics
-    points_data = [
-        {
-            'timestamp': p.timestamp.isoformat(),
-            'score': p.score
-        }
-        for p in points
-    ]
+        return with_cache_headers(_report_response(report, media_type), response, etag)
     
     # Compute analytics using your analytics.py
-    from analytics import get_comprehensive_analytics
-    analytics = get_comprehensive_analytics(points_data)
+    # Online analytics from ingest when they cover every point, else computed here
+    analytics = analytics_accumulator.session_analytics(db, session, series, student_id)
     
     # ✅ FIX #3: Ensure duration is in analytics too
     analytics['summary']['duration_seconds'] = duration_seconds
@@ -1512,8 +2611,9 @@ def get_session_report(
     analytics['summary']['duration_formatted'] = duration_formatted
     
     # Return structured report
-    return {
+    report = {
         "session_id": session_id,
+        "student_id": student_id,
         "title": session.title,
         "subject": session.subject,
         "started_at": session.started_at.isoformat(),
@@ -1531,8 +2631,22 @@ def get_session_report(
             "sustained_engagement": analytics.get('sustained_engagement', {}),
         },
         
-        "timeline": analytics.get('timeline', [])
+        "timeline": series
     }
+    return with_cache_headers(_report_response(report, media_type), response, etag)
+
+
+def _report_response(report: dict, media_type: Optional[str]):
+    """
+    report["timeline"] is the EngagementSeries. JSON: [{timestamp, score}]
+    with ISO timestamps; binary encodings: the (t_ms, score) columns as-is.
+    """
+    series = report["timeline"]
+    if not media_type:
+        return {**report, "timeline": series.to_points()}
+    return document_response(media_type, report, "timeline", series.columns())
+
+
 @router.post("/sessions/{session_id}/email-report")
 async def email_report(
     session_id: int,
@@ -1635,6 +2749,7 @@ async def whatsapp_report(
 @router.get("/sessions/{session_id}/report/pdf")
 def download_report_pdf(
     session_id: int,
+    student_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -1665,17 +2780,14 @@ def download_report_pdf(
     if session.ended_at is None:
         raise HTTPException(400, "Session must be ended")
     
-    # Fetch engagement points
-    points = db.query(EngagementPoint).filter(
-        EngagementPoint.session_id == session_id
-    ).order_by(EngagementPoint.timestamp.asc()).all()
+    # Fetch engagement points (epoch-ms arrays)
+    series = fetch_series(db, session_id, student_id)
     
-    if not points:
+    if not len(series):
         raise HTTPException(404, "No engagement data")
     
-    # Compute analytics
-    points_data = [{'timestamp': p.timestamp.isoformat(), 'score': p.score} for p in points]
-    analytics = get_comprehensive_analytics(points_data)
+    # Compute analytics (online ones from ingest when complete)
+    analytics = analytics_accumulator.session_analytics(db, session, series, student_id)
     
     # Generate PDF (requires reportlab)
     try:
@@ -1748,6 +2860,12 @@ def delete_session(
     # ✅ Soft delete
     session.is_deleted = True
     db.commit()
+    session_registry.put(session)
+    live_feed.close_session(session_id)
+    live_buffer.drop(session_id)
+    live_stats.drop(session_id)
+    analytics_accumulator.drop(session_id)
+    session_watchdog.forget(session_id)
 
     return {
         "status": "deleted",
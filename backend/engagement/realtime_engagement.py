@@ -59,6 +59,12 @@ parser.add_argument("--student-id", type=int, required=False, help="Student ID (
 default_backend = os.getenv("BACKEND_BASE", "http://127.0.0.1:8000")
 parser.add_argument("--backend", type=str, default=default_backend, help="Backend URL")
 parser.add_argument("--token", type=str, required=False, help="JWT authentication token")
+parser.add_argument(
+    "--batch-upload",
+    action="store_true",
+    default=os.getenv("BATCH_UPLOAD") == "true",
+    help="Coalesce points and send them to /points/batch instead of one request per point",
+)
 args = parser.parse_args()
 
 SESSION_ID = args.session_id
@@ -108,6 +114,9 @@ EAR_THRESHOLD = 0.18
 POST_TIMEOUT = 5.0
 BACKEND_UPLOAD = True
 UPLOAD_INTERVAL = 1.0  # Upload every 1 second
+BATCH_UPLOAD = args.batch_upload
+BATCH_MAX_POINTS = int(os.getenv("BATCH_MAX_POINTS", "50"))  # Flush when this many points are pending
+BATCH_INTERVAL = float(os.getenv("BATCH_INTERVAL", "2.0"))   # ...or every N seconds
 LOG_PATH = os.path.join(THIS_DIR, "engagement_log.csv")
 
 # =========================================================
@@ -206,6 +215,8 @@ def extract_features_from_window(ear_window):
 
 def graceful_exit(cap, logf):
     try:
+        if BATCH_UPLOAD:
+            batcher.flush()
         cap.release()
         cv2.destroyAllWindows()
         logf.close()
@@ -227,6 +238,7 @@ def upload_point(session_id, score, ear, timestamp_iso, retry_from_buffer=False)
         "score": float(score),
         "ear": float(ear) if ear is not None else None,
         "timestamp": timestamp_iso,
+        "student_id": STUDENT_ID,
     }
 
     headers = {
@@ -300,6 +312,122 @@ def upload_point_background(session_id, score, ear, ts):
         daemon=True
     ).start()
 
+# =========================================================
+# BATCHED UPLOAD
+# =========================================================
+class PointBatcher:
+    """
+    Coalesces points in memory and sends them to /points/batch.
+
+    Flushes when BATCH_MAX_POINTS are pending or every BATCH_INTERVAL seconds,
+    whichever comes first. Failed batches fall back to the offline buffer.
+    """
+
+    def __init__(self, max_points=BATCH_MAX_POINTS, interval=BATCH_INTERVAL):
+        self.max_points = max_points
+        self.interval = interval
+        self.pending = []
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+
+    def add(self, session_id, score, ear, timestamp_iso):
+        with self.lock:
+            self.pending.append({
+                "session_id": session_id,
+                "score": float(score),
+                "ear": float(ear) if ear is not None else None,
+                "timestamp": timestamp_iso,
+            })
+            full = len(self.pending) >= self.max_points
+        if full:
+            self.wake.set()
+
+    def take(self):
+        with self.lock:
+            points, self.pending = self.pending, []
+        return points
+
+    def run(self):
+        while SESSION_ACTIVE:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.flush()
+        # Points captured since the last flush still go out (or to the offline buffer)
+        self.flush()
+
+    def flush(self):
+        points = self.take()
+        if points:
+            upload_batch(points[0]["session_id"], points)
+
+
+batcher = PointBatcher()
+
+def upload_batch(session_id, points):
+    """Upload a list of points in one request to /points/batch"""
+    global SESSION_ACTIVE
+
+    url = f"{BACKEND_BASE}/api/engagement/sessions/{session_id}/points/batch"
+
+    payload = {
+        "points": [
+            {"score": p["score"], "ear": p["ear"], "timestamp": p["timestamp"], "student_id": STUDENT_ID}
+            for p in points
+        ]
+    }
+
+    headers = {
+        "Content-Type": "application/json",
+        "X-DEVICE-KEY": DEVICE_KEY,
+    }
+
+    def buffer_all():
+        for p in points:
+            buffer.add(session_id, p["score"], p["ear"], p["timestamp"])
+
+    try:
+        print_log(f"📤 POST {url} | {len(points)} points")
+
+        r = requests.post(url, json=payload, headers=headers, timeout=POST_TIMEOUT)
+
+        if r.status_code in (200, 201):
+            body = r.json()
+            print_log(f"✅ Batch upload success: {body.get('accepted')} accepted, {body.get('rejected')} rejected")
+            for err in body.get("errors", []):
+                print_log(f"⚠️  Point #{err.get('index')} rejected: {err.get('errors')}")
+            return True
+
+        elif r.status_code == 403:
+            SESSION_ACTIVE = False
+            print_log("🛑 Session ended (403). Stopping uploads and clearing buffer.")
+            buffer.queue.clear()
+            return False
+
+        elif r.status_code == 422:
+            # Every point in the batch was invalid - retrying won't help
+            print_log(f"❌ Batch rejected (422): {r.text}")
+            return False
+
+        else:
+            print_log(f"❌ Batch upload failed: Status {r.status_code}. Buffering points.")
+            buffer_all()
+            return False
+
+    except requests.exceptions.Timeout:
+        print_log(f"⏱️  Batch upload timeout - buffering")
+        buffer_all()
+        return False
+
+    except requests.exceptions.ConnectionError:
+        print_log(f"🔌 Connection error: {BACKEND_BASE}")
+        buffer_all()
+        return False
+
+    except Exception as e:
+        print_log(f"❌ Batch upload error: {e}")
+        buffer_all()
+        return False
+
 def retry_buffered_points():
     """Periodically retry buffered points"""
     while True:
@@ -337,6 +465,10 @@ def main():
         retry_thread = threading.Thread(target=retry_buffered_points, daemon=True)
         retry_thread.start()
         print_log("🟢 [3] retry thread started")
+
+        if BATCH_UPLOAD:
+            threading.Thread(target=batcher.run, daemon=True).start()
+            print_log(f"🟢 [3b] batch uploader started (max {BATCH_MAX_POINTS} points / {BATCH_INTERVAL}s)")
     except Exception as e:
         print_log(f"❌ [3] Retry thread failed: {e}")
         close_debug_log()
@@ -547,7 +679,10 @@ def main():
                     # Only upload if probability changed by more than 1%
                     if last_uploaded_prob is None or abs(current_prob - last_uploaded_prob) > 0.01:
                         print_log(f"🎯 UPLOAD TRIGGERED | Status: {current_status} | Prob: {current_prob:.3f}")
-                        upload_point_background(SESSION_ID, current_prob, ear_avg, ts)
+                        if BATCH_UPLOAD:
+                            batcher.add(SESSION_ID, current_prob, ear_avg, ts)
+                        else:
+                            upload_point_background(SESSION_ID, current_prob, ear_avg, ts)
                         upload_count += 1
                         last_uploaded_prob = current_prob
                 else:
@@ -163,6 +163,102 @@ def predict_engagement(features: list[float]) -> dict:
         }
 
 
+# Features the model was trained on: statistics of the last EAR_WINDOW_SIZE
+# eye aspect ratios (engagement/realtime_engagement.py extract_features_from_window)
+EAR_WINDOW_SIZE = 10
+EAR_THRESHOLD = 0.18
+
+
+def ear_window_features(ear) -> np.ndarray:
+    """
+    Model feature matrix of a per-frame EAR sequence (in capture order).
+
+    Row i = extract_features_from_window of the last EAR_WINDOW_SIZE values
+    up to frame i (fewer for the first frames): mean, std, min, max and
+    fraction below EAR_THRESHOLD.
+    """
+    ear = np.asarray(ear, dtype=float)
+    if ear.ndim != 1 or len(ear) == 0:
+        raise ValueError(f"Expected a non-empty 1-D EAR sequence, got shape {ear.shape}")
+
+    padded = np.concatenate((np.full(EAR_WINDOW_SIZE - 1, np.nan), ear))
+    windows = np.lib.stride_tricks.sliding_window_view(padded, EAR_WINDOW_SIZE)
+    present = ~np.isnan(windows)
+    return np.column_stack((
+        np.nanmean(windows, axis=1),
+        np.nanstd(windows, axis=1),
+        np.nanmin(windows, axis=1),
+        np.nanmax(windows, axis=1),
+        (present & (windows < EAR_THRESHOLD)).sum(axis=1) / present.sum(axis=1),
+    ))
+
+
+def predict_engagement_batch(X) -> dict:
+    """
+    Vectorized predict_engagement for a 2-D feature matrix.
+
+    Runs ONE predict_proba call for all rows instead of one call per row.
+
+    Args:
+        X: array-like of shape (n_rows, n_features)
+
+    Returns:
+        dict with 'labels' (int array), 'probabilities' (float array),
+        'model_available' and 'fallback'
+
+    Falls back to the same heuristic as predict_engagement (first column,
+    the mean EAR, scaled x2, clipped to [0.1, 0.9]) if the model is missing
+    or was trained on a different number of features.
+    """
+    X = np.asarray(X, dtype=float)
+    if X.ndim != 2 or X.shape[0] == 0:
+        raise ValueError(f"Expected a non-empty 2-D feature matrix, got shape {X.shape}")
+
+    model = _model_loader.get_model()
+    n_expected = getattr(model, "n_features_in_", X.shape[1]) if model is not None else None
+
+    if model is None or n_expected != X.shape[1]:
+        if model is not None:
+            logger.warning(
+                f"⚠️  Model expects {n_expected} features, got {X.shape[1]}; using fallback prediction"
+            )
+        prob = np.clip(X[:, 0] * 2, 0.1, 0.9)
+        return {
+            "labels": (prob > 0.5).astype(int),
+            "probabilities": prob,
+            "model_available": model is not None,
+            "fallback": True,
+        }
+
+    try:
+        if hasattr(model, "predict_proba"):
+            proba = model.predict_proba(X)
+            classes = np.asarray(getattr(model, "classes_", np.arange(proba.shape[1])))
+            labels = classes[proba.argmax(axis=1)].astype(int)
+            # Assume: class 0 = not engaged, class 1 = engaged
+            prob = proba[:, 1] if proba.shape[1] > 1 else proba[:, 0]
+        else:
+            labels = np.asarray(model.predict(X)).astype(int)
+            prob = labels.astype(float)
+
+        return {
+            "labels": labels,
+            "probabilities": prob.astype(float),
+            "model_available": True,
+            "fallback": False,
+        }
+
+    except Exception as e:
+        logger.error(f"❌ Batch prediction failed: {e}")
+        return {
+            "labels": np.zeros(X.shape[0], dtype=int),
+            "probabilities": np.full(X.shape[0], 0.5),
+            "model_available": True,
+            "fallback": True,
+            "error": str(e),
+        }
+
+
 # ========================================================
 # HEALTH CHECK
 # ========================================================
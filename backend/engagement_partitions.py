@@ -0,0 +1,227 @@
+# backend/engagement_partitions.py
+"""
+Time-partitioned storage for engagement_points.
+
+PostgreSQL:
+- engagement_points is a declarative RANGE partitioned table on "timestamp",
+  one partition per month (engagement_points_y2026m10, ...)
+- A DEFAULT partition catches points outside the prepared months
+  (device clocks far off), so inserts never fail
+- Partitions are created ENGAGEMENT_PARTITION_MONTHS_AHEAD months in advance
+- Retention (ENGAGEMENT_RETENTION_MONTHS > 0) detaches or drops partitions
+  entirely older than the window - no row-by-row DELETE, no vacuum debt
+
+SQLite (tests/dev): a plain table; retention falls back to DELETE.
+
+The partitioned parent is created here, BEFORE Base.metadata.create_all,
+because create_all can't express PARTITION BY or the (id, timestamp)
+primary key Postgres requires on partitioned tables.
+"""
+import os
+import re
+from datetime import date, datetime, timezone
+
+from sqlalchemy import inspect, text
+
+from database import Base
+from models import EngagementPoint
+
+ENGAGEMENT_PARTITION_MONTHS_AHEAD = int(os.getenv("ENGAGEMENT_PARTITION_MONTHS_AHEAD", "3"))
+ENGAGEMENT_RETENTION_MONTHS = int(os.getenv("ENGAGEMENT_RETENTION_MONTHS", "0"))  # 0 = keep forever
+ENGAGEMENT_RETENTION_MODE = os.getenv("ENGAGEMENT_RETENTION_MODE", "detach")  # detach | drop
+ENGAGEMENT_PARTITION_CHECK_HOURS = float(os.getenv("ENGAGEMENT_PARTITION_CHECK_HOURS", "6"))
+
+POINTS_TABLE = EngagementPoint.__tablename__
+DEFAULT_PARTITION = f"{POINTS_TABLE}_default"
+_PARTITION_RE = re.compile(rf"^{POINTS_TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+# Same columns and indexes as models.EngagementPoint; timestamp joins the PK
+# because every unique constraint must contain the partition key.
+PARENT_DDL = [
+    f"""
+    CREATE TABLE {POINTS_TABLE} (
+        id SERIAL,
+        session_id INTEGER NOT NULL REFERENCES engagement_sessions (id) ON DELETE CASCADE,
+        timestamp TIMESTAMPTZ NOT NULL DEFAULT now(),
+        score DOUBLE PRECISION NOT NULL,
+        ear DOUBLE PRECISION,
+        student_id INTEGER REFERENCES users (id) ON DELETE SET NULL,
+        PRIMARY KEY (id, timestamp)
+    ) PARTITION BY RANGE (timestamp)
+    """,
+    f"CREATE INDEX idx_engagement_points_session_ts ON {POINTS_TABLE} "
+    "(session_id, timestamp) INCLUDE (score, ear, student_id)",
+    f"CREATE INDEX idx_engagement_points_session_student_ts ON {POINTS_TABLE} "
+    "(session_id, student_id, timestamp)",
+    f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {POINTS_TABLE} DEFAULT",
+]
+
+
+# ========== MONTH HELPERS ==========
+
+def month_start(dt) -> date:
+    return date(dt.year, dt.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{POINTS_TABLE}_y{month.year}m{month.month:02d}"
+
+
+# ========== POSTGRES ==========
+
+def is_partitioned(conn) -> bool:
+    return conn.execute(text("""
+        SELECT 1
+        FROM pg_partitioned_table p
+        JOIN pg_class c ON c.oid = p.partrelid
+        WHERE c.relname = :table AND pg_table_is_visible(c.oid)
+    """), {"table": POINTS_TABLE}).first() is not None
+
+
+def create_partitioned_table(conn):
+    """Create the partitioned parent, its indexes and the DEFAULT partition."""
+    for sql in PARENT_DDL:
+        conn.execute(text(sql))
+
+
+def list_partitions(conn) -> list[tuple[str, date]]:
+    """Attached monthly partitions as (name, month), oldest first. DEFAULT is excluded."""
+    rows = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE parent.relname = :table AND pg_table_is_visible(parent.oid)
+    """), {"table": POINTS_TABLE}).scalars()
+
+    partitions = []
+    for name in rows:
+        match = _PARTITION_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def ensure_partitions(conn, first_month: date, last_month: date) -> list[str]:
+    """
+    Create monthly partitions from first_month to last_month (inclusive).
+
+    Existing partitions are skipped. A month that already has rows in the
+    DEFAULT partition can't be created; it is reported and left in DEFAULT.
+    """
+    existing = {name for name, _ in list_partitions(conn)}
+    created = []
+
+    month = first_month
+    while month <= last_month:
+        name = partition_name(month)
+        if name not in existing:
+            try:
+                with conn.begin_nested():
+                    conn.execute(text(
+                        f"CREATE TABLE {name} PARTITION OF {POINTS_TABLE} "
+                        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+                    ))
+                created.append(name)
+            except Exception as e:
+                print(f"⚠️ Could not create partition {name}: {e}")
+        month = add_months(month, 1)
+
+    return created
+
+
+def apply_retention(conn, now: datetime) -> list[str]:
+    """Detach (or drop) monthly partitions that end before the retention cutoff."""
+    if ENGAGEMENT_RETENTION_MONTHS <= 0:
+        return []
+
+    cutoff = add_months(month_start(now), -ENGAGEMENT_RETENTION_MONTHS)
+    handled = []
+
+    for name, month in list_partitions(conn):
+        if add_months(month, 1) > cutoff:
+            break
+
+        conn.execute(text(f"ALTER TABLE {POINTS_TABLE} DETACH PARTITION {name}"))
+        if ENGAGEMENT_RETENTION_MODE == "drop":
+            conn.execute(text(f"DROP TABLE {name}"))
+        handled.append(name)
+
+    return handled
+
+
+# ========== ENTRY POINTS ==========
+
+def prepare_engagement_storage(engine):
+    """
+    Startup hook: on Postgres, create engagement_points as a partitioned
+    table (plus the upcoming partitions) if it doesn't exist yet.
+
+    Must run before Base.metadata.create_all, which then leaves the
+    existing table alone. No-op on other databases.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+
+    try:
+        if POINTS_TABLE not in inspect(engine).get_table_names():
+            # Referenced tables first (engagement_sessions, users)
+            Base.metadata.create_all(
+                bind=engine,
+                tables=[t for t in Base.metadata.sorted_tables if t.name != POINTS_TABLE],
+            )
+            with engine.begin() as conn:
+                create_partitioned_table(conn)
+            print(f"🗄️  Created partitioned table {POINTS_TABLE} (monthly RANGE on timestamp)")
+
+        run_partition_maintenance(engine)
+
+    except Exception as e:
+        print(f"❌ Engagement storage setup failed: {e}")
+
+
+def run_partition_maintenance(engine, now: datetime = None) -> dict:
+    """
+    Create upcoming partitions and apply the retention policy.
+
+    Called at startup and every ENGAGEMENT_PARTITION_CHECK_HOURS.
+    """
+    now = now or datetime.now(timezone.utc)
+    result = {"created": [], "retired": [], "deleted_rows": 0}
+
+    if engine.dialect.name != "postgresql":
+        # SQLite fallback: single table, row-level retention
+        if ENGAGEMENT_RETENTION_MONTHS > 0:
+            cutoff = add_months(month_start(now), -ENGAGEMENT_RETENTION_MONTHS)
+            with engine.begin() as conn:
+                deleted = conn.execute(
+                    EngagementPoint.__table__.delete().where(
+                        EngagementPoint.timestamp < datetime(cutoff.year, cutoff.month, 1, tzinfo=timezone.utc)
+                    )
+                )
+            result["deleted_rows"] = deleted.rowcount
+        return result
+
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            print(f"⚠️ {POINTS_TABLE} is not partitioned - run partition_engagement_points.py")
+            return result
+
+        current = month_start(now)
+        result["created"] = ensure_partitions(
+            conn, current, add_months(current, ENGAGEMENT_PARTITION_MONTHS_AHEAD)
+        )
+        result["retired"] = apply_retention(conn, now)
+
+    if result["created"]:
+        print(f"🗄️  Created partitions: {', '.join(result['created'])}")
+    if result["retired"]:
+        action = "Dropped" if ENGAGEMENT_RETENTION_MODE == "drop" else "Detached"
+        print(f"🗄️  {action} partitions past retention: {', '.join(result['retired'])}")
+
+    return result
@@ -0,0 +1,210 @@
+# backend/engagement_rollups.py
+"""
+Multi-resolution rollups of engagement points.
+
+Every bulk point write (write-behind flush or synchronous insert) also
+folds the new points into engagement_rollups at 1s, 10s and 60s buckets
+with ONE upsert, in the same transaction:
+    count, sum, sum of squares, min, max   (score and EAR)
+
+Reads with ?resolution=1s|10s|1m return one row per bucket, so an
+hour-long class is ~60 rows at 1m instead of tens of thousands of points.
+
+rebuild_rollups() recomputes a session from raw points (backfill, or after
+points were edited outside the ingest path).
+"""
+import math
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+
+from models import EngagementPoint, EngagementRollup
+
+ROLLUP_RESOLUTIONS = (1, 10, 60)
+
+# Query parameter value -> bucket size in seconds
+RESOLUTION_PARAMS = {"1s": 1, "10s": 10, "1m": 60}
+
+ROLLUP_TABLE = EngagementRollup.__table__
+ROLLUP_KEY = ("session_id", "resolution_s", "bucket_start")
+
+
+def _epoch(ts) -> float:
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def aggregate_rows(rows, resolutions=ROLLUP_RESOLUTIONS) -> list[dict]:
+    """
+    Fold point rows (dicts with session_id/timestamp/score/ear) into
+    rollup rows, one per (session, resolution, bucket).
+    """
+    buckets = {}
+
+    for row in rows:
+        epoch = _epoch(row["timestamp"])
+        score = float(row["score"])
+        ear = row.get("ear")
+
+        for res in resolutions:
+            key = (row["session_id"], res, int(epoch // res) * res)
+            b = buckets.get(key)
+            if b is None:
+                b = buckets[key] = {
+                    "count": 0, "score_sum": 0.0, "score_sumsq": 0.0,
+                    "score_min": score, "score_max": score,
+                    "ear_count": 0, "ear_sum": 0.0, "ear_sumsq": 0.0,
+                    "ear_min": None, "ear_max": None,
+                }
+
+            b["count"] += 1
+            b["score_sum"] += score
+            b["score_sumsq"] += score * score
+            b["score_min"] = min(b["score_min"], score)
+            b["score_max"] = max(b["score_max"], score)
+
+            if ear is not None:
+                ear = float(ear)
+                b["ear_count"] += 1
+                b["ear_sum"] += ear
+                b["ear_sumsq"] += ear * ear
+                b["ear_min"] = ear if b["ear_min"] is None else min(b["ear_min"], ear)
+                b["ear_max"] = ear if b["ear_max"] is None else max(b["ear_max"], ear)
+
+    # Sorted by key so concurrent flushers lock rows in the same order
+    return [
+        {
+            "session_id": session_id,
+            "resolution_s": res,
+            "bucket_start": datetime.fromtimestamp(start, tz=timezone.utc),
+            **values,
+        }
+        for (session_id, res, start), values in sorted(buckets.items())
+    ]
+
+
+def _upsert_statement(dialect: str, values: list[dict]):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        least, greatest = func.least, func.greatest
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        # SQLite's multi-argument min()/max() are scalar functions
+        least, greatest = func.min, func.max
+
+    stmt = dialect_insert(ROLLUP_TABLE).values(values)
+    t, ex = ROLLUP_TABLE.c, stmt.excluded
+
+    def lower(a, b):
+        # NULL-safe: a bucket may not have seen an EAR yet
+        return least(func.coalesce(a, b), func.coalesce(b, a))
+
+    def upper(a, b):
+        return greatest(func.coalesce(a, b), func.coalesce(b, a))
+
+    return stmt.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEY),
+        set_={
+            "count": t.count + ex.count,
+            "score_sum": t.score_sum + ex.score_sum,
+            "score_sumsq": t.score_sumsq + ex.score_sumsq,
+            "score_min": lower(t.score_min, ex.score_min),
+            "score_max": upper(t.score_max, ex.score_max),
+            "ear_count": t.ear_count + ex.ear_count,
+            "ear_sum": t.ear_sum + ex.ear_sum,
+            "ear_sumsq": t.ear_sumsq + ex.ear_sumsq,
+            "ear_min": lower(t.ear_min, ex.ear_min),
+            "ear_max": upper(t.ear_max, ex.ear_max),
+        },
+    )
+
+
+def update_rollups(conn, rows: list[dict]):
+    """
+    Fold freshly written point rows into the rollups on an open Connection.
+
+    Does NOT commit - called from ingest_queue.write_points inside the
+    transaction that writes the raw points.
+    """
+    values = aggregate_rows(rows)
+    if values:
+        conn.execute(_upsert_statement(conn.dialect.name, values))
+
+
+def rebuild_rollups(conn, session_id: int) -> int:
+    """Recompute every rollup of a session from its raw points. Returns the point count."""
+    conn.execute(ROLLUP_TABLE.delete().where(ROLLUP_TABLE.c.session_id == session_id))
+
+    points = conn.execute(
+        select(
+            EngagementPoint.session_id,
+            EngagementPoint.timestamp,
+            EngagementPoint.score,
+            EngagementPoint.ear,
+        ).where(EngagementPoint.session_id == session_id)
+    ).mappings().all()
+
+    values = aggregate_rows(points)
+    if values:
+        conn.execute(ROLLUP_TABLE.insert(), values)
+    return len(points)
+
+
+# ========== READ SIDE ==========
+
+def _mean_std(n, total, sumsq):
+    if not n:
+        return None, None
+    mean = total / n
+    # Guard tiny negative variance from float rounding
+    variance = max(sumsq / n - mean * mean, 0.0)
+    return mean, math.sqrt(variance)
+
+
+def bucket_to_dict(b) -> dict:
+    """API shape of one rollup bucket (same timestamp/score/ear keys as PointOut)."""
+    score_mean, score_std = _mean_std(b.count, b.score_sum, b.score_sumsq)
+    ear_mean, _ = _mean_std(b.ear_count, b.ear_sum, b.ear_sumsq)
+    bucket_start = b.bucket_start
+    if bucket_start.tzinfo is None:
+        bucket_start = bucket_start.replace(tzinfo=timezone.utc)
+
+    return {
+        "timestamp": bucket_start.isoformat(),
+        "score": round(score_mean, 4),
+        "ear": round(ear_mean, 4) if ear_mean is not None else None,
+        "count": b.count,
+        "score_min": b.score_min,
+        "score_max": b.score_max,
+        "score_std": round(score_std, 4),
+    }
+
+
+def rollup_query(db, session_id: int, resolution_s: int):
+    return db.query(EngagementRollup).filter(
+        EngagementRollup.session_id == session_id,
+        EngagementRollup.resolution_s == resolution_s,
+    )
+
+
+def rollup_summary(db, session_id: int, resolution_s: int) -> dict:
+    """Session-wide count/avg/min/max from one resolution's buckets (exact, any resolution)."""
+    count, total, lowest, highest = db.query(
+        func.sum(EngagementRollup.count),
+        func.sum(EngagementRollup.score_sum),
+        func.min(EngagementRollup.score_min),
+        func.max(EngagementRollup.score_max),
+    ).filter(
+        EngagementRollup.session_id == session_id,
+        EngagementRollup.resolution_s == resolution_s,
+    ).one()
+
+    return {
+        "count": int(count or 0),
+        "avg": (total / count) if count else 0.0,
+        "min": lowest or 0.0,
+        "max": highest or 0.0,
+    }
@@ -0,0 +1,94 @@
+# backend/engagement_series.py
+"""
+EngagementSeries: a session's (timestamp, score) points as two arrays.
+
+    t_ms    int64    timestamp, epoch milliseconds (UTC)
+    score   float64
+
+The report path used to turn every EngagementPoint.timestamp into an ISO
+string, only for analytics to parse it back with datetime.fromisoformat.
+fetch_series has the database compute epoch milliseconds instead
+(extract(epoch ...) / julianday), and the series goes as-is through
+analytics and report rendering. ISO strings are produced only for what
+ends up in JSON (iso / to_points); binary encodings take the columns.
+"""
+from typing import List, Dict, Optional
+
+import numpy as np
+from sqlalchemy import BigInteger, Integer, cast, extract, func
+from sqlalchemy.orm import Session
+
+# julianday() of 1970-01-01T00:00:00Z
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+MS_PER_DAY = 86_400_000
+
+
+def epoch_ms_column(dialect_name: str, column):
+    """SQL expression: a timestamp column as integer epoch milliseconds."""
+    if dialect_name == "postgresql":
+        # extract(epoch) is exact: truncate like series_format._epoch_ms
+        return cast(func.floor(extract("epoch", column) * 1000), BigInteger)
+    # SQLite keeps timestamps as UTC text; julianday is a double (~0.05 ms error), so round
+    return cast(func.round((func.julianday(column) - UNIX_EPOCH_JULIAN_DAY) * MS_PER_DAY), Integer)
+
+
+def iso_ms(t_ms) -> List[str]:
+    """Epoch milliseconds -> ISO 8601 UTC strings, e.g. 2026-01-01T09:00:03.111+00:00."""
+    t_ms = np.asarray(t_ms, dtype=np.int64)
+    return [t + "+00:00" for t in np.datetime_as_string(t_ms.astype("datetime64[ms]"), unit="ms").tolist()]
+
+
+class EngagementSeries:
+    """Points of one session (or student) ordered by time. Not copied: treat as read-only."""
+
+    def __init__(self, t_ms, score):
+        self.t_ms = np.ascontiguousarray(t_ms, dtype=np.int64)
+        self.score = np.ascontiguousarray(score, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.t_ms)
+
+    @property
+    def t_us(self) -> np.ndarray:
+        return self.t_ms * 1000
+
+    def iso(self, indices=None) -> List[str]:
+        """ISO 8601 timestamps (JSON boundary) of the given points, or of all of them."""
+        return iso_ms(self.t_ms if indices is None else self.t_ms[np.asarray(indices, dtype=np.int64)])
+
+    def to_points(self) -> List[Dict]:
+        """[{timestamp, score}] as the JSON timeline."""
+        return [
+            {"timestamp": ts, "score": score}
+            for ts, score in zip(self.iso(), self.score.tolist())
+        ]
+
+    def columns(self) -> dict:
+        """(t_ms, score) columns for binary_format."""
+        return {"t_ms": self.t_ms, "score": self.score}
+
+
+def fetch_series(db: Session, session_id: int, student_id: Optional[int] = None) -> EngagementSeries:
+    """
+    Points of a session (optionally one student) as an EngagementSeries.
+
+    Same filter and order as engagement._points_query with only the
+    (timestamp, score) columns, so Postgres can still answer with an
+    index-only scan on idx_engagement_points_session_ts.
+    """
+    # Imported here: analytics uses EngagementSeries without the DB layer
+    from models import EngagementPoint
+
+    q = db.query(
+        epoch_ms_column(db.get_bind().dialect.name, EngagementPoint.timestamp),
+        EngagementPoint.score,
+    ).filter(EngagementPoint.session_id == session_id)
+    if student_id is not None:
+        q = q.filter(EngagementPoint.student_id == student_id)
+    rows = q.order_by(EngagementPoint.timestamp.asc()).all()
+
+    n = len(rows)
+    return EngagementSeries(
+        np.fromiter((r[0] for r in rows), dtype=np.int64, count=n),
+        np.fromiter((r[1] for r in rows), dtype=np.float64, count=n),
+    )
@@ -0,0 +1,155 @@
+# backend/heartbeats.py
+"""
+Coalesced session heartbeats.
+
+POST /sessions/{id}/heartbeat only needs to move last_seen_at forward.
+Instead of an UPDATE + commit per teacher/student beat, beats go into an
+in-memory map (session id -> latest beat) and a background thread writes
+them every HEARTBEAT_FLUSH_SECONDS as ONE statement:
+
+    UPDATE engagement_sessions
+    SET last_seen_at = greatest(engagement_sessions.last_seen_at, v.last_seen_at)
+    FROM (VALUES (:id, :ts), ...) AS v (id, last_seen_at)
+    WHERE engagement_sessions.id = v.id AND engagement_sessions.ended_at IS NULL
+    RETURNING engagement_sessions.id
+
+A class of 60 is then one write per session per interval, whatever the
+beat rate. Ended sessions are never touched (no contention with
+end_session); sessions that didn't update were ended elsewhere and are
+evicted from the session registry so the next beat reports "ended".
+
+SQLite (no VALUES alias list): one UPDATE per session in one transaction.
+
+HEARTBEAT_FLUSH_SECONDS must stay well below the watchdog timeout (30s);
+the watchdog also flushes before it looks for inactive sessions.
+"""
+import os
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime, Integer, column, func, update, values
+
+from database import engine
+from models import EngagementSession
+from session_registry import session_registry
+
+HEARTBEAT_FLUSH_SECONDS = float(os.getenv("HEARTBEAT_FLUSH_SECONDS", "5"))
+
+SESSIONS = EngagementSession.__table__
+
+
+class HeartbeatTracker:
+    def __init__(self, flush_seconds: float = HEARTBEAT_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._last_seen: dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Metrics
+        self.beats_total = 0
+        self.flushed_total = 0
+        self.flush_count = 0
+        self.failed_flushes = 0
+
+    def record(self, session_id: int, at: datetime = None):
+        at = at or datetime.now(timezone.utc)
+        with self._lock:
+            previous = self._last_seen.get(session_id)
+            if previous is None or at > previous:
+                self._last_seen[session_id] = at
+            self.beats_total += 1
+
+    def pending(self) -> int:
+        return len(self._last_seen)
+
+    def _write(self, conn, beats: dict) -> set:
+        """Write beats on an open connection. Returns the ids actually updated."""
+        if conn.dialect.name == "postgresql":
+            v = values(
+                column("id", Integer),
+                column("last_seen_at", DateTime(timezone=True)),
+                name="v",
+            ).data(list(beats.items()))
+            stmt = (
+                update(SESSIONS)
+                .where(SESSIONS.c.id == v.c.id, SESSIONS.c.ended_at.is_(None))
+                .values(last_seen_at=func.greatest(SESSIONS.c.last_seen_at, v.c.last_seen_at))
+                .returning(SESSIONS.c.id)
+            )
+            return set(conn.execute(stmt).scalars())
+
+        updated = set()
+        for session_id, at in sorted(beats.items()):
+            stmt = (
+                update(SESSIONS)
+                .where(SESSIONS.c.id == session_id, SESSIONS.c.ended_at.is_(None))
+                .values(last_seen_at=at)
+            )
+            if conn.execute(stmt).rowcount:
+                updated.add(session_id)
+        return updated
+
+    def flush(self) -> int:
+        """Write all pending beats. Safe to call from any thread. Returns sessions updated."""
+        with self._flush_lock:
+            with self._lock:
+                beats = self._last_seen
+                self._last_seen = {}
+
+            if not beats:
+                return 0
+
+            try:
+                with engine.begin() as conn:
+                    updated = self._write(conn, beats)
+            except Exception as e:
+                print(f"⚠️  Failed to flush heartbeats ({len(beats)} sessions kept): {e}")
+                self.failed_flushes += 1
+                # Put the beats back unless newer ones arrived meanwhile
+                with self._lock:
+                    for session_id, at in beats.items():
+                        current = self._last_seen.get(session_id)
+                        if current is None or at > current:
+                            self._last_seen[session_id] = at
+                return 0
+
+            # Not updated: ended/deleted by another worker or the watchdog
+            for session_id in beats.keys() - updated:
+                session_registry.invalidate(session_id)
+
+            self.flush_count += 1
+            self.flushed_total += len(updated)
+            return len(updated)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="heartbeat-flusher", daemon=True)
+        self._thread.start()
+        print(f"💓 Heartbeat flusher started (every {self.flush_seconds:g}s)")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(5)
+        self.flush()
+
+    def metrics(self) -> dict:
+        return {
+            "pending_sessions": self.pending(),
+            "beats_total": self.beats_total,
+            "flushed_total": self.flushed_total,
+            "flush_count": self.flush_count,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+# Global instance (one per API process)
+heartbeat_tracker = HeartbeatTracker()
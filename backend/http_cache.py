@@ -0,0 +1,107 @@
+# backend/http_cache.py
+"""
+Conditional GET (ETag / If-None-Match) for ended engagement sessions.
+
+Once a session has ended its points, analytics and report never change,
+so the series/analytics/report endpoints send a strong ETag derived from
+    (session id, ended_at, point count frozen at end, request variant)
+and answer 304 Not Modified straight after the session lookup - before
+any engagement point is read.
+
+The point count is frozen into engagement_sessions.total_points when the
+session ends (end_session / watchdog), after the write-behind queue has
+been flushed. Live sessions get no ETag.
+"""
+import hashlib
+import os
+
+from fastapi import Response
+from sqlalchemy import func
+
+from ingest_queue import ingest_queue, INGEST_WRITE_BEHIND
+from models import EngagementPoint
+
+ENDED_SESSION_CACHE_SECONDS = int(os.getenv("ENDED_SESSION_CACHE_SECONDS", "3600"))
+
+# Bump when the JSON shape of a cached endpoint changes
+ETAG_VERSION = "1"
+
+
+def freeze_point_count(db, session, flush: bool = True):
+    """
+    Store the final point count on an ended session (ETag input).
+
+    Call with session.ended_at set. Flushes this process's write-behind
+    queue first so queued points are counted, then writes ended_at before
+    counting: in-flight point writes finish first, later ones (other
+    workers, queues) are refused by write_points. Does NOT commit.
+    """
+    if flush and INGEST_WRITE_BEHIND:
+        ingest_queue.flush()
+
+    db.flush()
+    session.total_points = db.query(func.count(EngagementPoint.id)).filter(
+        EngagementPoint.session_id == session.id
+    ).scalar()
+
+
+def session_etag(session, variant: str = "") -> str | None:
+    """
+    Strong ETag for an ended session's data, or None while it can still change.
+
+    variant distinguishes representations of the same session (endpoint
+    path + query string).
+    """
+    if session.ended_at is None or session.is_deleted or session.total_points is None:
+        return None
+
+    raw = f"{ETAG_VERSION}:{session.id}:{session.ended_at.isoformat()}:{session.total_points}:{variant}"
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def request_variant(request, media_type: str = None) -> str:
+    """Path + query, plus the negotiated encoding for endpoints that honour Accept."""
+    return f"{request.url.path}?{request.url.query}#{media_type or 'json'}"
+
+
+def etag_matches(request, etag: str | None) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for this header)."""
+    if etag is None:
+        return False
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+def cache_headers(etag: str) -> dict:
+    # private: responses are per-user (JWT protected)
+    return {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={ENDED_SESSION_CACHE_SECONDS}",
+        # Series and report are content-negotiated (binary_format)
+        "Vary": "Accept",
+    }
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
+
+
+def set_cache_headers(response: Response, etag: str | None):
+    if etag is not None:
+        response.headers.update(cache_headers(etag))
+
+
+def with_cache_headers(result, response: Response, etag: str | None):
+    """
+    Attach ETag/Cache-Control to an endpoint result.
+
+    Endpoints return either plain data (headers go on the injected
+    Response) or a Response object of their own.
+    """
+    set_cache_headers(result if isinstance(result, Response) else response, etag)
+    return result
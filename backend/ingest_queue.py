@@ -0,0 +1,331 @@
+# backend/ingest_queue.py
+"""
+Write-behind ingestion queue for engagement points.
+
+Ingestion endpoints validate points and hand them to the queue, then
+acknowledge the request right away. A background flusher drains the
+queue every INGEST_FLUSH_INTERVAL_MS (or as soon as INGEST_FLUSH_MAX_ROWS
+are pending) with one bulk write per chunk:
+- PostgreSQL: COPY ... FROM STDIN
+- Other databases: executemany INSERT
+
+When the queue is full, submit() refuses the rows and the endpoint
+answers 503 + Retry-After instead of growing memory without bound.
+
+A chunk that fails is kept for the next flush, unless the database
+rejected its data (integrity / data error, e.g. a row of a session
+deleted meanwhile): then it is written row by row and only the rejected
+rows are dropped (dead_lettered_total), so one bad row cannot block the
+queue.
+
+Every write (queued or not) first checks that the sessions are still
+open and holds them until it commits (write_points): points reaching
+the DB after end_session / the watchdog froze a session's point count
+(ETag input) are dropped, whichever worker queued them.
+"""
+import csv
+import io
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from sqlalchemy import false, insert, select, update
+from sqlalchemy.exc import DataError, IntegrityError
+
+from database import engine
+from engagement_rollups import update_rollups
+from models import EngagementPoint, EngagementSession
+
+INGEST_WRITE_BEHIND = os.getenv("INGEST_WRITE_BEHIND", "true") == "true"
+INGEST_QUEUE_MAX_ROWS = int(os.getenv("INGEST_QUEUE_MAX_ROWS", "50000"))
+INGEST_FLUSH_INTERVAL_MS = int(os.getenv("INGEST_FLUSH_INTERVAL_MS", "250"))
+INGEST_FLUSH_MAX_ROWS = int(os.getenv("INGEST_FLUSH_MAX_ROWS", "2000"))
+INGEST_RETRY_AFTER_SECONDS = int(os.getenv("INGEST_RETRY_AFTER_SECONDS", "1"))
+
+POINT_COLUMNS = ("session_id", "student_id", "timestamp", "score", "ear")
+
+
+# ========== BULK WRITERS ==========
+
+def _copy_points(conn, rows: list[dict]):
+    """Stream rows into engagement_points with PostgreSQL COPY (psycopg2)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([
+            "" if row[col] is None
+            else row[col].isoformat() if isinstance(row[col], datetime)
+            else row[col]
+            for col in POINT_COLUMNS
+        ])
+    buf.seek(0)
+
+    columns = ", ".join(f'"{col}"' for col in POINT_COLUMNS)
+    cursor = conn.connection.cursor()
+    try:
+        # Unquoted empty CSV fields are read as NULL
+        cursor.copy_expert(
+            f"COPY {EngagementPoint.__tablename__} ({columns}) FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+    finally:
+        cursor.close()
+
+
+def _open_session_ids(conn, session_ids: set) -> set:
+    """
+    Those of the sessions that are not ended, held until the caller commits.
+
+    Ending a session updates its row and only then counts its points
+    (freeze_point_count, the watchdog): it waits for writers holding the
+    row, and writers coming after it see ended_at.
+    """
+    table = EngagementSession.__table__
+    stmt = select(table.c.id).where(table.c.id.in_(session_ids), table.c.ended_at.is_(None))
+    if conn.dialect.name == "postgresql":
+        stmt = stmt.with_for_update(read=True)
+    else:
+        # SQLite: a (no-op) write takes the database write lock before the check
+        conn.execute(update(table).where(false()).values(ended_at=table.c.ended_at))
+    return set(conn.execute(stmt).scalars())
+
+
+def write_points(conn, rows: list[dict], returning: bool = False):
+    """
+    Bulk-write engagement point rows on an open Connection, and fold them
+    into the 1s/10s/60s rollups in the same transaction.
+
+    Rows of sessions that have ended are dropped. Returns the number of
+    rows written - or with returning=True their ids, in row order
+    (INSERT ... RETURNING instead of COPY: for request-sized writes).
+
+    Does NOT commit - the caller owns the transaction.
+    ORM callers pass db.connection() to stay in the session's transaction.
+    """
+    if not rows:
+        return [] if returning else 0
+
+    open_ids = _open_session_ids(conn, {row["session_id"] for row in rows})
+    if len(open_ids) < len({row["session_id"] for row in rows}):
+        rows = [row for row in rows if row["session_id"] in open_ids]
+        if not rows:
+            return [] if returning else 0
+
+    table = EngagementPoint.__table__
+    if returning:
+        ids = list(conn.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True), rows
+        ).scalars())
+    elif conn.dialect.name == "postgresql":
+        _copy_points(conn, rows)
+    else:
+        conn.execute(insert(table), rows)
+
+    update_rollups(conn, rows)
+    return ids if returning else len(rows)
+
+
+# ========== QUEUE ==========
+
+class IngestQueue:
+    """
+    Bounded in-process queue with a periodic bulk flusher.
+
+    Rows are dicts with POINT_COLUMNS keys. Each row remembers when it was
+    enqueued so the flusher can report flush lag (enqueue -> durable).
+    """
+
+    def __init__(
+        self,
+        max_rows: int = INGEST_QUEUE_MAX_ROWS,
+        flush_interval_ms: int = INGEST_FLUSH_INTERVAL_MS,
+        flush_max_rows: int = INGEST_FLUSH_MAX_ROWS,
+    ):
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.flush_max_rows = flush_max_rows
+
+        self._rows = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        # Metrics
+        self.enqueued_total = 0
+        self.flushed_total = 0
+        self.rejected_total = 0
+        self.failed_flushes = 0
+        self.late_rows_dropped = 0
+        self.dead_lettered_total = 0
+        self.last_dead_letter_error = None
+        self.flush_count = 0
+        self.last_flush_at = None
+        self.last_flush_rows = 0
+        self.last_flush_duration_ms = 0.0
+        self.last_flush_lag_ms = 0.0
+        self.max_flush_lag_ms = 0.0
+
+    # ---------- producer side ----------
+
+    def submit(self, rows: list[dict]) -> bool:
+        """
+        Enqueue rows (all or nothing).
+
+        Returns False when the queue has no room - the caller should
+        answer 503 with Retry-After.
+        """
+        if not rows:
+            return True
+
+        now = time.monotonic()
+        with self._lock:
+            if len(self._rows) + len(rows) > self.max_rows:
+                self.rejected_total += len(rows)
+                return False
+            self._rows.extend((now, row) for row in rows)
+            self.enqueued_total += len(rows)
+            pending = len(self._rows)
+
+        if pending >= self.flush_max_rows:
+            self._wake.set()
+        return True
+
+    def depth(self) -> int:
+        return len(self._rows)
+
+    # ---------- consumer side ----------
+
+    def _take(self) -> list:
+        with self._lock:
+            n = min(len(self._rows), self.flush_max_rows)
+            return [self._rows.popleft() for _ in range(n)]
+
+    def _requeue(self, items: list):
+        with self._lock:
+            self._rows.extendleft(reversed(items))
+
+    def flush(self) -> int:
+        """
+        Drain everything currently queued. Safe to call from any thread.
+
+        Returns the number of rows written.
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                items = self._take()
+                if not items:
+                    break
+
+                started = time.monotonic()
+                dropped = 0
+                try:
+                    with engine.begin() as conn:
+                        stored = write_points(conn, [row for _, row in items])
+                except (IntegrityError, DataError) as e:
+                    print(f"⚠️  Ingest flush rejected ({len(items)} rows), writing row by row: {e.orig}")
+                    stored, dropped, kept = self._write_rows_singly(items)
+                    if kept:
+                        self.flushed_total += stored
+                        written += stored
+                        break
+                except Exception as e:
+                    # Keep the rows for the next attempt
+                    self._requeue(items)
+                    self.failed_flushes += 1
+                    print(f"❌ Ingest flush failed ({len(items)} rows kept): {e}")
+                    break
+
+                done = time.monotonic()
+                lag_ms = (done - items[0][0]) * 1000.0
+
+                late = len(items) - stored - dropped
+                if late:
+                    self.late_rows_dropped += late
+                    print(f"⚠️  Ingest flush dropped {late} rows of ended sessions")
+
+                self.flush_count += 1
+                self.flushed_total += stored
+                self.last_flush_at = datetime.now(timezone.utc)
+                self.last_flush_rows = stored
+                self.last_flush_duration_ms = round((done - started) * 1000.0, 2)
+                self.last_flush_lag_ms = round(lag_ms, 2)
+                self.max_flush_lag_ms = max(self.max_flush_lag_ms, self.last_flush_lag_ms)
+                written += stored
+
+        return written
+
+    def _write_rows_singly(self, items: list) -> tuple[int, int, int]:
+        """
+        Write a rejected chunk one row per transaction; drop the rows the
+        database rejects. Any other error requeues the rest.
+
+        Returns (rows written, rows dropped, rows requeued).
+        """
+        stored, dropped = 0, 0
+        for i, item in enumerate(items):
+            try:
+                with engine.begin() as conn:
+                    stored += write_points(conn, [item[1]])
+            except (IntegrityError, DataError) as e:
+                dropped += 1
+                self.dead_lettered_total += 1
+                self.last_dead_letter_error = str(e.orig)
+                print(f"🗑️  Ingest row dropped (session {item[1].get('session_id')}): {e.orig}")
+            except Exception as e:
+                self._requeue(items[i:])
+                self.failed_flushes += 1
+                print(f"❌ Ingest flush failed ({len(items) - i} rows kept): {e}")
+                return stored, dropped, len(items) - i
+        return stored, dropped, 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ingest-flusher", daemon=True)
+        self._thread.start()
+        print(f"🚚 Ingest flusher started (every {int(self.flush_interval * 1000)}ms / {self.flush_max_rows} rows)")
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the flusher and write out whatever is still queued."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        remaining = self.flush()
+        print(f"🚚 Ingest flusher stopped ({remaining} rows flushed on shutdown, {self.depth()} left)")
+
+    def metrics(self) -> dict:
+        return {
+            "write_behind": INGEST_WRITE_BEHIND,
+            "queue_depth": self.depth(),
+            "queue_capacity": self.max_rows,
+            "enqueued_total": self.enqueued_total,
+            "flushed_total": self.flushed_total,
+            "rejected_total": self.rejected_total,
+            "failed_flushes": self.failed_flushes,
+            "late_rows_dropped": self.late_rows_dropped,
+            "dead_lettered_total": self.dead_lettered_total,
+            "last_dead_letter_error": self.last_dead_letter_error,
+            "flush_count": self.flush_count,
+            "last_flush_at": self.last_flush_at.isoformat() if self.last_flush_at else None,
+            "last_flush_rows": self.last_flush_rows,
+            "last_flush_duration_ms": self.last_flush_duration_ms,
+            "last_flush_lag_ms": self.last_flush_lag_ms,
+            "max_flush_lag_ms": self.max_flush_lag_ms,
+        }
+
+
+# Global instance (one per API process)
+ingest_queue = IngestQueue()
@@ -0,0 +1,309 @@
+# backend/live_buffer.py
+"""
+In-memory ring buffers of recent engagement points, one per live session.
+
+Filled from the ingestion path (_store_points) and read by
+/series/updates and /live/aggregates, so polling a live session doesn't
+hit the database for points written milliseconds earlier.
+
+Per session, parallel NumPy arrays:
+    t_us     int64    timestamp, epoch microseconds
+    score    float64
+    ear      float64  NaN = no EAR
+    student  int64    -1  = no student
+
+- Holds the last LIVE_BUFFER_WINDOW_SECONDS of points (and at most
+  LIVE_BUFFER_MAX_POINTS per session); older points are dropped
+- Arrays start small and double on demand, within LIVE_BUFFER_MEMORY_MB
+  across all sessions. Over budget, the least recently written session is
+  evicted; if nothing can be evicted the ring stops growing and drops its
+  oldest points instead
+- Opened when the session is created (complete from its start), otherwise
+  on the first ingested point (complete from that moment)
+- Evicted when the session ends
+
+A ring only answers a 'since' query when it is complete for that range:
+since >= floor, where floor is when the ring started or the newest point
+it has dropped. Anything older is served by the database.
+
+Process-local: a ring only holds the points ingested by its own API
+process, so it is only correct when a single process ingests and serves
+the reads. Off by default; enable with LIVE_BUFFER_ENABLED=true on a
+single-worker deployment. With WEB_CONCURRENCY > 1 (uvicorn --workers)
+it stays off regardless and every read goes to the database.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+# Other workers' points would be missing from this process's rings
+LIVE_BUFFER_ENABLED = (
+    os.getenv("LIVE_BUFFER_ENABLED", "false") == "true"
+    and int(os.getenv("WEB_CONCURRENCY", "1")) <= 1
+)
+LIVE_BUFFER_WINDOW_SECONDS = int(os.getenv("LIVE_BUFFER_WINDOW_SECONDS", "600"))
+LIVE_BUFFER_MAX_POINTS = int(os.getenv("LIVE_BUFFER_MAX_POINTS", "36000"))
+LIVE_BUFFER_MEMORY_MB = float(os.getenv("LIVE_BUFFER_MEMORY_MB", "64"))
+
+INITIAL_CAPACITY = 1024
+BYTES_PER_POINT = 4 * 8  # four 8-byte columns
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_US = timedelta(microseconds=1)
+
+
+# Integer arithmetic (not float seconds) so timestamps round-trip exactly
+def to_epoch_us(ts) -> int:
+    if isinstance(ts, str):
+        ts = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (ts - EPOCH) // ONE_US
+
+
+def from_epoch_us(t_us: int) -> datetime:
+    return EPOCH + timedelta(microseconds=t_us)
+
+
+class SessionRing:
+    """Fixed-capacity circular buffer of one session's points (not thread-safe; LiveBuffer locks)."""
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY, floor_us: int = None):
+        self.capacity = capacity
+        self.t_us = np.empty(capacity, dtype=np.int64)
+        self.score = np.empty(capacity, dtype=np.float64)
+        self.ear = np.empty(capacity, dtype=np.float64)
+        self.student = np.empty(capacity, dtype=np.int64)
+        self.start = 0  # index of the oldest point
+        self.size = 0
+        # Complete for timestamps > floor_us (default: from now on)
+        self.floor_us = floor_us if floor_us is not None else int(time.time() * 1_000_000)
+        self.last_write = time.monotonic()
+
+    @property
+    def nbytes(self) -> int:
+        return self.capacity * BYTES_PER_POINT
+
+    def _ordered(self, column):
+        end = self.start + self.size
+        if end <= self.capacity:
+            return column[self.start:end]
+        return np.concatenate((column[self.start:], column[:end - self.capacity]))
+
+    def resize(self, capacity: int):
+        columns = [self._ordered(c) for c in (self.t_us, self.score, self.ear, self.student)]
+        self.t_us, self.score, self.ear, self.student = (
+            np.empty(capacity, dtype=c.dtype) for c in columns
+        )
+        for dst, src in zip((self.t_us, self.score, self.ear, self.student), columns):
+            dst[:self.size] = src
+        self.capacity = capacity
+        self.start = 0
+
+    def _drop_oldest(self, n: int):
+        if n <= 0:
+            return
+        n = min(n, self.size)
+        idx = (self.start + np.arange(n)) % self.capacity
+        self.floor_us = max(self.floor_us, int(self.t_us[idx].max()))
+        self.start = (self.start + n) % self.capacity
+        self.size -= n
+
+    def append(self, t_us, score, ear, student):
+        n = len(t_us)
+        if n > self.capacity:
+            # Only the newest 'capacity' points fit
+            self._drop_oldest(self.size)
+            self.floor_us = max(self.floor_us, int(np.max(t_us[:n - self.capacity])))
+            t_us, score, ear, student = (a[n - self.capacity:] for a in (t_us, score, ear, student))
+            n = self.capacity
+
+        self._drop_oldest(self.size + n - self.capacity)
+
+        idx = (self.start + self.size + np.arange(n)) % self.capacity
+        self.t_us[idx] = t_us
+        self.score[idx] = score
+        self.ear[idx] = ear
+        self.student[idx] = student
+        self.size += n
+        self.last_write = time.monotonic()
+
+    def trim_window(self, window_us: int):
+        """Drop points older than the newest point minus the window (arrival ~ time order)."""
+        if not self.size:
+            return
+        t = self._ordered(self.t_us)
+        cutoff = int(t.max()) - window_us
+        old = np.flatnonzero(t >= cutoff)
+        self._drop_oldest(int(old[0]) if len(old) else self.size)
+
+    def snapshot(self):
+        """Ordered copies of (t_us, score, ear, student), sorted by timestamp."""
+        t = self._ordered(self.t_us)
+        order = np.argsort(t, kind="stable")
+        return (
+            t[order],
+            self._ordered(self.score)[order],
+            self._ordered(self.ear)[order],
+            self._ordered(self.student)[order],
+        )
+
+
+class LiveBuffer:
+    def __init__(
+        self,
+        window_seconds: int = LIVE_BUFFER_WINDOW_SECONDS,
+        max_points: int = LIVE_BUFFER_MAX_POINTS,
+        memory_mb: float = LIVE_BUFFER_MEMORY_MB,
+    ):
+        self.window_us = window_seconds * 1_000_000
+        self.max_points = max_points
+        self.budget_bytes = int(memory_mb * 1024 * 1024)
+        self._rings: dict[int, SessionRing] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _used_bytes(self) -> int:
+        return sum(r.nbytes for r in self._rings.values())
+
+    def _reserve(self, extra_bytes: int, keep: int) -> bool:
+        """Make room for extra_bytes, evicting least recently written sessions (never 'keep')."""
+        while self._used_bytes() + extra_bytes > self.budget_bytes:
+            candidates = [(r.last_write, sid) for sid, r in self._rings.items() if sid != keep]
+            if not candidates:
+                return False
+            _, victim = min(candidates)
+            del self._rings[victim]
+            self.evictions += 1
+        return True
+
+    # ---------- write side ----------
+
+    def open(self, session_id: int, started_at: datetime):
+        """
+        Start a ring for a new session. It is complete from started_at,
+        so /series/updates can be served from memory from the first poll.
+        """
+        with self._lock:
+            if session_id in self._rings:
+                return
+            if self._reserve(INITIAL_CAPACITY * BYTES_PER_POINT, keep=session_id):
+                self._rings[session_id] = SessionRing(floor_us=to_epoch_us(started_at) - 1)
+
+    def append(self, rows: list[dict]):
+        """Add accepted point rows (dicts with session_id/timestamp/score/ear/student_id)."""
+        by_session = {}
+        for row in rows:
+            by_session.setdefault(row["session_id"], []).append(row)
+
+        with self._lock:
+            for session_id, items in by_session.items():
+                n = len(items)
+                t_us = np.fromiter((to_epoch_us(r["timestamp"]) for r in items), dtype=np.int64, count=n)
+                score = np.fromiter((r["score"] for r in items), dtype=np.float64, count=n)
+                ear = np.fromiter(
+                    (np.nan if r.get("ear") is None else r["ear"] for r in items), dtype=np.float64, count=n
+                )
+                student = np.fromiter(
+                    (-1 if r.get("student_id") is None else r["student_id"] for r in items), dtype=np.int64, count=n
+                )
+
+                ring = self._rings.get(session_id)
+                if ring is None:
+                    if not self._reserve(INITIAL_CAPACITY * BYTES_PER_POINT, keep=session_id):
+                        continue
+                    ring = self._rings[session_id] = SessionRing()
+
+                # Grow by doubling while needed, within the per-session cap and the global budget
+                needed = min(ring.size + n, self.max_points)
+                while ring.capacity < needed:
+                    new_capacity = min(ring.capacity * 2, self.max_points)
+                    if not self._reserve((new_capacity - ring.capacity) * BYTES_PER_POINT, keep=session_id):
+                        break
+                    ring.resize(new_capacity)
+
+                ring.append(t_us, score, ear, student)
+                ring.trim_window(self.window_us)
+
+    def drop(self, session_id: int):
+        """Session ended/deleted: free its ring."""
+        with self._lock:
+            self._rings.pop(session_id, None)
+
+    # ---------- read side ----------
+
+    def read_since(self, session_id: int, since: datetime, student_id: int = None):
+        """
+        Points with timestamp > since, sorted, as (t_us, score, ear, student) arrays.
+
+        Returns None when the ring can't answer completely (no ring, or
+        since is older than what the ring is guaranteed to hold).
+        """
+        since_us = to_epoch_us(since)
+        with self._lock:
+            ring = self._rings.get(session_id)
+            if ring is None or since_us < ring.floor_us:
+                return None
+            t, score, ear, student = ring.snapshot()
+
+        mask = t > since_us
+        if student_id is not None:
+            mask &= student == student_id
+        return t[mask], score[mask], ear[mask], student[mask]
+
+    def aggregates(self, session_id: int, window_seconds: float):
+        """count/mean/min/max/std of score (and mean EAR) over the last window_seconds, or None."""
+        with self._lock:
+            ring = self._rings.get(session_id)
+            if ring is None:
+                return None
+            t, score, ear, _ = ring.snapshot()
+
+        now_us = int(time.time() * 1_000_000)
+        mask = t >= now_us - int(window_seconds * 1_000_000)
+        s = score[mask]
+        e = ear[mask]
+        e = e[~np.isnan(e)]
+
+        return {
+            "session_id": session_id,
+            "window_seconds": window_seconds,
+            "count": int(s.size),
+            "avg_score": round(float(s.mean()), 4) if s.size else None,
+            "min_score": round(float(s.min()), 4) if s.size else None,
+            "max_score": round(float(s.max()), 4) if s.size else None,
+            "std_score": round(float(s.std()), 4) if s.size else None,
+            "avg_ear": round(float(e.mean()), 4) if e.size else None,
+            "latest_at": from_epoch_us(int(t[-1])).isoformat() if t.size else None,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": LIVE_BUFFER_ENABLED,
+                "sessions": len(self._rings),
+                "points": sum(r.size for r in self._rings.values()),
+                "memory_bytes": self._used_bytes(),
+                "memory_budget_bytes": self.budget_bytes,
+                "evictions": self.evictions,
+            }
+
+
+def points_from_arrays(t_us, score, ear, student) -> list[dict]:
+    """PointOut-shaped dicts from ring arrays."""
+    return [
+        {
+            "timestamp": from_epoch_us(int(t)).isoformat(),
+            "score": float(s),
+            "ear": None if np.isnan(e) else float(e),
+            "student_id": None if st < 0 else int(st),
+        }
+        for t, s, e, st in zip(t_us, score, ear, student)
+    ]
+
+
+# Global instance (one per API process)
+live_buffer = LiveBuffer()
@@ -0,0 +1,194 @@
+# backend/live_feed.py
+"""
+Server-Sent Events fan-out of freshly ingested engagement points.
+
+Ingestion endpoints call live_feed.publish(rows) once points are accepted;
+each connected teacher graph (GET /sessions/{id}/live) receives them
+within milliseconds instead of polling /series/updates every 2s.
+
+- Every publish for a session gets the next sequence number (the SSE id)
+- The last LIVE_FEED_BACKLOG_EVENTS events per session are kept, so a
+  reconnecting client (Last-Event-ID / ?cursor=) resumes without a gap
+- If the cursor is older than the backlog (or from before a restart),
+  the client gets a 'reset' event and re-syncs via /series/updates
+- Idle subscribers cost one keepalive comment every LIVE_FEED_KEEPALIVE_SECONDS
+- 'end' always reaches the subscriber, even when its queue is full
+
+Process-local: a subscriber only sees points ingested by the same API
+process. With WEB_CONCURRENCY > 1 (uvicorn --workers) the feed is off
+and /live answers 503, so clients poll /series/updates instead of
+silently missing the points other workers take.
+"""
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+from live_buffer import to_epoch_us
+
+# Other workers' points would never reach this process's subscribers
+LIVE_FEED_ENABLED = (
+    os.getenv("LIVE_FEED_ENABLED", "true") == "true"
+    and int(os.getenv("WEB_CONCURRENCY", "1")) <= 1
+)
+LIVE_FEED_BACKLOG_EVENTS = int(os.getenv("LIVE_FEED_BACKLOG_EVENTS", "1000"))
+LIVE_FEED_KEEPALIVE_SECONDS = float(os.getenv("LIVE_FEED_KEEPALIVE_SECONDS", "15"))
+LIVE_FEED_SUBSCRIBER_QUEUE = int(os.getenv("LIVE_FEED_SUBSCRIBER_QUEUE", "1000"))
+
+# Control messages placed on a subscriber queue
+END = "end"          # session ended
+OVERFLOW = "overflow"  # subscriber too slow, events were dropped
+
+
+def point_to_dict(row) -> dict:
+    ts = row["timestamp"]
+    return {
+        "timestamp": ts.isoformat() if isinstance(ts, datetime) else ts,
+        "score": row["score"],
+        "ear": row.get("ear"),
+        "student_id": row.get("student_id"),
+    }
+
+
+def point_key(point: dict) -> tuple:
+    """Identity of a point across the DB backfill and feed events."""
+    return to_epoch_us(point["timestamp"]), point.get("student_id"), point["score"]
+
+
+def unseen_points(data: str, seen: set, since_us: int) -> dict:
+    """
+    Event payload without the points a ?since= client already has: those
+    at/before 'since' or already sent by the database backfill.
+    """
+    event = json.loads(data)
+    event["points"] = [
+        p for p in event["points"]
+        if (key := point_key(p))[0] > since_us and key not in seen
+    ]
+    return event
+
+
+def format_sse(event: str, data, event_id=None) -> str:
+    """One SSE frame. data is JSON-encoded unless it's already a string."""
+    payload = data if isinstance(data, str) else json.dumps(data)
+    frame = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{frame}event: {event}\ndata: {payload}\n\n"
+
+
+class Subscriber:
+    __slots__ = ("session_id", "queue")
+
+    def __init__(self, session_id: int):
+        self.session_id = session_id
+        self.queue = asyncio.Queue(maxsize=LIVE_FEED_SUBSCRIBER_QUEUE)
+
+    def offer(self, item):
+        """Runs on the event loop."""
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            if item == END:
+                # Undelivered points don't matter once the session is over
+                while not self.queue.empty():
+                    self.queue.get_nowait()
+                self.queue.put_nowait(END)
+                return
+            # Make room for the overflow marker; the client re-syncs anyway
+            self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+
+class LiveFeed:
+    def __init__(self, backlog_events: int = LIVE_FEED_BACKLOG_EVENTS):
+        self.backlog_events = backlog_events
+        self._lock = threading.Lock()
+        self._seq: dict[int, int] = {}
+        self._backlog: dict[int, deque] = {}
+        self._subscribers: dict[int, set] = {}
+        self._loop = None
+
+    # ---------- producer side (any thread) ----------
+
+    def publish(self, rows: list[dict]):
+        """Record accepted point rows and push them to the session's subscribers."""
+        by_session = {}
+        for row in rows:
+            by_session.setdefault(row["session_id"], []).append(point_to_dict(row))
+
+        for session_id, points in by_session.items():
+            with self._lock:
+                seq = self._seq.get(session_id, 0) + 1
+                self._seq[session_id] = seq
+                event = (seq, json.dumps({"seq": seq, "points": points}))
+                self._backlog.setdefault(
+                    session_id, deque(maxlen=self.backlog_events)
+                ).append(event)
+                subscribers = list(self._subscribers.get(session_id, ()))
+
+            self._deliver(subscribers, event)
+
+    def close_session(self, session_id: int):
+        """Session ended/deleted: tell subscribers and drop the backlog."""
+        with self._lock:
+            self._seq.pop(session_id, None)
+            self._backlog.pop(session_id, None)
+            subscribers = list(self._subscribers.get(session_id, ()))
+        self._deliver(subscribers, END)
+
+    def _deliver(self, subscribers, item):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        for sub in subscribers:
+            loop.call_soon_threadsafe(sub.offer, item)
+
+    # ---------- consumer side (event loop) ----------
+
+    def subscribe(self, session_id: int, cursor: int = None, replay_all: bool = False):
+        """
+        Register a subscriber. Must be called from the event loop.
+
+        Returns (subscriber, replay, last_seq):
+        - replay: backlog events after cursor (all of them with replay_all),
+          or None when the cursor can't be resumed (client must re-sync)
+        - Registration and replay happen under one lock, so no event falls
+          between the replay and the live stream
+        """
+        self._loop = asyncio.get_running_loop()
+        sub = Subscriber(session_id)
+
+        with self._lock:
+            last_seq = self._seq.get(session_id, 0)
+            backlog = list(self._backlog.get(session_id, ()))
+            self._subscribers.setdefault(session_id, set()).add(sub)
+
+        if cursor is None:
+            replay = backlog if replay_all else []
+        else:
+            oldest = backlog[0][0] if backlog else last_seq + 1
+            if cursor > last_seq or cursor < oldest - 1:
+                replay = None
+            else:
+                replay = [event for event in backlog if event[0] > cursor]
+
+        return sub, replay, last_seq
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            subs = self._subscribers.get(sub.session_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.session_id]
+
+    def subscriber_count(self, session_id: int = None) -> int:
+        with self._lock:
+            if session_id is not None:
+                return len(self._subscribers.get(session_id, ()))
+            return sum(len(s) for s in self._subscribers.values())
+
+
+# Global instance (one per API process)
+live_feed = LiveFeed()
@@ -0,0 +1,241 @@
+# backend/live_stats.py
+"""
+Incremental class-wide statistics of a live session over sliding windows.
+
+"How is the class doing right now": per window (LIVE_STATS_WINDOWS,
+default 10s / 60s / 5min) of a live session
+    count, mean score, p10 / p50 / p90, fraction of readings below
+    LIVE_STATS_LOW_THRESHOLD, active devices (distinct students, plus
+    distinct cameras for points without a student)
+
+Maintained as points are ingested (_store_points), so reading never
+touches stored points:
+- A ring of per-second slots (as many as the largest window), each with
+  count / score sum / below-threshold count / score histogram
+- Per window, running totals of the same. A new point is added to its
+  slot and to every window's totals: O(number of windows) per point
+- When the clock moves on, the seconds leaving each window are
+  subtracted once - cost per elapsed second, not per point
+- Percentiles come from the histogram (LIVE_STATS_BINS bins over 0..1,
+  linear within a bin: error < 1 / LIVE_STATS_BINS)
+- Active devices: last-seen second per student, or per camera (device
+  key hash + client address) for anonymous points
+
+Windows are in arrival time (server clock), not client timestamps, so
+skewed or replayed timestamps can't stretch a window.
+
+Process-local, like live_buffer: only points ingested by this API
+process are counted, so with WEB_CONCURRENCY > 1 (uvicorn --workers) it
+stays off regardless and /live/stats answers 503 - /live/analytics
+merges every worker's share instead.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+LIVE_STATS_ENABLED = (
+    os.getenv("LIVE_STATS_ENABLED", "true") == "true"
+    and int(os.getenv("WEB_CONCURRENCY", "1")) <= 1
+)
+LIVE_STATS_WINDOWS = tuple(
+    int(w) for w in os.getenv("LIVE_STATS_WINDOWS", "10,60,300").split(",") if w.strip()
+)
+LIVE_STATS_BINS = int(os.getenv("LIVE_STATS_BINS", "100"))
+LIVE_STATS_LOW_THRESHOLD = float(os.getenv("LIVE_STATS_LOW_THRESHOLD", "0.33"))
+LIVE_STATS_PUSH_SECONDS = float(os.getenv("LIVE_STATS_PUSH_SECONDS", "2"))
+
+PERCENTILES = (10, 50, 90)
+
+
+def _now_sec() -> int:
+    # Monotonic: wall-clock jumps must not expire or freeze a window
+    return int(time.monotonic())
+
+
+class SessionStats:
+    """Slots and running window totals of one session (not thread-safe; LiveStats locks)."""
+
+    def __init__(self, windows=LIVE_STATS_WINDOWS, bins: int = LIVE_STATS_BINS, now: int = None):
+        self.windows = np.asarray(sorted(windows), dtype=np.int64)
+        self.span = int(self.windows[-1])
+        self.bins = bins
+
+        # Per-second slots, slot index = second % span
+        self.slot_sec = np.full(self.span, -1, dtype=np.int64)
+        self.slot_count = np.zeros(self.span, dtype=np.int64)
+        self.slot_sum = np.zeros(self.span, dtype=np.float64)
+        self.slot_below = np.zeros(self.span, dtype=np.int64)
+        self.slot_hist = np.zeros((self.span, bins), dtype=np.int64)
+
+        # Running totals, one row per window
+        n = len(self.windows)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.total = np.zeros(n, dtype=np.float64)
+        self.below = np.zeros(n, dtype=np.int64)
+        self.hist = np.zeros((n, bins), dtype=np.int64)
+
+        self.now = _now_sec() if now is None else now
+        self.last_seen: dict = {}
+
+    def _reset(self):
+        self.slot_sec[:] = -1
+        self.slot_count[:] = 0
+        self.slot_sum[:] = 0.0
+        self.slot_below[:] = 0
+        self.slot_hist[:] = 0
+        self.count[:] = 0
+        self.total[:] = 0.0
+        self.below[:] = 0
+        self.hist[:] = 0
+
+    def advance(self, now: int):
+        """Move the clock to 'now', subtracting the seconds that leave each window."""
+        if now <= self.now:
+            return
+        if now - self.now >= self.span:
+            # Everything has left even the largest window
+            self._reset()
+        else:
+            for i, window in enumerate(self.windows):
+                # Window i covered (self.now - window, self.now]; it now covers (now - window, now]
+                for sec in range(self.now - window + 1, now - window + 1):
+                    idx = sec % self.span
+                    if self.slot_sec[idx] == sec:
+                        self.count[i] -= self.slot_count[idx]
+                        self.total[i] -= self.slot_sum[idx]
+                        self.below[i] -= self.slot_below[idx]
+                        self.hist[i] -= self.slot_hist[idx]
+        self.now = now
+
+    def add(self, scores: np.ndarray, devices, now: int, low_threshold: float = LIVE_STATS_LOW_THRESHOLD):
+        """Add points that arrived during second 'now'."""
+        self.advance(now)
+
+        idx = now % self.span
+        if self.slot_sec[idx] != now:
+            # Slot last held now - span: already outside every window
+            self.slot_sec[idx] = now
+            self.slot_count[idx] = 0
+            self.slot_sum[idx] = 0.0
+            self.slot_below[idx] = 0
+            self.slot_hist[idx] = 0
+
+        n = len(scores)
+        total = float(scores.sum())
+        below = int(np.count_nonzero(scores < low_threshold))
+        binned = np.bincount(
+            np.clip((scores * self.bins).astype(np.int64), 0, self.bins - 1), minlength=self.bins
+        )
+
+        self.slot_count[idx] += n
+        self.slot_sum[idx] += total
+        self.slot_below[idx] += below
+        self.slot_hist[idx] += binned
+
+        # A point of the current second is inside every window
+        self.count += n
+        self.total += total
+        self.below += below
+        self.hist += binned
+
+        for device in devices:
+            self.last_seen[device] = now
+
+    def _percentile(self, hist: np.ndarray, count: int, p: float) -> float:
+        target = count * p / 100
+        cumulative = np.cumsum(hist)
+        b = int(np.searchsorted(cumulative, target, side="left"))
+        b = min(b, self.bins - 1)
+        before = cumulative[b - 1] if b > 0 else 0
+        inside = hist[b]
+        fraction = (target - before) / inside if inside else 0.0
+        return float((b + fraction) / self.bins)
+
+    def snapshot(self, now: int) -> list[dict]:
+        self.advance(now)
+
+        # Forget devices older than the largest window
+        stale = [d for d, sec in self.last_seen.items() if sec <= now - self.span]
+        for d in stale:
+            del self.last_seen[d]
+        seen = np.fromiter(self.last_seen.values(), dtype=np.int64, count=len(self.last_seen))
+
+        result = []
+        for i, window in enumerate(self.windows):
+            count = int(self.count[i])
+            entry = {
+                "window_seconds": int(window),
+                "count": count,
+                "mean": round(float(self.total[i] / count), 4) if count else None,
+                "below_threshold_fraction": round(float(self.below[i] / count), 4) if count else None,
+                "active_devices": int(np.count_nonzero(seen > now - window)),
+            }
+            for p in PERCENTILES:
+                entry[f"p{p}"] = round(self._percentile(self.hist[i], count, p), 4) if count else None
+            result.append(entry)
+        return result
+
+
+class LiveStats:
+    def __init__(self, windows=LIVE_STATS_WINDOWS, bins: int = LIVE_STATS_BINS):
+        self.windows = windows
+        self.bins = bins
+        self._sessions: dict[int, SessionStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, rows: list[dict], device: str = None):
+        """
+        Add accepted point rows (dicts with session_id/score/student_id).
+
+        device identifies the uploading camera; rows without a student_id
+        count as that device rather than as one shared anonymous student.
+        """
+        by_session = {}
+        for row in rows:
+            by_session.setdefault(row["session_id"], []).append(row)
+
+        now = _now_sec()
+        with self._lock:
+            for session_id, items in by_session.items():
+                stats = self._sessions.get(session_id)
+                if stats is None:
+                    stats = self._sessions[session_id] = SessionStats(self.windows, self.bins, now)
+                scores = np.fromiter((r["score"] for r in items), dtype=np.float64, count=len(items))
+                devices = {
+                    ("student", r["student_id"]) if r.get("student_id") is not None else ("device", device)
+                    for r in items
+                }
+                stats.add(scores, devices, now)
+
+    def snapshot(self, session_id: int) -> dict:
+        now = _now_sec()
+        with self._lock:
+            stats = self._sessions.get(session_id)
+            windows = stats.snapshot(now) if stats is not None else [
+                {
+                    "window_seconds": int(w), "count": 0, "mean": None,
+                    "below_threshold_fraction": None, "active_devices": 0,
+                    **{f"p{p}": None for p in PERCENTILES},
+                }
+                for w in sorted(self.windows)
+            ]
+        return {
+            "session_id": session_id,
+            "low_threshold": LIVE_STATS_LOW_THRESHOLD,
+            "windows": windows,
+        }
+
+    def drop(self, session_id: int):
+        """Session ended/deleted."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"sessions": len(self._sessions), "windows": list(self.windows)}
+
+
+# Global instance (one per API process)
+live_stats = LiveStats()
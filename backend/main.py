@@ -6,7 +6,7 @@ from database import Base, engine
 from rag.rag_chatbot_lm import answer_question
 from auth import router as auth_router, get_current_user
 from notes import router as notes_router
-from engagement import router as engagement_router
+from engagement import router as engagement_router, ml_liveness_loop
 from rag_api import router as rag_api_router
 from models import User, EngagementSession, EngagementPoint
 from models import Base
@@ -15,22 +15,30 @@ from threading import Thread
 import time
 from datetime import datetime, timedelta,timezone
 from database import SessionLocal
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 from dotenv import load_dotenv
 import os 
 from video_sessions import router as video_router
 from attendance import router as attendance_router
+from ingest_queue import ingest_queue, INGEST_WRITE_BEHIND
+from session_registry import session_registry
+from heartbeats import heartbeat_tracker
+from session_watchdog import session_watchdog
+from analytics_accumulator import analytics_accumulator, ANALYTICS_ACCUMULATOR_ENABLED
+from device_auth import device_audit
+from engagement_partitions import (
+    prepare_engagement_storage,
+    run_partition_maintenance,
+    ENGAGEMENT_PARTITION_CHECK_HOURS,
+)
 
 # ✅ NEW: Import analytics modules
-from analytics import get_comprehensive_analytics, generate_summary_report
+from analytics import generate_summary_report
 from reports import create_report_package, export_to_whatsapp_format
+from engagement_series import fetch_series
 
 load_dotenv()  # Load from .env file
 
 app = FastAPI()
-limiter = Limiter(key_func=get_remote_address)
-app.state.limiter = limiter
 
 # ---- CORS (frontend dev: Vite on 5173) ----
 ALLOWED_ORIGINS = os.getenv(
@@ -42,6 +50,8 @@ app.add_middleware(
     allow_origins=ALLOWED_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset cursor of paginated /series responses
+    expose_headers=["X-Next-After-Ts", "X-Next-After-Id", "ETag"],
 )
 
 
@@ -90,37 +100,74 @@ def chat(
     return ChatResponse(answer=ans)
 
 @app.on_event("startup")
-def start_watchdog():
-    Thread(target=session_watchdog, daemon=True).start()
+def warm_session_registry():
+    db = SessionLocal()
+    try:
+        count = session_registry.warm(db)
+        print(f"🗂️  Session registry warmed with {count} active sessions")
+    except Exception as e:
+        print(f"⚠️ Session registry warmup failed: {e}")
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+def start_ingest_flusher():
+    if INGEST_WRITE_BEHIND:
+        ingest_queue.start()
+    device_audit.start()
+    heartbeat_tracker.start()
+
 
-def session_watchdog():
+@app.on_event("shutdown")
+def stop_ingest_flusher():
+    # Flush-on-shutdown: queued points and audit counters must not be lost on redeploy
+    if INGEST_WRITE_BEHIND:
+        ingest_queue.stop()
+    device_audit.stop()
+    heartbeat_tracker.stop()
+
+@app.on_event("startup")
+def start_partition_maintenance():
+    Thread(target=partition_maintenance, daemon=True).start()
+
+def partition_maintenance():
+    # Startup run happens in prepare_engagement_storage; this keeps partitions ahead of time
     while True:
-        db = SessionLocal()
+        time.sleep(ENGAGEMENT_PARTITION_CHECK_HOURS * 3600)
         try:
-            now = datetime.now(timezone.utc)
-            timeout = timedelta(seconds=30)
+            run_partition_maintenance(engine)
+        except Exception as e:
+            print(f"❌ Partition maintenance error: {e}")
 
-            sessions = db.query(EngagementSession).filter(
-                EngagementSession.ended_at.is_(None)
-            ).all()
+@app.on_event("startup")
+def start_ml_liveness():
+    # Keeps this worker's ML registry entries fresh for the other hosts
+    Thread(target=ml_liveness_loop, daemon=True).start()
 
-            for s in sessions:
-                if s.last_seen_at and now - s.last_seen_at > timeout:
-                    s.ended_at = now
-                    print(f"🔒 Auto-ended inactive session {s.id}")
 
-            db.commit()
-        except Exception as e:
-            print(f"❌ Watchdog error: {e}")
-        finally:
-            db.close()
+@app.on_event("startup")
+def start_watchdog():
+    session_watchdog.start()
 
-        time.sleep(60)
 
+@app.on_event("shutdown")
+def stop_watchdog():
+    session_watchdog.stop()
 
 
+@app.on_event("startup")
+def start_analytics_checkpoints():
+    if ANALYTICS_ACCUMULATOR_ENABLED:
+        analytics_accumulator.start()
 
 
+@app.on_event("shutdown")
+def stop_analytics_checkpoints():
+    # Last checkpoint: live sessions keep their online analytics across a redeploy
+    if ANALYTICS_ACCUMULATOR_ENABLED:
+        analytics_accumulator.stop()
+
 
 # ====== ✅ NEW: BACKGROUND JOB FOR REPORT GENERATION ======
 def generate_session_report(session_id: int):
@@ -157,28 +204,18 @@ def generate_session_report(session_id: int):
             print(f"⚠️ Session {session_id} is still active, skipping report")
             return
         
-        # Fetch all engagement points
-        points = db.query(EngagementPoint).filter(
-            EngagementPoint.session_id == session_id
-        ).order_by(EngagementPoint.timestamp.asc()).all()
+        # Fetch all engagement points as epoch-ms arrays
+        # Only covered columns -> index-only scan on idx_engagement_points_session_ts
+        series = fetch_series(db, session_id)
         
-        if not points:
+        if not len(series):
             print(f"⚠️ No engagement data for session {session_id}")
             return
         
-        # Convert to dict format for analytics
-        points_data = [
-            {
-                'timestamp': p.timestamp.isoformat(), 
-                'score': p.score
-            }
-            for p in points
-        ]
-        
-        print(f"📈 Computing analytics from {len(points_data)} points")
+        print(f"📈 Computing analytics from {len(series)} points")
         
-        # ✅ Run analytics engine (uses BOTH old and new analytics)
-        analytics = get_comprehensive_analytics(points_data)
+        # ✅ Run analytics engine (online analytics from ingest when complete)
+        analytics = analytics_accumulator.session_analytics(db, session, series)
         
         # ✅ Generate reports and graphs
         report_package = create_report_package(analytics)
@@ -280,6 +317,7 @@ app.include_router(engagement_router)    # /api/engagement/...
 app.include_router(video_router)         # /api/video/...
 app.include_router(rag_api_router)       # /api/rag/...
 app.include_router(attendance_router)    # /api/attendance/...
+prepare_engagement_storage(engine)       # Postgres: partitioned engagement_points
 Base.metadata.create_all(bind=engine)
 
 # ✅ NOTE: Analytics router will be added separately as analytics_router.py
@@ -1,6 +1,6 @@
 from sqlalchemy import (
     Column, Integer, String, DateTime,
-    ForeignKey, Float, Boolean,
+    ForeignKey, Float, Boolean, Text,
     UniqueConstraint, Index
 )
 from sqlalchemy.sql import func
@@ -68,16 +68,25 @@ class EngagementSession(Base):
     disable_student_cameras = Column(Boolean, default=False)
     is_deleted = Column(Boolean, default=False)
 
+    # Point count frozen when the session ends (ETag input, see http_cache)
+    total_points = Column(Integer, nullable=True)
+
 
 class EngagementPoint(Base):
+    """
+    On PostgreSQL this table is partitioned by month on timestamp and is
+    created by engagement_partitions.prepare_engagement_storage (primary
+    key (id, timestamp)). Keep both definitions in sync.
+    """
     __tablename__ = "engagement_points"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # No secondary indexes on id/session_id: the PK and the composite
+    # (session_id, timestamp) index below already serve those lookups
+    id = Column(Integer, primary_key=True)
     session_id = Column(
         Integer,
         ForeignKey("engagement_sessions.id", ondelete="CASCADE"),
-        nullable=False,
-        index=True
+        nullable=False
     )
 
     timestamp = Column(
@@ -89,12 +98,81 @@ class EngagementPoint(Base):
     score = Column(Float, nullable=False)
     ear = Column(Float, nullable=True)
 
+    # Student the point belongs to (NULL for camera uploads without --student-id)
+    student_id = Column(
+        Integer,
+        ForeignKey("users.id", ondelete="SET NULL"),
+        nullable=True
+    )
+
     __table_args__ = (
-        Index("idx_engagement_points_session", "session_id"),
-        Index("idx_engagement_points_timestamp", "timestamp"),
+        # Every series read is "WHERE session_id = ? ORDER BY timestamp".
+        # INCLUDE makes it covering on Postgres (index-only scan, no heap fetch).
+        Index(
+            "idx_engagement_points_session_ts",
+            "session_id",
+            "timestamp",
+            postgresql_include=["score", "ear", "student_id"],
+        ),
+        # Per-student series: index range scan instead of a whole-session read
+        Index("idx_engagement_points_session_student_ts", "session_id", "student_id", "timestamp"),
     )
 
 
+class EngagementRollup(Base):
+    """
+    Pre-aggregated engagement buckets per session (1s / 10s / 60s).
+
+    Maintained incrementally by engagement_rollups.update_rollups in the
+    same transaction as the raw point writes. Mean/std are derived from
+    count, sum and sum of squares. EAR is optional per point, so it keeps
+    its own count.
+    """
+    __tablename__ = "engagement_rollups"
+
+    session_id = Column(
+        Integer,
+        ForeignKey("engagement_sessions.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    resolution_s = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+
+    count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    score_sumsq = Column(Float, nullable=False, default=0.0)
+    score_min = Column(Float, nullable=True)
+    score_max = Column(Float, nullable=True)
+
+    ear_count = Column(Integer, nullable=False, default=0)
+    ear_sum = Column(Float, nullable=False, default=0.0)
+    ear_sumsq = Column(Float, nullable=False, default=0.0)
+    ear_min = Column(Float, nullable=True)
+    ear_max = Column(Float, nullable=True)
+
+
+class EngagementAnalyticsState(Base):
+    """
+    Checkpointed online analytics of a session (analytics_accumulator).
+
+    One row per session and API process: accumulators live in the process
+    that ingested the points, readers merge the rows. state is the
+    accumulator as JSON.
+    """
+    __tablename__ = "engagement_analytics"
+
+    session_id = Column(
+        Integer,
+        ForeignKey("engagement_sessions.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    worker = Column(String(255), primary_key=True)
+
+    point_count = Column(Integer, nullable=False, default=0)
+    state = Column(Text, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+
 # ==================== QUESTION PAPERS ====================
 
 class QuestionPaper(Base):
@@ -139,6 +217,13 @@ class DeviceLog(Base):
     client_ip = Column(String(50))
     status = Column(String(50), nullable=False)
 
+    # Aggregated audit row: one per (device, session, status), upserted by
+    # device_auth.DeviceAuditAggregator. `timestamp` is the last time seen.
+    first_seen_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now()
+    )
+
     timestamp = Column(
         DateTime(timezone=True),
         server_default=func.now(),
@@ -147,9 +232,10 @@ class DeviceLog(Base):
 
     details = Column(String)
     points_uploaded = Column(Integer, default=0)
+    request_count = Column(Integer, default=0)
 
     __table_args__ = (
-        UniqueConstraint('device_key_hash', 'session_id', name='uq_device_session'),
+        UniqueConstraint('device_key_hash', 'session_id', 'status', name='uq_device_session_status'),
         Index("idx_device_logs_device_key_hash", "device_key_hash"),
         Index("idx_device_logs_session_id", "session_id"),
     )
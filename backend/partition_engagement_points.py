@@ -0,0 +1,102 @@
+# backend/partition_engagement_points.py
+"""
+Convert an existing (unpartitioned) engagement_points table into the
+monthly partitioned layout from engagement_partitions.py.
+
+PostgreSQL only - SQLite keeps the single table.
+
+Steps (one transaction, so ingestion should be paused or the
+write-behind queue left to buffer during the copy):
+1. Rename the old table, its sequence, PK and indexes out of the way
+2. Create the partitioned parent + DEFAULT partition
+3. Create one partition per month present in the old data, plus the
+   months ahead
+4. Copy rows, keep their ids, move the id sequence past max(id)
+5. Drop the old table
+
+Run once against the configured DATABASE_URL:
+    python partition_engagement_points.py
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from database import engine
+from engagement_partitions import (
+    POINTS_TABLE,
+    ENGAGEMENT_PARTITION_MONTHS_AHEAD,
+    add_months,
+    create_partitioned_table,
+    ensure_partitions,
+    is_partitioned,
+    month_start,
+)
+
+OLD_TABLE = f"{POINTS_TABLE}_unpartitioned"
+
+OLD_INDEXES = [
+    "ix_engagement_points_id",
+    "ix_engagement_points_session_id",
+    "idx_engagement_points_session",
+    "idx_engagement_points_timestamp",
+    "idx_engagement_points_session_ts",
+    "idx_engagement_points_session_student_ts",
+]
+
+RENAME_COMMANDS = [
+    f"ALTER TABLE {POINTS_TABLE} RENAME TO {OLD_TABLE}",
+    f"ALTER SEQUENCE IF EXISTS {POINTS_TABLE}_id_seq RENAME TO {OLD_TABLE}_id_seq",
+    f"ALTER TABLE {OLD_TABLE} RENAME CONSTRAINT {POINTS_TABLE}_pkey TO {OLD_TABLE}_pkey",
+    *[f"DROP INDEX IF EXISTS {name}" for name in OLD_INDEXES],
+]
+
+COPY_COMMANDS = [
+    f"""
+    INSERT INTO {POINTS_TABLE} (id, session_id, timestamp, score, ear, student_id)
+    SELECT id, session_id, timestamp, score, ear, student_id FROM {OLD_TABLE}
+    """,
+    f"SELECT setval(pg_get_serial_sequence('{POINTS_TABLE}', 'id'), COALESCE((SELECT max(id) FROM {POINTS_TABLE}), 0) + 1, false)",
+    f"DROP TABLE {OLD_TABLE}",
+]
+
+
+def update_database():
+    try:
+        if engine.dialect.name != "postgresql":
+            print(f"✅ {engine.dialect.name}: partitioning not supported, single table kept")
+            return
+
+        print(f"📊 Partitioning {POINTS_TABLE}")
+        print("=" * 50)
+
+        with engine.begin() as conn:
+            if is_partitioned(conn):
+                print("✅ Already partitioned, nothing to do")
+                return
+
+            for sql in RENAME_COMMANDS:
+                conn.execute(text(sql))
+                print(f"✅ {' '.join(sql.split())[:70]}...")
+
+            create_partitioned_table(conn)
+            print("✅ Created partitioned parent + DEFAULT partition")
+
+            oldest = conn.execute(text(f"SELECT min(timestamp) FROM {OLD_TABLE}")).scalar()
+            current = month_start(datetime.now(timezone.utc))
+            first = month_start(oldest) if oldest else current
+            created = ensure_partitions(conn, min(first, current), add_months(current, ENGAGEMENT_PARTITION_MONTHS_AHEAD))
+            print(f"✅ Created {len(created)} monthly partitions ({created[0] if created else '-'} .. {created[-1] if created else '-'})")
+
+            for sql in COPY_COMMANDS:
+                result = conn.execute(text(sql))
+                print(f"✅ {' '.join(sql.split())[:70]}... ({result.rowcount} rows)")
+
+        print("=" * 50)
+        print("✅ Database update complete! Run VACUUM ANALYZE engagement_points next.")
+
+    except Exception as e:
+        print(f"❌ Error updating database: {e}")
+
+
+if __name__ == "__main__":
+    update_database()
@@ -7,28 +7,52 @@ from matplotlib.figure import Figure
 import io
 import base64
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Union
 import numpy as np
 
+from downsample import downsample_indices
+from engagement_series import EngagementSeries
 
-def generate_engagement_graph(points_data: List[Dict]) -> Optional[str]:
+# 12in x 100dpi figure: more points than this can't be told apart
+REPORT_GRAPH_MAX_POINTS = 1200
+
+
+def generate_engagement_graph(points_data: Union[List[Dict], EngagementSeries]) -> Optional[str]:
     """
     Generate engagement vs time graph (PNG -> base64).
     
     Args:
-        points_data: List of {timestamp, score} dicts
+        points_data: List of {timestamp, score} dicts, or an EngagementSeries
     
     Returns:
         Base64 encoded PNG image string, or None if failed
     """
     
-    if not points_data:
+    if not len(points_data):
         return None
     
     try:
-        # Parse timestamps
-        times = [datetime.fromisoformat(p['timestamp']) for p in points_data]
-        scores = [p['score'] for p in points_data]
+        if isinstance(points_data, EngagementSeries):
+            # Epoch ms -> datetime64: matplotlib plots it directly, nothing to parse
+            times = points_data.t_ms.astype('datetime64[ms]')
+            scores = points_data.score
+        else:
+            # Parse timestamps
+            times = [datetime.fromisoformat(p['timestamp']) for p in points_data]
+            scores = [p['score'] for p in points_data]
+        
+        # Average over every point, before downsampling
+        avg = np.mean(scores)
+        
+        # Keep the curve's shape, draw at most REPORT_GRAPH_MAX_POINTS points
+        if len(times) > REPORT_GRAPH_MAX_POINTS:
+            t = mdates.date2num(times)
+            keep = downsample_indices(t - t[0], scores, REPORT_GRAPH_MAX_POINTS)
+            if isinstance(points_data, EngagementSeries):
+                times, scores = times[keep], scores[keep]
+            else:
+                times = [times[i] for i in keep]
+                scores = [scores[i] for i in keep]
         
         # Create figure
         fig, ax = plt.subplots(figsize=(12, 6), facecolor='white')
@@ -38,7 +62,6 @@ def generate_engagement_graph(points_data: List[Dict]) -> Optional[str]:
                 markersize=4, label='Engagement Score', alpha=0.8)
         
         # Add average line
-        avg = np.mean(scores)
         ax.axhline(y=avg, color='#ef4444', linestyle='--', linewidth=2, 
                    label=f'Average: {avg:.2f}', alpha=0.7)
         
@@ -0,0 +1,80 @@
+# backend/series_format.py
+"""
+Compact columnar encoding for engagement series (?format=columnar).
+
+Instead of one JSON object per point:
+    [{"timestamp": "2026-01-01T10:00:00.250000+00:00", "score": 0.8123, "ear": 0.2711}, ...]
+the series is returned as parallel arrays:
+    {
+        "format": "columnar",
+        "count": 3,
+        "t0": 1767261600250,          # first timestamp, epoch ms
+        "dt_ms": [0, 250, 251],       # delta from the previous point, ms
+        "score": [0.8123, 0.8, 0.7931],
+        "ear": [0.2711, null, 0.27]
+    }
+
+Built straight from raw row tuples (timestamp, score, ear) - no ORM
+objects and no Pydantic model per point.
+
+Client decoding: t[i] = t0 + sum(dt_ms[0..i]).
+"""
+from datetime import timezone
+
+import numpy as np
+
+SERIES_FORMATS = ("json", "columnar")
+COLUMNAR_DECIMALS = 4
+
+
+def _epoch_ms(ts) -> int:
+    if ts.tzinfo is None:
+        # SQLite returns naive datetimes; points are stored in UTC
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp() * 1000)
+
+
+def columnar_series(rows, decimals: int = COLUMNAR_DECIMALS) -> dict:
+    """
+    Encode (timestamp, score, ear) rows, already ordered by timestamp.
+
+    Timestamps become delta-encoded integer milliseconds; floats are
+    rounded to a fixed number of decimals.
+    """
+    if not rows:
+        return columnar_arrays(np.empty(0, dtype=np.int64), [], [], decimals)
+
+    timestamps, scores, ears = zip(*rows)
+    t_ms = np.fromiter((_epoch_ms(ts) for ts in timestamps), dtype=np.int64, count=len(rows))
+    return columnar_arrays(t_ms, scores, ears, decimals)
+
+
+def columnar_arrays(t_ms, scores, ears, decimals: int = COLUMNAR_DECIMALS) -> dict:
+    """
+    Same encoding from parallel arrays (e.g. the live ring buffer).
+
+    ears may contain None or NaN for missing values.
+    """
+    if len(t_ms) == 0:
+        return {"format": "columnar", "count": 0, "t0": None, "dt_ms": [], "score": [], "ear": []}
+
+    t_ms = np.asarray(t_ms, dtype=np.int64)
+    dt_ms = np.diff(t_ms, prepend=t_ms[0])
+
+    score = np.round(np.asarray(scores, dtype=np.float64), decimals)
+
+    ear = np.round(np.asarray([np.nan if e is None else e for e in ears], dtype=np.float64), decimals)
+    missing = np.isnan(ear)
+    ear = ear.tolist()
+    if missing.any():
+        for i in np.flatnonzero(missing):
+            ear[i] = None
+
+    return {
+        "format": "columnar",
+        "count": len(t_ms),
+        "t0": int(t_ms[0]),
+        "dt_ms": dt_ms.tolist(),
+        "score": score.tolist(),
+        "ear": ear,
+    }
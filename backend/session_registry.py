@@ -0,0 +1,178 @@
+# backend/session_registry.py
+"""
+Process-local registry of engagement session state.
+
+Hot endpoints (point ingestion, heartbeat, join, kit-token) only need a
+handful of session fields to validate a request: ended_at, is_deleted,
+is_locked and the mute/camera flags. The registry keeps those in memory
+so the checks don't cost a database round trip.
+
+- Warmed at startup with every active session
+- Updated by the endpoints that change session state
+  (create/end/delete, lock/unlock, mute/cameras, watchdog auto-end)
+- Entries older than SESSION_REGISTRY_TTL_SECONDS are reloaded from the
+  database, which bounds staleness when another worker changed a session
+
+Also caches, per session, the student ids known to have an Attendance
+row, so camera uploads can check the student_id they carry. Only
+positive answers are cached: an unknown id is looked up again (a
+student may have just joined).
+"""
+import os
+import threading
+import time
+from typing import Optional
+
+from models import Attendance, EngagementSession
+
+SESSION_REGISTRY_TTL_SECONDS = float(os.getenv("SESSION_REGISTRY_TTL_SECONDS", "15"))
+
+
+class SessionState:
+    """Immutable-ish snapshot of the session columns used for validation."""
+
+    __slots__ = (
+        "id",
+        "teacher_id",
+        "title",
+        "subject",
+        "share_code",
+        "started_at",
+        "ended_at",
+        "is_deleted",
+        "is_locked",
+        "mute_students",
+        "disable_student_cameras",
+        "loaded_at",
+    )
+
+    def __init__(self, session: EngagementSession):
+        self.id = session.id
+        self.teacher_id = session.teacher_id
+        self.title = session.title
+        self.subject = session.subject
+        self.share_code = session.share_code
+        self.started_at = session.started_at
+        self.ended_at = session.ended_at
+        self.is_deleted = bool(session.is_deleted)
+        self.is_locked = bool(session.is_locked)
+        self.mute_students = bool(session.mute_students)
+        self.disable_student_cameras = bool(session.disable_student_cameras)
+        self.loaded_at = time.monotonic()
+
+    @property
+    def is_active(self) -> bool:
+        return self.ended_at is None and not self.is_deleted
+
+
+class SessionRegistry:
+    def __init__(self, ttl_seconds: float = SESSION_REGISTRY_TTL_SECONDS):
+        self.ttl = ttl_seconds
+        self._by_id: dict[int, SessionState] = {}
+        self._by_code: dict[str, int] = {}
+        # session_id -> (student ids with an Attendance row, loaded_at)
+        self._attendees: dict[int, tuple[set, float]] = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, state: Optional[SessionState]) -> bool:
+        return state is not None and time.monotonic() - state.loaded_at < self.ttl
+
+    def put(self, session: EngagementSession) -> SessionState:
+        """Cache (or refresh) the state of an ORM session row."""
+        state = SessionState(session)
+        with self._lock:
+            old = self._by_id.get(state.id)
+            if old is not None and old.share_code != state.share_code:
+                self._by_code.pop(old.share_code, None)
+            self._by_id[state.id] = state
+            self._by_code[state.share_code] = state.id
+        return state
+
+    def invalidate(self, session_id: int):
+        with self._lock:
+            self._attendees.pop(session_id, None)
+            state = self._by_id.pop(session_id, None)
+            if state is not None:
+                self._by_code.pop(state.share_code, None)
+
+    def mark_ended(self, session_ids, ended_at):
+        """Record an end time for sessions ended outside an ORM object (e.g. watchdog)."""
+        with self._lock:
+            for session_id in session_ids:
+                state = self._by_id.get(session_id)
+                if state is not None:
+                    state.ended_at = ended_at
+
+    def get(self, db, session_id: int) -> Optional[SessionState]:
+        """
+        Return session state by id, loading from the DB on miss or expiry.
+
+        Returns None if the session does not exist. Deleted/ended sessions
+        ARE returned - callers decide how to treat them.
+        """
+        state = self._by_id.get(session_id)
+        if self._fresh(state):
+            return state
+
+        session = db.query(EngagementSession).filter(
+            EngagementSession.id == session_id
+        ).first()
+
+        if session is None:
+            self.invalidate(session_id)
+            return None
+        return self.put(session)
+
+    def get_by_share_code(self, db, share_code: str) -> Optional[SessionState]:
+        session_id = self._by_code.get(share_code)
+        if session_id is not None:
+            state = self._by_id.get(session_id)
+            if self._fresh(state) and state.share_code == share_code:
+                return state
+
+        session = db.query(EngagementSession).filter(
+            EngagementSession.share_code == share_code
+        ).first()
+
+        if session is None:
+            return None
+        return self.put(session)
+
+    def attendees(self, db, session_id: int, student_ids) -> set:
+        """The subset of student_ids that have an Attendance row in the session."""
+        wanted = set(student_ids)
+        with self._lock:
+            cached = self._attendees.get(session_id)
+            if cached is None or time.monotonic() - cached[1] >= self.ttl:
+                cached = self._attendees[session_id] = (set(), time.monotonic())
+            known = cached[0]
+            missing = wanted - known
+
+        if missing:
+            found = {
+                student_id for (student_id,) in db.query(Attendance.student_id).filter(
+                    Attendance.session_id == session_id,
+                    Attendance.student_id.in_(missing)
+                ).distinct()
+            }
+            with self._lock:
+                known |= found
+        return wanted & known
+
+    def warm(self, db) -> int:
+        """Load every active session. Called once at startup."""
+        sessions = db.query(EngagementSession).filter(
+            EngagementSession.ended_at.is_(None),
+            EngagementSession.is_deleted == False
+        ).all()
+
+        for session in sessions:
+            self.put(session)
+        return len(sessions)
+
+    def __len__(self):
+        return len(self._by_id)
+
+
+# Global instance (one per API process)
+session_registry = SessionRegistry()
@@ -0,0 +1,383 @@
+# backend/session_watchdog.py
+"""
+Deadline-driven auto-end of inactive sessions.
+
+A session whose last_seen_at is older than SESSION_TIMEOUT_SECONDS is
+ended automatically, exactly like the teacher's end_session would:
+ended_at set, point count frozen (ETag input), every student still
+present gets left_at and their duration.
+
+- Wake-ups come from a min-heap of deadlines (last beat + timeout), fed
+  by create_session and heartbeats, plus min(last_seen_at) of all open
+  sessions from the DB (covers beats handled by other workers). Nothing
+  is scanned in Python; the thread sleeps until the next deadline
+- Expired sessions are ended by ONE set-based statement. On PostgreSQL
+  a data-modifying CTE ends the sessions and closes their attendance in
+  the same statement:
+
+      WITH expired AS (UPDATE engagement_sessions ... RETURNING id),
+           closed  AS (UPDATE attendance ... FROM expired ... RETURNING session_id)
+      SELECT ...
+
+- Singleton across workers: only the holder of a PostgreSQL advisory
+  lock ends sessions; the others retry for the lock every
+  WATCHDOG_MAX_SLEEP_SECONDS. SQLite (single process) always leads
+- Every worker reconciles the sessions it has seen: once they are ended
+  (by the watchdog or a teacher, in any worker) its live feed / ring
+  buffer / live stats for them are closed, its online analytics written
+  (final checkpoint) and its registry entry dropped
+
+Heartbeats are flushed every HEARTBEAT_FLUSH_SECONDS, so a session can be
+seen as inactive up to that much early - keep it well below the timeout.
+"""
+import heapq
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, or_, select, text
+
+from database import engine, SessionLocal
+from heartbeats import heartbeat_tracker
+from ingest_queue import ingest_queue, INGEST_WRITE_BEHIND
+from live_buffer import live_buffer
+from live_feed import live_feed
+from live_stats import live_stats
+from analytics_accumulator import analytics_accumulator
+from models import Attendance, EngagementPoint, EngagementSession
+from session_registry import session_registry
+
+SESSION_TIMEOUT_SECONDS = int(os.getenv("SESSION_TIMEOUT_SECONDS", "30"))
+WATCHDOG_MAX_SLEEP_SECONDS = float(os.getenv("WATCHDOG_MAX_SLEEP_SECONDS", "10"))
+# Any constant unique to this app within the database
+WATCHDOG_LOCK_KEY = int(os.getenv("WATCHDOG_LOCK_KEY", "746573931"))
+
+SESSIONS = EngagementSession.__table__
+
+# Candidates are re-checked (ended_at / last_seen_at) inside the statement:
+# a beat may have landed since they were selected.
+# The point count is frozen by FREEZE_COUNT_SQL, a later statement: this one
+# waits for in-flight point writes (write_points holds the session row), but
+# its own snapshot would not see their rows.
+AUTO_END_SQL = text("""
+    WITH expired AS (
+        UPDATE engagement_sessions AS s
+        SET ended_at = :now
+        WHERE s.id = ANY(:ids)
+          AND s.ended_at IS NULL
+          AND s.last_seen_at < :cutoff
+        RETURNING s.id
+    ),
+    closed AS (
+        UPDATE attendance AS a
+        SET left_at = :now,
+            total_duration_seconds = coalesce(a.total_duration_seconds, 0)
+                + greatest(floor(extract(epoch FROM (CAST(:now AS TIMESTAMPTZ) - a.joined_at))), 0)::int
+        FROM expired
+        WHERE a.session_id = expired.id
+          AND a.left_at IS NULL
+        RETURNING a.session_id
+    )
+    SELECT expired.id,
+           (SELECT count(*) FROM closed WHERE closed.session_id = expired.id) AS students
+    FROM expired
+""")
+
+FREEZE_COUNT_SQL = text("""
+    UPDATE engagement_sessions AS s
+    SET total_points = (
+        SELECT count(*) FROM engagement_points AS p WHERE p.session_id = s.id
+    )
+    WHERE s.id = ANY(:ids)
+""")
+
+
+def _aware(ts):
+    # SQLite returns naive datetimes; they are stored in UTC
+    if ts is not None and ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts
+
+
+class SessionWatchdog:
+    def __init__(
+        self,
+        timeout_seconds: int = SESSION_TIMEOUT_SECONDS,
+        max_sleep_seconds: float = WATCHDOG_MAX_SLEEP_SECONDS,
+    ):
+        self.timeout = timedelta(seconds=timeout_seconds)
+        self.max_sleep = max_sleep_seconds
+
+        # Latest known deadline per session, and a heap with at most one entry per session
+        self._deadline: dict[int, datetime] = {}
+        self._heap: list = []
+        self._queued: set = set()
+        # Earliest deadline of all open sessions according to the DB
+        self._db_deadline = None
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_conn = None
+
+        # Metrics
+        self.auto_ended_total = 0
+        self.sweeps = 0
+
+    # ---------- deadlines (any thread) ----------
+
+    def touch(self, session_id: int, seen_at: datetime = None):
+        """Session was seen alive (created / heartbeat)."""
+        deadline = _aware(seen_at or datetime.now(timezone.utc)) + self.timeout
+        with self._lock:
+            current = self._deadline.get(session_id)
+            if current is None or deadline > current:
+                self._deadline[session_id] = deadline
+            if session_id not in self._queued:
+                heapq.heappush(self._heap, (deadline, session_id))
+                self._queued.add(session_id)
+
+    def forget(self, session_id: int):
+        """Session ended/deleted; its heap entry is dropped when it surfaces."""
+        with self._lock:
+            self._deadline.pop(session_id, None)
+
+    def _pop_due(self, now: datetime) -> bool:
+        """Pop heap entries due by 'now'. True if any session may have expired."""
+        due = False
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, session_id = heapq.heappop(self._heap)
+                self._queued.discard(session_id)
+                current = self._deadline.get(session_id)
+                if current is None:
+                    continue
+                if current > deadline:
+                    # Beaten since this entry was pushed: reschedule
+                    heapq.heappush(self._heap, (current, session_id))
+                    self._queued.add(session_id)
+                    continue
+                due = True
+        if self._db_deadline is not None and self._db_deadline <= now:
+            due = True
+        return due
+
+    def _next_wake(self, now: datetime) -> float:
+        candidates = [now + timedelta(seconds=self.max_sleep)]
+        with self._lock:
+            if self._heap:
+                candidates.append(self._heap[0][0])
+        if self._db_deadline is not None:
+            candidates.append(self._db_deadline)
+        return max((min(candidates) - now).total_seconds(), 0.05)
+
+    # ---------- leadership ----------
+
+    def _is_leader(self) -> bool:
+        if engine.dialect.name != "postgresql":
+            return True
+
+        if self._lock_conn is not None:
+            try:
+                self._lock_conn.execute(text("SELECT 1"))
+                return True
+            except Exception as e:
+                print(f"⚠️  Watchdog lost its advisory lock connection: {e}")
+                self._close_lock_conn()
+
+        conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": WATCHDOG_LOCK_KEY}
+            ).scalar()
+        except Exception:
+            conn.close()
+            raise
+        if not acquired:
+            conn.close()
+            return False
+
+        # Session-level lock: held for as long as this connection lives
+        self._lock_conn = conn
+        print(f"🐕 Session watchdog is the leader (advisory lock {WATCHDOG_LOCK_KEY})")
+        return True
+
+    def _close_lock_conn(self):
+        if self._lock_conn is None:
+            return
+        try:
+            self._lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": WATCHDOG_LOCK_KEY})
+        except Exception:
+            pass
+        try:
+            self._lock_conn.close()
+        except Exception:
+            pass
+        self._lock_conn = None
+
+    # ---------- ending ----------
+
+    def _refresh_db_deadline(self):
+        stmt = select(func.min(SESSIONS.c.last_seen_at)).where(SESSIONS.c.ended_at.is_(None))
+        with engine.connect() as conn:
+            oldest = conn.execute(stmt).scalar()
+        self._db_deadline = _aware(oldest) + self.timeout if oldest is not None else None
+
+    def _end_sessions(self, ids: list[int], now: datetime, cutoff: datetime) -> dict:
+        """End the given candidates that are still expired. Returns {session_id: students closed}."""
+        if engine.dialect.name == "postgresql":
+            with engine.begin() as conn:
+                rows = conn.execute(AUTO_END_SQL, {"ids": ids, "now": now, "cutoff": cutoff}).all()
+                if rows:
+                    conn.execute(FREEZE_COUNT_SQL, {"ids": [row.id for row in rows]})
+            return {row.id: row.students for row in rows}
+
+        # SQLite: same effect, one transaction
+        db = SessionLocal()
+        try:
+            sessions = db.query(EngagementSession).filter(
+                EngagementSession.id.in_(ids),
+                EngagementSession.ended_at.is_(None),
+                EngagementSession.last_seen_at < cutoff,
+            ).all()
+
+            ended = {}
+            for s in sessions:
+                s.ended_at = now
+                # Write ended_at (takes the write lock) before counting, as freeze_point_count
+                db.flush()
+                s.total_points = db.query(func.count(EngagementPoint.id)).filter(
+                    EngagementPoint.session_id == s.id
+                ).scalar()
+                present = db.query(Attendance).filter(
+                    Attendance.session_id == s.id,
+                    Attendance.left_at.is_(None),
+                ).all()
+                for attendance in present:
+                    duration = int((now - _aware(attendance.joined_at)).total_seconds())
+                    attendance.left_at = now
+                    attendance.total_duration_seconds = (attendance.total_duration_seconds or 0) + max(duration, 0)
+                ended[s.id] = len(present)
+
+            db.commit()
+            return ended
+        finally:
+            db.close()
+
+    def _close_local(self, session_id: int):
+        """Release this process's in-memory state of an ended session."""
+        live_feed.close_session(session_id)
+        live_buffer.drop(session_id)
+        live_stats.drop(session_id)
+        # Final checkpoint of this process's online analytics, then forget them
+        analytics_accumulator.close(session_id)
+        self.forget(session_id)
+
+    def sweep(self, now: datetime = None) -> list[int]:
+        """End every open session inactive for longer than the timeout. Returns ended ids."""
+        # Coalesced heartbeats must be in the DB before judging inactivity
+        heartbeat_tracker.flush()
+
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - self.timeout
+        self.sweeps += 1
+
+        stmt = select(SESSIONS.c.id).where(
+            SESSIONS.c.ended_at.is_(None),
+            SESSIONS.c.last_seen_at < cutoff,
+        )
+        with engine.connect() as conn:
+            candidates = list(conn.execute(stmt).scalars())
+        if not candidates:
+            return []
+
+        # Stop accepting points, then write out what is queued so the frozen count is final
+        session_registry.mark_ended(candidates, now)
+        if INGEST_WRITE_BEHIND:
+            ingest_queue.flush()
+
+        ended = self._end_sessions(candidates, now, cutoff)
+
+        for session_id in candidates:
+            if session_id not in ended:
+                # Came back to life between the select and the update
+                session_registry.invalidate(session_id)
+
+        for session_id, students in ended.items():
+            print(f"🔒 Auto-ended inactive session {session_id} ({students} students closed)")
+            self._close_local(session_id)
+
+        self.auto_ended_total += len(ended)
+        return list(ended)
+
+    def reconcile(self):
+        """Close local state of tracked sessions that were ended anywhere."""
+        with self._lock:
+            tracked = list(self._deadline)
+        if not tracked:
+            return
+
+        stmt = select(SESSIONS.c.id).where(
+            SESSIONS.c.id.in_(tracked),
+            or_(SESSIONS.c.ended_at.is_not(None), SESSIONS.c.is_deleted.is_(True)),
+        )
+        with engine.connect() as conn:
+            gone = list(conn.execute(stmt).scalars())
+
+        for session_id in gone:
+            session_registry.invalidate(session_id)
+            self._close_local(session_id)
+
+    # ---------- thread ----------
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = datetime.now(timezone.utc)
+            try:
+                if self._is_leader():
+                    if self._pop_due(now):
+                        self.sweep(now)
+                    self._refresh_db_deadline()
+                    wait = self._next_wake(datetime.now(timezone.utc))
+                else:
+                    wait = self.max_sleep
+                self.reconcile()
+            except Exception as e:
+                print(f"❌ Watchdog error: {e}")
+                wait = self.max_sleep
+
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="session-watchdog", daemon=True)
+        self._thread.start()
+        print(f"🐕 Session watchdog started (timeout {int(self.timeout.total_seconds())}s)")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(5)
+        self._close_lock_conn()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            tracked = len(self._deadline)
+            next_deadline = self._heap[0][0] if self._heap else None
+        return {
+            "leader": engine.dialect.name != "postgresql" or self._lock_conn is not None,
+            "tracked_sessions": tracked,
+            "next_deadline": next_deadline.isoformat() if next_deadline else None,
+            "db_deadline": self._db_deadline.isoformat() if self._db_deadline else None,
+            "sweeps": self.sweeps,
+            "auto_ended_total": self.auto_ended_total,
+        }
+
+
+# Global instance (one per API process)
+session_watchdog = SessionWatchdog()
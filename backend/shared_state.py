@@ -0,0 +1,413 @@
+# backend/shared_state.py
+"""
+State shared by every API worker process (and host).
+
+Two kinds of state must not live in per-process memory once uvicorn runs
+with --workers N:
+- ML process registry: which ML subprocess runs for which session, so
+  ml-status / stop-ml answer the same in every worker
+- Rate-limit token buckets: a "30/second per IP" limit must stay 30/s,
+  not 30/s per worker
+
+Backends (same interface, picked by SHARED_STATE_URL):
+- SQLiteSharedState (default): a small SQLite file on local disk. Every
+  operation is one BEGIN IMMEDIATE transaction, so SQLite's file lock
+  serializes workers of the same node. Single node only
+- RedisSharedState (SHARED_STATE_URL=redis://...): any Redis-compatible
+  store, across hosts. Token buckets are updated by a Lua script (atomic,
+  server clock). Takes any redis-py compatible client, e.g. a local
+  stand-in such as fakeredis for tests
+
+Token bucket: 'rate' tokens per second refill a bucket of 'capacity'
+tokens; a request takes one, or is refused with the seconds until one
+is available.
+
+rate_limit() doesn't hit the backend on every request: each process
+takes tokens from the shared bucket in leases of capacity /
+SHARED_STATE_LEASE_DIVISOR and serves requests from them locally for up
+to SHARED_STATE_LEASE_SECONDS (TokenLeases). The limit still holds
+across workers - a lease is taken from the shared bucket - but a
+worker may refuse while another holds unused tokens, and unused leased
+tokens expire. SQLite bucket updates wait at most
+SHARED_STATE_BUSY_TIMEOUT_MS for the file lock; past that the limiter
+lets the request through rather than stall it.
+"""
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+
+from fastapi import HTTPException, Request
+from slowapi.util import get_remote_address
+
+try:
+    import redis
+    from redis.exceptions import WatchError
+except ImportError:  # Optional: only needed with SHARED_STATE_URL=redis://...
+    redis = None
+
+    class WatchError(Exception):
+        pass
+
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "")
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", str(Path(__file__).with_name("shared_state.db")))
+SHARED_STATE_PREFIX = os.getenv("SHARED_STATE_PREFIX", "engagement:")
+# SQLite: drop idle (= full again) buckets every N takes
+SHARED_STATE_PRUNE_EVERY = int(os.getenv("SHARED_STATE_PRUNE_EVERY", "1000"))
+# SQLite: lock wait of token bucket updates (registry writes keep 5s)
+SHARED_STATE_BUSY_TIMEOUT_MS = int(os.getenv("SHARED_STATE_BUSY_TIMEOUT_MS", "50"))
+# rate_limit: tokens taken per backend call = capacity // divisor (at least 1)
+SHARED_STATE_LEASE_DIVISOR = int(os.getenv("SHARED_STATE_LEASE_DIVISOR", "5"))
+SHARED_STATE_LEASE_SECONDS = float(os.getenv("SHARED_STATE_LEASE_SECONDS", "1"))
+
+
+class SharedState(ABC):
+    """Interface of the shared state backends."""
+
+    # ---------- process registry ----------
+
+    @abstractmethod
+    def claim_process(self, key: str, entry: dict) -> bool:
+        """Register 'entry' under 'key' unless one exists. True if claimed."""
+
+    @abstractmethod
+    def set_process(self, key: str, entry: dict):
+        """Register or replace the entry under 'key'."""
+
+    @abstractmethod
+    def get_process(self, key: str) -> dict | None:
+        """The entry under 'key', or None."""
+
+    @abstractmethod
+    def remove_process(self, key: str):
+        """Forget the entry under 'key' (no-op if there is none)."""
+
+    @abstractmethod
+    def list_processes(self) -> dict:
+        """All entries: {key: entry}."""
+
+    @abstractmethod
+    def refresh_process(self, key: str, pid: int, seen_at: float) -> bool:
+        """Set 'seen_at' of the entry under 'key' if it still is process 'pid'. True if set."""
+
+    # ---------- token buckets ----------
+
+    @abstractmethod
+    def take(self, key: str, rate: float, capacity: int, cost: int = 1) -> tuple[bool, float]:
+        """Take 'cost' tokens from bucket 'key'. Returns (allowed, retry_after_seconds)."""
+
+
+class SQLiteSharedState(SharedState):
+    def __init__(self, path: str = SHARED_STATE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS processes ("
+                " key TEXT PRIMARY KEY, entry TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_buckets ("
+                " key TEXT PRIMARY KEY, tokens REAL NOT NULL,"
+                " updated_at REAL NOT NULL, full_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread; FastAPI runs sync endpoints in a pool
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self, busy_timeout_ms: int = 5000):
+        conn = self._connection()
+        conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        # Takes the write lock up front: read-modify-write is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def claim_process(self, key: str, entry: dict) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO processes (key, entry) VALUES (?, ?)",
+                (key, json.dumps(entry)),
+            )
+            return cursor.rowcount == 1
+
+    def set_process(self, key: str, entry: dict):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO processes (key, entry) VALUES (?, ?)",
+                (key, json.dumps(entry)),
+            )
+
+    def get_process(self, key: str) -> dict | None:
+        row = self._connection().execute(
+            "SELECT entry FROM processes WHERE key = ?", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def remove_process(self, key: str):
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM processes WHERE key = ?", (key,))
+
+    def list_processes(self) -> dict:
+        rows = self._connection().execute("SELECT key, entry FROM processes").fetchall()
+        return {key: json.loads(entry) for key, entry in rows}
+
+    def refresh_process(self, key: str, pid: int, seen_at: float) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute("SELECT entry FROM processes WHERE key = ?", (key,)).fetchone()
+            entry = json.loads(row[0]) if row else None
+            if entry is None or entry.get("pid") != pid:
+                return False
+            entry["seen_at"] = seen_at
+            conn.execute("UPDATE processes SET entry = ? WHERE key = ?", (json.dumps(entry), key))
+            return True
+
+    def take(self, key: str, rate: float, capacity: int, cost: int = 1) -> tuple[bool, float]:
+        # On the request path: fail fast (sqlite3.OperationalError) rather than queue
+        with self._transaction(SHARED_STATE_BUSY_TIMEOUT_MS) as conn:
+            # Read the clock holding the lock: a waiter must not write an older time.
+            # Wall clock: shared by every process of the node
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM token_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                tokens = float(capacity)
+            else:
+                tokens = min(float(capacity), row[0] + max(now - row[1], 0.0) * rate)
+
+            if tokens >= cost:
+                tokens -= cost
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate
+
+            conn.execute(
+                "INSERT OR REPLACE INTO token_buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, now + (capacity - tokens) / rate),
+            )
+
+            self._takes += 1
+            if self._takes % SHARED_STATE_PRUNE_EVERY == 0:
+                # A full bucket is the same as no bucket
+                conn.execute("DELETE FROM token_buckets WHERE full_at < ?", (now,))
+
+        return allowed, retry_after
+
+
+# KEYS[1] = bucket; ARGV = rate, capacity, cost. Server clock: hosts may disagree.
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1])
+local ts = tonumber(bucket[2])
+if tokens == nil then
+    tokens = capacity
+else
+    tokens = math.min(capacity, tokens + math.max(now - ts, 0) * rate)
+end
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+-- Gone once full again
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisSharedState(SharedState):
+    def __init__(self, client, prefix: str = SHARED_STATE_PREFIX):
+        self.client = client
+        self.prefix = prefix
+        self._processes = f"{prefix}processes"
+        self._token_bucket = client.register_script(TOKEN_BUCKET_LUA)
+
+    def claim_process(self, key: str, entry: dict) -> bool:
+        return bool(self.client.hsetnx(self._processes, key, json.dumps(entry)))
+
+    def set_process(self, key: str, entry: dict):
+        self.client.hset(self._processes, key, json.dumps(entry))
+
+    def get_process(self, key: str) -> dict | None:
+        value = self.client.hget(self._processes, key)
+        return json.loads(value) if value is not None else None
+
+    def remove_process(self, key: str):
+        self.client.hdel(self._processes, key)
+
+    def list_processes(self) -> dict:
+        return {
+            (k.decode() if isinstance(k, bytes) else k): json.loads(v)
+            for k, v in self.client.hgetall(self._processes).items()
+        }
+
+    def refresh_process(self, key: str, pid: int, seen_at: float) -> bool:
+        # WATCH: the entry must not be replaced between the check and the write
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(self._processes)
+                value = pipe.hget(self._processes, key)
+                entry = json.loads(value) if value is not None else None
+                if entry is None or entry.get("pid") != pid:
+                    pipe.unwatch()
+                    return False
+                entry["seen_at"] = seen_at
+                pipe.multi()
+                pipe.hset(self._processes, key, json.dumps(entry))
+                pipe.execute()
+                return True
+            except WatchError:
+                return False  # Changed meanwhile: the next refresh retries
+
+    def take(self, key: str, rate: float, capacity: int, cost: int = 1) -> tuple[bool, float]:
+        allowed, retry_after = self._token_bucket(
+            keys=[f"{self.prefix}bucket:{key}"], args=[rate, capacity, cost]
+        )
+        return bool(int(allowed)), float(retry_after)
+
+
+def create_shared_state(url: str = SHARED_STATE_URL) -> SharedState:
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        if redis is None:
+            raise RuntimeError("SHARED_STATE_URL is a Redis URL but the 'redis' package is not installed")
+        print(f"🔗 Shared state: Redis ({url.split('@')[-1]})")
+        return RedisSharedState(redis.Redis.from_url(url))
+
+    print(f"🔗 Shared state: SQLite ({SHARED_STATE_PATH})")
+    return SQLiteSharedState(SHARED_STATE_PATH)
+
+
+# Global instance (one per API process, state shared between them)
+shared_state = create_shared_state()
+
+
+class TokenLeases:
+    """
+    Per-process cache of tokens taken from shared buckets in batches.
+
+    take() is served from the process's lease while it has tokens and
+    hasn't expired; otherwise it takes a new lease from the backend (or a
+    single token when the bucket can't spare a whole lease). A refusal is
+    remembered until its retry_after: no token can come sooner.
+    """
+
+    def __init__(
+        self,
+        state: SharedState,
+        divisor: int = SHARED_STATE_LEASE_DIVISOR,
+        lease_seconds: float = SHARED_STATE_LEASE_SECONDS,
+    ):
+        self.state = state
+        self.divisor = max(divisor, 1)
+        self.lease_seconds = lease_seconds
+        self._leases: dict[str, list] = {}  # key -> [tokens, expires_at]
+        self._refused: dict[str, float] = {}  # key -> refused until
+        self._lock = threading.Lock()
+        self.backend_calls = 0
+        self.local_takes = 0
+
+    def take(self, key: str, rate: float, capacity: int) -> tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            refused_until = self._refused.get(key)
+            if refused_until is not None and refused_until > now:
+                self.local_takes += 1
+                return False, refused_until - now
+            lease = self._leases.get(key)
+            if lease is not None and lease[1] > now and lease[0] >= 1:
+                lease[0] -= 1
+                self.local_takes += 1
+                return True, 0.0
+
+        size = max(capacity // self.divisor, 1)
+        allowed, retry_after = self.state.take(key, rate, capacity, size)
+        calls = 1
+        if not allowed and size > 1:
+            size = 1
+            allowed, retry_after = self.state.take(key, rate, capacity, 1)
+            calls = 2
+
+        with self._lock:
+            self.backend_calls += calls
+            if allowed and size > 1:
+                self._leases[key] = [size - 1, now + self.lease_seconds]
+            else:
+                self._leases.pop(key, None)
+            if allowed:
+                self._refused.pop(key, None)
+            else:
+                self._refused[key] = now + retry_after
+            if len(self._leases) + len(self._refused) > 10_000:
+                # One entry per client IP and limit: drop the expired ones
+                self._leases = {k: v for k, v in self._leases.items() if v[1] > now}
+                self._refused = {k: t for k, t in self._refused.items() if t > now}
+        return allowed, retry_after
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "leases": len(self._leases),
+                "backend_calls": self.backend_calls,
+                "local_takes": self.local_takes,
+            }
+
+
+token_leases = TokenLeases(shared_state)
+
+
+def rate_limit(name: str, rate: float, burst: int = None):
+    """
+    FastAPI dependency: token bucket per client IP, shared by all workers.
+
+    Usage: `_: None = Depends(rate_limit("points", 30))` for 30/second.
+    """
+    capacity = burst or max(int(rate), 1)
+
+    def dependency(request: Request):
+        key = f"{name}:{get_remote_address(request)}"
+        try:
+            allowed, retry_after = token_leases.take(key, rate, capacity)
+        except Exception as e:
+            # Limiter outage must not take the endpoint down
+            print(f"⚠️  Rate limit check failed ({name}), allowing: {e}")
+            return
+        if not allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+    return dependency
@@ -7,6 +7,7 @@ from datetime import datetime
 from database import SessionLocal
 from models import EngagementSession, User
 from auth import get_current_user
+from session_registry import session_registry
 
 load_dotenv()
 
@@ -68,18 +69,16 @@ def get_kit_token(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    session = db.query(EngagementSession).filter(
-        EngagementSession.id == session_id
-    ).first()
+    session = session_registry.get(db, session_id)
 
-    if not session:
+    if not session or session.is_deleted:
         raise HTTPException(status_code=404, detail="Session not found")
 
     if session.ended_at:
         raise HTTPException(status_code=403, detail="Session has ended")
 
     # 🔒 UPDATE G.1 — ROOM LOCK CHECK
-    if getattr(session, "is_locked", False):
+    if session.is_locked:
         raise HTTPException(
             status_code=403,
             detail="Class is locked by teacher"
@@ -126,6 +125,7 @@ def lock_room(
 
     session.is_locked = True
     db.commit()
+    session_registry.put(session)
 
     return {"status": "locked", "session_id": session_id}
 
@@ -148,6 +148,7 @@ def unlock_room(
 
     session.is_locked = False
     db.commit()
+    session_registry.put(session)
 
     return {"status": "unlocked", "session_id": session_id}
 
@@ -171,6 +172,7 @@ def mute_all_students(
 
     session.mute_students = True
     db.commit()
+    session_registry.put(session)
 
     return {"status": "students_muted"}
 
@@ -194,5 +196,6 @@ def disable_student_cameras(
 
     session.disable_student_cameras = True
     db.commit()
+    session_registry.put(session)
 
     return {"status": "student_cameras_disabled"}
@@ -40,6 +40,8 @@ export default function RealTimeEngagement({
   const [loading, setLoading] = useState(true);
   const lastIsoRef = useRef(null);
   const pollingRef = useRef(null);
+  const streamRef = useRef(null);
+  const lastSeqRef = useRef(null);
 
   useEffect(() => {
     if (onPointsUpdate) {
@@ -52,11 +54,14 @@ export default function RealTimeEngagement({
       const token = localStorage.getItem("token");
       if (!token) return [];
 
-      const endpoint = sinceIso
-        ? `/api/engagement/sessions/${sessionId}/series/updates?since=${encodeURIComponent(sinceIso)}`
-        : `/api/engagement/sessions/${sessionId}/series`;
-
-      const res = await API.get(endpoint);
+      // Initial load: whole session, downsampled server-side to what the chart can show
+      const res = sinceIso
+        ? await API.get(`/api/engagement/sessions/${sessionId}/series/updates`, {
+            params: { since: sinceIso },
+          })
+        : await API.get(`/api/engagement/sessions/${sessionId}/series`, {
+            params: { max_points: MAX_POINTS },
+          });
 
       return res.data || [];
     } catch (err) {
@@ -108,12 +113,9 @@ export default function RealTimeEngagement({
 
     let mounted = true;
 
-    async function startPolling() {
-      setLoading(true);
-      const first = await fetchUpdates(null);
-      if (!mounted) return;
-      pushPoints(first);
-
+    function startPolling() {
+      if (pollingRef.current) return;
+      console.log("🔁 Falling back to polling");
       pollingRef.current = setInterval(async () => {
         if (!mounted) return;
         const updates = await fetchUpdates(lastIsoRef.current);
@@ -122,11 +124,100 @@ export default function RealTimeEngagement({
       }, POLL_MS);
     }
 
-    startPolling();
+    function closeStream() {
+      if (streamRef.current) {
+        streamRef.current.close();
+        streamRef.current = null;
+      }
+    }
+
+    // ✅ Server push: new points arrive as they are ingested (no polling).
+    // The URL carries a short-lived stream ticket, never the access token.
+    async function startStream(query) {
+      if (typeof EventSource === "undefined") return false;
+
+      let ticket;
+      try {
+        const res = await API.post(`/api/engagement/sessions/${sessionId}/live/ticket`);
+        ticket = res.data.ticket;
+      } catch (err) {
+        console.error("❌ live ticket error:", err?.response?.status);
+        return false;
+      }
+      if (!mounted) return true;
+
+      // since = newest point we have (server backfills anything newer),
+      // cursor = last event seen (server replays from its backlog)
+      const params = new URLSearchParams({ ticket, ...query });
+
+      const es = new EventSource(
+        `${API.defaults.baseURL || ""}/api/engagement/sessions/${sessionId}/live?${params}`
+      );
+      let opened = false;
+
+      es.addEventListener("ready", () => {
+        opened = true;
+      });
+
+      es.addEventListener("points", (e) => {
+        if (!mounted) return;
+        if (e.lastEventId) lastSeqRef.current = e.lastEventId;
+        pushPoints(JSON.parse(e.data).points);
+      });
+
+      // Cursor too old to resume: catch up once, then open a fresh stream
+      es.addEventListener("reset", async () => {
+        closeStream();
+        const updates = await fetchUpdates(lastIsoRef.current);
+        if (!mounted) return;
+        pushPoints(updates);
+        lastSeqRef.current = null;
+        const newest = updates.length ? updates[updates.length - 1].timestamp : lastIsoRef.current;
+        if (!(await startStream({ since: newest || new Date(0).toISOString() }))) startPolling();
+      });
+
+      es.addEventListener("end", () => {
+        console.log("🛑 Session ended - live stream closed");
+        closeStream();
+      });
+
+      // EventSource gives up when a reconnect is rejected. After a working
+      // stream that is usually the expired ticket: resume with a new one.
+      // Rejected from the start (403/503) or unreachable: poll instead.
+      es.onerror = async () => {
+        if (es.readyState === EventSource.CLOSED && streamRef.current === es) {
+          closeStream();
+          if (!mounted) return;
+          const resume = lastSeqRef.current
+            ? { cursor: lastSeqRef.current }
+            : { since: lastIsoRef.current || new Date(0).toISOString() };
+          if (!opened || !(await startStream(resume))) startPolling();
+        }
+      };
+
+      streamRef.current = es;
+      return true;
+    }
+
+    async function start() {
+      setLoading(true);
+      const first = await fetchUpdates(null);
+      if (!mounted) return;
+      pushPoints(first);
+
+      const newest = first.length ? first[first.length - 1].timestamp : new Date(0).toISOString();
+      if (!(await startStream({ since: newest }))) startPolling();
+    }
+
+    start();
 
     return () => {
       mounted = false;
-      if (pollingRef.current) clearInterval(pollingRef.current);
+      closeStream();
+      if (pollingRef.current) {
+        clearInterval(pollingRef.current);
+        pollingRef.current = null;
+      }
     };
   }, [sessionId, paused, mode]);  // ✅ ADD mode to dependencies
 
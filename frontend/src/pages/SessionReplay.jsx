@@ -5,6 +5,8 @@ import RealTimeEngagement from "./RealTimeEngagement";
 import SessionAnalytics from "../components/SessionAnalytics";
 import "../styles/global.css";
 
+const SERIES_PAGE_SIZE = 5000;
+
 export default function SessionReplay() {
   const { sessionId } = useParams();
   const navigate = useNavigate();
@@ -29,13 +31,29 @@ export default function SessionReplay() {
         `/api/engagement/sessions/${sessionId}`
       );
       
-      // Fetch all points (static data)
-      const pointsRes = await API.get(
-        `/api/engagement/sessions/${sessionId}/series`
-      );
+      // Fetch all points (static data), one keyset page at a time
+      const allPoints = [];
+      let cursor = null;
+      do {
+        const params = { limit: SERIES_PAGE_SIZE };
+        if (cursor) {
+          params.after_ts = cursor.afterTs;
+          params.after_id = cursor.afterId;
+        }
+        const pageRes = await API.get(
+          `/api/engagement/sessions/${sessionId}/series`,
+          { params }
+        );
+        allPoints.push(...pageRes.data);
+
+        const nextTs = pageRes.headers["x-next-after-ts"];
+        cursor = nextTs
+          ? { afterTs: nextTs, afterId: pageRes.headers["x-next-after-id"] }
+          : null;
+      } while (cursor);
 
       setSession(sessionRes.data);
-      setPoints(pointsRes.data);
+      setPoints(allPoints);
     } catch (err) {
       console.error("❌ Failed to fetch session:", err);
       setError(err?.response?.data?.detail || "Failed to load session");